@@ -0,0 +1,35 @@
+"""
+Per-user cached values that a committed change can never leave stale.
+
+A reader that misses reads the database and then ``add``s the value; a change
+committed between those two steps would be overwritten by the older value if
+it simply deleted or set the key. Instead the value key carries a generation
+token stored next to it: :func:`key` reads the current token (before the
+reader touches the database) and :func:`invalidate` replaces it with a fresh
+one on commit, so a late ``add`` lands on a key nobody reads any more. Tokens
+are random rather than counters, so concurrent invalidations need no atomic
+increment and their order does not matter; a token evicted from the cache
+just starts a new generation.
+"""
+
+import secrets
+
+from django.core.cache import BaseCache
+
+
+def _generation_key(base: str) -> str:
+    return f'{base}:gen'
+
+
+def key(cache: BaseCache, base: str) -> str:
+    """The value key for ``base`` in its current generation."""
+    generation = cache.get(_generation_key(base))
+    if generation is None:
+        cache.add(_generation_key(base), secrets.token_hex(8), None)
+        generation = cache.get(_generation_key(base), '')
+    return f'{base}:{generation}'
+
+
+def invalidate(cache: BaseCache, base: str) -> None:
+    """Start a new generation: values cached under earlier ones are never read again."""
+    cache.set(_generation_key(base), secrets.token_hex(8), None)
@@ -0,0 +1,88 @@
+"""
+Wallet balance movements.
+
+Every change to ``Wallet.available_usd`` goes through :func:`credit`: one
+``UPDATE ... SET available_usd = available_usd + %s ... RETURNING`` statement
+(no read-modify-write round trip holding the write lock) plus one
+``LedgerEntry`` insert, in the same transaction. :func:`reconcile` checks
+every balance against the sum of its ledger entries with one grouped query.
+"""
+
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import LedgerEntry, Wallet
+
+CENT = Decimal('0.01')
+
+
+def _increment(user_id: int, amount: Decimal) -> tuple[int, Decimal] | None:
+    """Add ``amount`` to the user's balance in one statement; (wallet id, new balance) or None."""
+    table = connection.ops.quote_name(Wallet._meta.db_table)
+    params = [str(amount), timezone.now(), user_id]
+    with connection.cursor() as cursor:
+        if connection.features.can_return_columns_from_insert:
+            # Backends that can RETURNING from INSERT (PostgreSQL, SQLite >= 3.35) can from UPDATE too.
+            cursor.execute(
+                f'UPDATE {table} SET available_usd = available_usd + %s, updated_at = %s '
+                'WHERE user_id = %s RETURNING id, available_usd',
+                params,
+            )
+            row = cursor.fetchone()
+        else:
+            cursor.execute(
+                f'UPDATE {table} SET available_usd = available_usd + %s, updated_at = %s WHERE user_id = %s',
+                params,
+            )
+            if cursor.rowcount == 0:
+                return None
+            # The row stays locked by this transaction's UPDATE until commit.
+            cursor.execute(f'SELECT id, available_usd FROM {table} WHERE user_id = %s', [user_id])
+            row = cursor.fetchone()
+    if row is None:
+        return None
+    return row[0], Decimal(str(row[1])).quantize(CENT)
+
+
+def credit(user, amount: Decimal, kind: str = LedgerEntry.DEPOSIT, reference: str = '') -> Decimal:
+    """Add ``amount`` (may be negative) to ``user``'s wallet, record it, and return the new balance."""
+    amount = Decimal(amount).quantize(CENT)
+    with transaction.atomic():
+        result = _increment(user.pk, amount)
+        if result is None:
+            Wallet.objects.get_or_create(user_id=user.pk, defaults={'updated_at': timezone.now()})
+            result = _increment(user.pk, amount)
+        wallet_id, balance = result
+        LedgerEntry.objects.create(
+            wallet_id=wallet_id,
+            kind=kind,
+            amount=amount,
+            balance_after=balance,
+            reference=reference[:100],
+        )
+    return balance
+
+
+def balance(user) -> Decimal:
+    value = Wallet.objects.filter(user_id=user.pk).values_list('available_usd', flat=True).first()
+    return Decimal('0.00') if value is None else Decimal(value).quantize(CENT)
+
+
+def reconcile(chunk_size: int = 2000):
+    """Yield (wallet id, user id, balance, ledger sum) for every wallet whose balance is off."""
+    zero = Value(Decimal('0'), output_field=DecimalField(max_digits=20, decimal_places=2))
+    wallets = (
+        Wallet.objects.annotate(ledger_sum=Coalesce(Sum('entries__amount'), zero))
+        .order_by('id')
+        .values_list('id', 'user_id', 'available_usd', 'ledger_sum')
+    )
+    for wallet_id, user_id, available, ledger_sum in wallets.iterator(chunk_size=chunk_size):
+        # Compare at cent precision: SQLite does decimal arithmetic in floating point.
+        available = Decimal(str(available)).quantize(CENT)
+        ledger_sum = Decimal(str(ledger_sum)).quantize(CENT)
+        if available != ledger_sum:
+            yield wallet_id, user_id, available, ledger_sum
@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+
+from accounts import otp
+from accounts.models import User
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare OTP issue + verify throughput of the password-hasher path '
+        'against accounts.otp (HMAC digests), in memory and optionally through the database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=2.0,
+            help='Seconds to run each path for.',
+        )
+        parser.add_argument(
+            '--with-db',
+            action='store_true',
+            help='Also time accounts.otp.issue/verify against the database (rolled back afterwards).',
+        )
+
+    def _measure(self, label: str, duration: float, run_once) -> float:
+        count = 0
+        started = time.perf_counter()
+        deadline = started + duration
+        while True:
+            run_once()
+            count += 1
+            if time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed
+        self.stdout.write(f'{label:<28} {count:>8} ops  {rate:>12,.1f} ops/s  {elapsed / count * 1000:>9.3f} ms/op')
+        return rate
+
+    def handle(self, *args, **options):
+        duration = options['duration']
+        code = otp.new_code()
+
+        def legacy():
+            stored = make_password(code)
+            assert check_password(code, stored)
+
+        def hmac_digest():
+            stored = otp.digest(1, code)
+            assert constant_time_compare(otp.digest(1, code), stored)
+
+        legacy_rate = self._measure('password hasher', duration, legacy)
+        hmac_rate = self._measure('hmac digest', duration, hmac_digest)
+        self.stdout.write(self.style.SUCCESS(f'hmac digest is {hmac_rate / legacy_rate:,.0f}x faster in memory'))
+
+        if options['with_db']:
+            try:
+                with transaction.atomic():
+                    user = User.objects.create_user(
+                        username='otp-benchmark@example.invalid', email='otp-benchmark@example.invalid', password=None,
+                    )
+
+                    def issue_and_verify():
+                        assert otp.verify(user, otp.issue(user))
+
+                    self._measure('issue + verify (database)', duration, issue_and_verify)
+                    raise _Rollback
+            except _Rollback:
+                pass
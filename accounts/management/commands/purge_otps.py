@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import otp
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete used and expired signup OTPs in small batches, each in its own '
+        'short transaction. Safe to run while the site is live, e.g. from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction.',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.05,
+            help='Seconds to sleep between batches so other writers get the lock.',
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for deleted in otp.purge(options['batch_size']):
+            total += deleted
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} used or expired OTPs.'))
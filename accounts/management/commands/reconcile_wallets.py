@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts import ledger
+from accounts.models import Wallet
+
+
+class Command(BaseCommand):
+    help = (
+        'Verify every wallet balance against the sum of its ledger entries '
+        '(one grouped query, streamed in chunks). Exits non-zero on any mismatch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Wallets fetched per database round trip.',
+        )
+
+    def handle(self, *args, **options):
+        mismatches = 0
+        for wallet_id, user_id, available, ledger_sum in ledger.reconcile(options['chunk_size']):
+            mismatches += 1
+            self.stdout.write(
+                f'wallet {wallet_id} (user {user_id}): balance {available} != ledger {ledger_sum} '
+                f'(diff {available - ledger_sum})'
+            )
+        total = Wallet.objects.count()
+        if mismatches:
+            raise CommandError(f'{mismatches} of {total} wallets do not match their ledger.')
+        self.stdout.write(self.style.SUCCESS(f'All {total} wallets match their ledger.'))
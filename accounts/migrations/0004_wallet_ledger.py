@@ -0,0 +1,76 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_wallet_table(apps, schema_editor):
+    """Create accounts_wallet unless an older deployment already made it by hand."""
+    Wallet = apps.get_model('accounts', 'Wallet')
+    with schema_editor.connection.cursor() as cursor:
+        existing = schema_editor.connection.introspection.table_names(cursor)
+    if Wallet._meta.db_table not in existing:
+        schema_editor.create_model(Wallet)
+
+
+def drop_wallet_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('accounts', 'Wallet'))
+
+
+def open_ledgers(apps, schema_editor):
+    """Give every pre-existing balance an opening entry so the ledger sums match."""
+    Wallet = apps.get_model('accounts', 'Wallet')
+    LedgerEntry = apps.get_model('accounts', 'LedgerEntry')
+    LedgerEntry.objects.bulk_create(
+        [
+            LedgerEntry(wallet_id=wallet_id, kind='opening', amount=balance, balance_after=balance)
+            for wallet_id, balance in Wallet.objects.exclude(available_usd=0).values_list('id', 'available_usd')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_date_joined_alter_user_first_name_and_more'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Wallet',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('available_usd', models.DecimalField(decimal_places=2, default=0, help_text='Spendable balance; always equals the sum of its ledger entries', max_digits=20)),
+                        ('updated_at', models.DateTimeField(help_text='Timestamp of the last balance change')),
+                        ('user', models.OneToOneField(help_text='Owner of this wallet', on_delete=django.db.models.deletion.CASCADE, related_name='wallet', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'accounts_wallet',
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_wallet_table, drop_wallet_table),
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('deposit', 'Deposit'), ('opening', 'Opening balance'), ('adjustment', 'Adjustment')], help_text='What caused the movement', max_length=16)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Signed change to the balance', max_digits=20)),
+                ('balance_after', models.DecimalField(decimal_places=2, help_text='Wallet balance right after this movement', max_digits=20)),
+                ('reference', models.CharField(blank=True, help_text='External reference, e.g. the payment method', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='Timestamp when the movement was recorded')),
+                ('wallet', models.ForeignKey(help_text='Wallet this movement belongs to', on_delete=django.db.models.deletion.PROTECT, related_name='entries', to='accounts.wallet')),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['wallet', 'created_at'], name='accounts_le_wallet__feef9c_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledgers, migrations.RunPython.noop),
+    ]
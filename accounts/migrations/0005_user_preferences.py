@@ -0,0 +1,56 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_preferences(apps, schema_editor):
+    """Give every existing user a preferences row with the defaults."""
+    User = apps.get_model('accounts', 'User')
+    UserPreferences = apps.get_model('accounts', 'UserPreferences')
+    now = timezone.now()
+    UserPreferences.objects.bulk_create(
+        [UserPreferences(user_id=user_id, updated_at=now) for user_id in User.objects.values_list('id', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_wallet_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserPreferences',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(blank=True, default='', max_length=150)),
+                ('phone_number', models.CharField(blank=True, default='', max_length=32)),
+                ('price_alerts', models.BooleanField(default=True)),
+                ('trade_execution', models.BooleanField(default=True)),
+                ('security_warnings', models.BooleanField(default=True)),
+                ('liquidation_warning', models.BooleanField(default=True)),
+                ('funding_rate_reminder', models.BooleanField(default=False)),
+                ('newsletter_updates', models.BooleanField(default=False)),
+                ('email_notifications', models.BooleanField(default=True)),
+                ('push_notifications', models.BooleanField(default=False)),
+                ('theme', models.CharField(default='Dark', max_length=16)),
+                ('accent_color', models.CharField(default='#7c3aed', max_length=7)),
+                ('language', models.CharField(default='English (US)', max_length=32)),
+                ('timezone', models.CharField(default='UTC+05:30 Mumbai', max_length=32)),
+                ('currency', models.CharField(default='USD ($)', max_length=16)),
+                ('date_format', models.CharField(default='DD/MM/YYYY', max_length=16)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='Timestamp of the last change')),
+                ('user', models.OneToOneField(help_text='User these preferences belong to', on_delete=django.db.models.deletion.CASCADE, related_name='preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'user preferences',
+                'indexes': [models.Index(condition=models.Q(('price_alerts', True)), fields=['user'], name='pref_price_alerts_on'), models.Index(condition=models.Q(('trade_execution', True)), fields=['user'], name='pref_trade_execution_on'), models.Index(condition=models.Q(('security_warnings', True)), fields=['user'], name='pref_security_warnings_on'), models.Index(condition=models.Q(('liquidation_warning', True)), fields=['user'], name='pref_liquidation_warning_on'), models.Index(condition=models.Q(('funding_rate_reminder', True)), fields=['user'], name='pref_funding_rate_reminder_on'), models.Index(condition=models.Q(('newsletter_updates', True)), fields=['user'], name='pref_newsletter_updates_on'), models.Index(condition=models.Q(('email_notifications', True)), fields=['user'], name='pref_email_notifications_on'), models.Index(condition=models.Q(('push_notifications', True)), fields=['user'], name='pref_push_notifications_on')],
+            },
+        ),
+        migrations.RunPython(create_preferences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_preferences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='otp',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Verification attempts made against this OTP'),
+        ),
+        migrations.AlterField(
+            model_name='otp',
+            name='otp_hash',
+            field=models.CharField(help_text='Keyed HMAC digest of the code (see accounts.otp)', max_length=128),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_otp_attempts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='otp',
+            index=models.Index(condition=models.Q(('is_used', False)), fields=['user', 'expires_at'], name='accounts_otp_live'),
+        ),
+        migrations.RemoveIndex(
+            model_name='otp',
+            name='accounts_ot_user_id_211b3d_idx',
+        ),
+    ]
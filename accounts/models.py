@@ -10,6 +10,13 @@ class User(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            # Every user has a preferences row, so notification fan-out is an index read.
+            UserPreferences.objects.get_or_create(user=self)
+
 
 class OTP(models.Model):
     """One-time password for authentication."""
@@ -21,7 +28,7 @@ class OTP(models.Model):
     )
     otp_hash = models.CharField(
         max_length=128,
-        help_text="Hashed OTP using Django's password hasher for security",
+        help_text='Keyed HMAC digest of the code (see accounts.otp)',
     )
     created_at = models.DateTimeField(
         auto_now_add=True,
@@ -34,11 +41,156 @@ class OTP(models.Model):
         default=False,
         help_text='Whether this OTP has been used for authentication',
     )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='Verification attempts made against this OTP',
+    )
 
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', 'expires_at']),
+            # Live codes only: verification probes it, and it stays as small as the set of pending signups.
+            models.Index(
+                fields=['user', 'expires_at'],
+                condition=models.Q(is_used=False),
+                name='accounts_otp_live',
+            ),
         ]
         verbose_name = 'OTP'
         verbose_name_plural = 'OTPs'
+
+
+class Wallet(models.Model):
+    """A user's USD balance. Only changed through ``accounts.ledger``."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='wallet',
+        help_text='Owner of this wallet',
+    )
+    available_usd = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        default=0,
+        help_text='Spendable balance; always equals the sum of its ledger entries',
+    )
+    updated_at = models.DateTimeField(
+        help_text='Timestamp of the last balance change',
+    )
+
+    class Meta:
+        db_table = 'accounts_wallet'
+
+    def __str__(self):
+        return f'{self.user} ${self.available_usd}'
+
+
+class LedgerEntry(models.Model):
+    """Append-only record of one wallet balance movement."""
+    DEPOSIT = 'deposit'
+    OPENING = 'opening'
+    ADJUSTMENT = 'adjustment'
+    KIND_CHOICES = [
+        (DEPOSIT, 'Deposit'),
+        (OPENING, 'Opening balance'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    wallet = models.ForeignKey(
+        Wallet,
+        on_delete=models.PROTECT,
+        related_name='entries',
+        help_text='Wallet this movement belongs to',
+    )
+    kind = models.CharField(
+        max_length=16,
+        choices=KIND_CHOICES,
+        help_text='What caused the movement',
+    )
+    amount = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        help_text='Signed change to the balance',
+    )
+    balance_after = models.DecimalField(
+        max_digits=20,
+        decimal_places=2,
+        help_text='Wallet balance right after this movement',
+    )
+    reference = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text='External reference, e.g. the payment method',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        help_text='Timestamp when the movement was recorded',
+    )
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['wallet', 'created_at']),
+        ]
+        verbose_name_plural = 'ledger entries'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Ledger entries are append-only.')
+
+
+NOTIFICATION_FLAGS = (
+    'price_alerts',
+    'trade_execution',
+    'security_warnings',
+    'liquidation_warning',
+    'funding_rate_reminder',
+    'newsletter_updates',
+    'email_notifications',
+    'push_notifications',
+)
+
+
+class UserPreferences(models.Model):
+    """Profile extras, notification flags and appearance choices; read through ``accounts.preferences``."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='preferences',
+        help_text='User these preferences belong to',
+    )
+    full_name = models.CharField(max_length=150, blank=True, default='')
+    phone_number = models.CharField(max_length=32, blank=True, default='')
+    price_alerts = models.BooleanField(default=True)
+    trade_execution = models.BooleanField(default=True)
+    security_warnings = models.BooleanField(default=True)
+    liquidation_warning = models.BooleanField(default=True)
+    funding_rate_reminder = models.BooleanField(default=False)
+    newsletter_updates = models.BooleanField(default=False)
+    email_notifications = models.BooleanField(default=True)
+    push_notifications = models.BooleanField(default=False)
+    theme = models.CharField(max_length=16, default='Dark')
+    accent_color = models.CharField(max_length=7, default='#7c3aed')
+    language = models.CharField(max_length=32, default='English (US)')
+    timezone = models.CharField(max_length=32, default='UTC+05:30 Mumbai')
+    currency = models.CharField(max_length=16, default='USD ($)')
+    date_format = models.CharField(max_length=16, default='DD/MM/YYYY')
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text='Timestamp of the last change',
+    )
+
+    class Meta:
+        verbose_name_plural = 'user preferences'
+        # One partial index per flag: fan-out jobs read "users with <flag> on" from it.
+        indexes = [
+            models.Index(fields=['user'], condition=models.Q(**{flag: True}), name=f'pref_{flag}_on')
+            for flag in NOTIFICATION_FLAGS
+        ]
+
+    def __str__(self):
+        return f'Preferences of {self.user}'
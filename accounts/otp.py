@@ -0,0 +1,118 @@
+"""
+Signup one-time codes.
+
+Codes are stored as keyed HMAC-SHA256 digests (key OTP_SECRET_KEY) rather
+than with the password hasher: a code lives OTP_TTL_SECONDS and allows
+OTP_MAX_ATTEMPTS guesses, so a deliberately slow hash buys nothing and costs
+hundreds of milliseconds of CPU per signup and per attempt.
+
+:func:`issue` retires the user's earlier codes and stores the new one in a
+single transaction. :func:`verify` claims an attempt on the newest live code
+with one UPDATE over the partial index of live codes that also enforces
+expiry and the attempt limit, then compares digests in constant time. Codes
+stored with the password hasher by older releases still verify until they
+expire. :func:`purge` deletes used and expired codes in small batches.
+"""
+
+import secrets
+from datetime import timedelta
+from typing import Iterator
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import OTP, User
+
+DIGEST_PREFIX = 'hmac-sha256$'
+CODE_DIGITS = 6
+
+
+def new_code() -> str:
+    return f'{secrets.randbelow(10 ** CODE_DIGITS):0{CODE_DIGITS}d}'
+
+
+def digest(user_id: int, code: str) -> str:
+    """Stored form of ``code``; bound to the user so digests can't be replayed across accounts."""
+    mac = salted_hmac('accounts.otp', f'{user_id}:{code}', secret=settings.OTP_SECRET_KEY, algorithm='sha256')
+    return DIGEST_PREFIX + mac.hexdigest()
+
+
+def issue(user) -> str:
+    """Create a code for ``user``, invalidating any earlier one, and return it in plain text."""
+    code = new_code()
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock the user row so concurrent resends can't leave two live codes.
+        User.objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True).first()
+        OTP.objects.filter(user_id=user.pk, is_used=False).update(is_used=True)
+        OTP.objects.create(
+            user_id=user.pk,
+            otp_hash=digest(user.pk, code),
+            expires_at=now + timedelta(seconds=settings.OTP_TTL_SECONDS),
+        )
+    return code
+
+
+def _claim_attempt(user_id: int) -> tuple[int, str] | None:
+    """Count one attempt against the newest live code; (id, stored hash) or None if there is none left."""
+    now = timezone.now()
+    limit = settings.OTP_MAX_ATTEMPTS
+    if connection.features.can_return_columns_from_insert:
+        table = connection.ops.quote_name(OTP._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET attempts = attempts + 1 '
+                # Same predicate and order as the accounts_otp_live partial index: one index probe.
+                f'WHERE id = (SELECT id FROM {table} WHERE user_id = %s AND NOT is_used AND expires_at > %s '
+                'ORDER BY expires_at DESC, id DESC LIMIT 1) AND attempts < %s '
+                'RETURNING id, otp_hash',
+                [user_id, connection.ops.adapt_datetimefield_value(now), limit],
+            )
+            row = cursor.fetchone()
+        return (row[0], row[1]) if row else None
+    live = (
+        OTP.objects.filter(user_id=user_id, is_used=False, expires_at__gt=now)
+        .order_by('-expires_at', '-id')
+        .values_list('id', 'otp_hash')
+        .first()
+    )
+    if live is None or not OTP.objects.filter(pk=live[0], attempts__lt=limit).update(attempts=F('attempts') + 1):
+        return None
+    return live
+
+
+def _matches(user_id: int, code: str, stored: str) -> bool:
+    if stored.startswith(DIGEST_PREFIX):
+        return constant_time_compare(digest(user_id, code), stored)
+    return check_password(code, stored)
+
+
+def verify(user, code: str) -> bool:
+    """Whether ``code`` is the user's live code; a match is consumed and can't be used again."""
+    claimed = _claim_attempt(user.pk)
+    if claimed is None:
+        return False
+    otp_id, stored = claimed
+    if not _matches(user.pk, code, stored):
+        return False
+    return OTP.objects.filter(pk=otp_id, is_used=False).update(is_used=True) == 1
+
+
+def purge(batch_size: int = 1000) -> Iterator[int]:
+    """Delete used and expired codes, one short transaction per batch; yields each batch's count."""
+    while True:
+        # Dead codes are the oldest rows, so walking the primary key finds them first.
+        dead = (
+            OTP.objects.filter(Q(is_used=True) | Q(expires_at__lte=timezone.now()))
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        ids = list(dead)
+        if not ids:
+            return
+        deleted, _ = OTP.objects.filter(pk__in=ids).delete()
+        yield deleted
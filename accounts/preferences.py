@@ -0,0 +1,74 @@
+"""
+Per-user settings stored in ``UserPreferences``.
+
+:func:`get` reads through the shared ``preferences`` cache (one row read per
+user per PREFERENCES_CACHE_TIMEOUT); :func:`update` writes only the columns
+that changed and retires the cached copy once the transaction commits
+(``accounts.caching``: a read racing the update can't re-cache the old row).
+Every user gets a row when created (see ``User.save``), so :func:`users_with`
+reads the partial index of a notification flag.
+"""
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import caching
+from .models import NOTIFICATION_FLAGS, User, UserPreferences
+
+FIELDS = tuple(
+    field.name for field in UserPreferences._meta.concrete_fields
+    if field.name not in ('id', 'user', 'updated_at')
+)
+
+
+def _cache_key(user_id: int) -> str:
+    return f'prefs:{user_id}'
+
+
+def _defaults() -> dict:
+    return {name: UserPreferences._meta.get_field(name).default for name in FIELDS}
+
+
+def _read(user_id: int) -> dict:
+    row = UserPreferences.objects.filter(user_id=user_id).values(*FIELDS).first()
+    return row if row is not None else _defaults()
+
+
+def get(user) -> dict:
+    """Flat ``{column: value}`` preferences of ``user``."""
+    key = caching.key(caches['preferences'], _cache_key(user.pk))
+    values = caches['preferences'].get(key)
+    if values is None:
+        values = _read(user.pk)
+        caches['preferences'].add(key, values, settings.PREFERENCES_CACHE_TIMEOUT)
+    return dict(values)
+
+
+def update(user, **changes) -> dict:
+    """Write only ``changes`` (column names) and return the resulting preferences."""
+    unknown = set(changes) - set(FIELDS)
+    if unknown:
+        raise ValueError(f'Unknown preferences: {", ".join(sorted(unknown))}')
+    rows = UserPreferences.objects.filter(user_id=user.pk)
+    with transaction.atomic():
+        if changes and not rows.update(updated_at=timezone.now(), **changes):
+            try:
+                with transaction.atomic():
+                    UserPreferences.objects.create(user_id=user.pk, **changes)
+            except IntegrityError:
+                # Created concurrently; apply the change to that row.
+                rows.update(updated_at=timezone.now(), **changes)
+        values = _read(user.pk)
+        # A new generation, not a set: concurrent updates commit in any order.
+        transaction.on_commit(lambda: caching.invalidate(caches['preferences'], _cache_key(user.pk)))
+    return dict(values)
+
+
+def users_with(flag: str):
+    """Users who have notification ``flag`` on, for fan-out jobs."""
+    if flag not in NOTIFICATION_FLAGS:
+        raise ValueError(f'Unknown notification flag: {flag}')
+    enabled = UserPreferences.objects.filter(**{flag: True}).values('user_id')
+    return User.objects.filter(pk__in=enabled)
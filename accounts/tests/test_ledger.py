@@ -0,0 +1,121 @@
+import threading
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from accounts import ledger
+from accounts.models import LedgerEntry, User, Wallet
+
+
+def make_user(email):
+    return User.objects.create_user(username=email, email=email, password='pw12345678!')
+
+
+class CreditTests(TestCase):
+    def setUp(self):
+        self.user = make_user('ledger@example.com')
+
+    def test_first_credit_creates_wallet_and_entry(self):
+        self.assertEqual(ledger.credit(self.user, Decimal('25.50'), reference='card'), Decimal('25.50'))
+        entry = LedgerEntry.objects.get(wallet__user=self.user)
+        self.assertEqual((entry.kind, entry.amount, entry.balance_after), ('deposit', Decimal('25.50'), Decimal('25.50')))
+        self.assertEqual(entry.reference, 'card')
+
+    def test_negative_amount_debits(self):
+        ledger.credit(self.user, Decimal('10'))
+        self.assertEqual(ledger.credit(self.user, Decimal('-3.25'), LedgerEntry.ADJUSTMENT), Decimal('6.75'))
+        self.assertEqual(ledger.balance(self.user), Decimal('6.75'))
+
+    def test_returning_and_fallback_paths_agree(self):
+        self.assertEqual(ledger.credit(self.user, Decimal('1.10')), Decimal('1.10'))
+        with mock.patch.object(connection.features, 'can_return_columns_from_insert', False):
+            self.assertEqual(ledger.credit(self.user, Decimal('2.20')), Decimal('3.30'))
+            self.assertIsNone(ledger._increment(self.user.pk + 1000, Decimal('1')))
+        self.assertEqual(
+            list(Wallet.objects.get(user=self.user).entries.order_by('id').values_list('balance_after', flat=True)),
+            [Decimal('1.10'), Decimal('3.30')],
+        )
+
+
+class ConcurrentCreditTests(TransactionTestCase):
+    def test_concurrent_credits_are_not_lost(self):
+        user = make_user('concurrent@example.com')
+        ledger.credit(user, Decimal('0.00'), LedgerEntry.OPENING)
+        errors = []
+
+        def deposit():
+            try:
+                for _ in range(10):
+                    ledger.credit(user, Decimal('1.01'))
+            except Exception as exc:  # surfaced by the assertion below
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=deposit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(ledger.balance(user), Decimal('80.80'))
+        self.assertEqual(LedgerEntry.objects.filter(kind=LedgerEntry.DEPOSIT).count(), 80)
+        # Every entry saw a distinct balance: no two increments read the same row state.
+        self.assertEqual(LedgerEntry.objects.values('balance_after').distinct().count(), 81)
+
+
+class ReconcileTests(TestCase):
+    def test_matching_ledger_passes(self):
+        ledger.credit(make_user('ok@example.com'), Decimal('5'))
+        out = StringIO()
+        call_command('reconcile_wallets', stdout=out)
+        self.assertIn('All 1 wallets match', out.getvalue())
+
+    def test_mismatch_is_reported(self):
+        user = make_user('off@example.com')
+        ledger.credit(user, Decimal('5'))
+        ledger.credit(make_user('fine@example.com'), Decimal('7'))
+        Wallet.objects.filter(user=user).update(available_usd=Decimal('9.99'))
+        self.assertEqual(
+            [(user_id, available, ledger_sum) for _, user_id, available, ledger_sum in ledger.reconcile()],
+            [(user.pk, Decimal('9.99'), Decimal('5.00'))],
+        )
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 of 2 wallets do not match their ledger.'):
+            call_command('reconcile_wallets', stdout=out)
+        self.assertIn('diff 4.99', out.getvalue())
+
+
+class OpeningBalanceMigrationTests(TransactionTestCase):
+    before = [('accounts', '0003_alter_user_date_joined_alter_user_first_name_and_more')]
+    after = [('accounts', '0004_wallet_ledger')]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_existing_balances_get_opening_entries(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        # An older deployment's hand-made table, already holding balances.
+        apps = executor.loader.project_state(self.after).apps
+        OldUser = apps.get_model('accounts', 'User')
+        rich = OldUser.objects.create(username='rich', email='rich@example.com')
+        broke = OldUser.objects.create(username='broke', email='broke@example.com')
+        with connection.schema_editor() as editor:
+            editor.create_model(apps.get_model('accounts', 'Wallet'))
+        OldWallet = apps.get_model('accounts', 'Wallet')
+        OldWallet.objects.create(user_id=rich.pk, available_usd=Decimal('42.50'), updated_at=timezone.now())
+        OldWallet.objects.create(user_id=broke.pk, available_usd=Decimal('0'), updated_at=timezone.now())
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        entries = apps.get_model('accounts', 'LedgerEntry').objects.values_list('wallet__user_id', 'kind', 'amount')
+        self.assertEqual(list(entries), [(rich.pk, 'opening', Decimal('42.50'))])
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts import otp
+from accounts.models import OTP, User
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3)
+class VerifyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='otp@example.com', email='otp@example.com', password='x')
+
+    def test_right_code_verifies_once(self):
+        code = otp.issue(self.user)
+        self.assertTrue(otp.verify(self.user, code))
+        self.assertFalse(otp.verify(self.user, code))
+
+    def test_reissue_retires_earlier_code(self):
+        old = otp.issue(self.user)
+        new = otp.issue(self.user)
+        if old != new:
+            self.assertFalse(otp.verify(self.user, old))
+        self.assertTrue(otp.verify(self.user, new))
+
+    def test_right_code_fails_after_attempts_run_out(self):
+        for path_returns in (True, False):
+            with self.subTest(returning=path_returns), mock.patch.object(
+                connection.features, 'can_return_columns_from_insert', path_returns,
+            ):
+                code = otp.issue(self.user)
+                wrong = f'{(int(code) + 1) % 10 ** otp.CODE_DIGITS:06d}'
+                for _ in range(3):
+                    self.assertFalse(otp.verify(self.user, wrong))
+                self.assertFalse(otp.verify(self.user, code))
+                self.assertEqual(OTP.objects.get(otp_hash=otp.digest(self.user.pk, code)).attempts, 3)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        user = User.objects.create_user(username='purge@example.com', email='purge@example.com', password='x')
+        self.live = OTP.objects.create(user=user, otp_hash='live', expires_at=now + timedelta(minutes=5))
+        OTP.objects.bulk_create(
+            [OTP(user=user, otp_hash=f'used{i}', is_used=True, expires_at=now + timedelta(minutes=5)) for i in range(3)]
+            + [OTP(user=user, otp_hash=f'expired{i}', expires_at=now - timedelta(seconds=1)) for i in range(4)]
+        )
+
+    def test_purge_deletes_dead_codes_in_batches(self):
+        self.assertEqual(list(otp.purge(batch_size=3)), [3, 3, 1])
+        self.assertEqual(list(OTP.objects.values_list('pk', flat=True)), [self.live.pk])
+
+    def test_purge_otps_command(self):
+        out = StringIO()
+        call_command('purge_otps', batch_size=2, pause=0, stdout=out)
+        self.assertIn('Deleted 7 used or expired OTPs.', out.getvalue())
+        self.assertEqual(OTP.objects.count(), 1)
@@ -0,0 +1,42 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from accounts import preferences
+from accounts.models import User
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+@override_settings(CACHES={'default': LOCMEM, 'preferences': {**LOCMEM, 'LOCATION': 'preferences-tests'}})
+class PreferencesCacheTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='prefs@example.com', email='prefs@example.com', password='x')
+        caches['preferences'].clear()
+
+    def update(self, **changes):
+        with self.captureOnCommitCallbacks(execute=True):
+            return preferences.update(self.user, **changes)
+
+    def test_update_is_read_back(self):
+        flag = preferences.get(self.user)['liquidation_warning']
+        self.update(liquidation_warning=not flag)
+        self.assertEqual(preferences.get(self.user)['liquidation_warning'], not flag)
+        with self.assertNumQueries(0):
+            self.assertEqual(preferences.get(self.user)['liquidation_warning'], not flag)
+
+    def test_update_committed_between_miss_read_and_add(self):
+        flag = preferences.get(self.user)['liquidation_warning']
+        caches['preferences'].clear()
+        read = preferences._read
+
+        def read_then_update(user_id):
+            stale = read(user_id)
+            patched.side_effect = read  # update() reads the row back too
+            self.update(liquidation_warning=not flag)  # commits before the miss path adds what it read
+            return stale
+
+        with mock.patch.object(preferences, '_read', side_effect=read_then_update) as patched:
+            self.assertEqual(preferences.get(self.user)['liquidation_warning'], flag)
+        self.assertEqual(preferences.get(self.user)['liquidation_warning'], not flag)
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import last_good, timing
+
+        connection_created.connect(timing.install_query_timer)
+
+        # Warm start: last-known-good market payloads from the previous run.
+        last_good.load()
@@ -0,0 +1,238 @@
+"""
+Minimal asyncio HTTP/1.1 client with keep-alive connection pools per upstream host.
+
+Used by the async market views so thousands of concurrent pollers share a
+handful of persistent TLS connections instead of opening one per request.
+Each (event loop, origin) pair gets its own :class:`HostPool`; concurrency
+per host is bounded by a semaphore and idle connections are reused.
+
+Per-loop state (these pools, ``core.push`` hubs) is kept with
+:func:`loop_local` and closed when its loop shuts down.
+"""
+
+import asyncio
+import json
+import ssl
+import time
+import weakref
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+USER_AGENT = 'NexusPro/1.0'
+IDLE_TTL = 30.0
+
+
+class _Connection:
+    __slots__ = ('reader', 'writer', 'idle_since')
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class HostPool:
+    """Keep-alive connections to one ``scheme://host:port`` origin."""
+
+    def __init__(self, scheme: str, host: str, port: int, max_connections: int,
+                 connect_timeout: float, request_timeout: float) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._idle: list[_Connection] = []
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._ssl = ssl.create_default_context() if scheme == 'https' else None
+        authority = f'[{host}]' if ':' in host else host
+        default_port = 443 if scheme == 'https' else 80
+        self.host_header = authority if port == default_port else f'{authority}:{port}'
+
+    async def _connect(self) -> _Connection:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port, ssl=self._ssl),
+                timeout=self.connect_timeout,
+            )
+        except (OSError, asyncio.TimeoutError) as exc:
+            raise URLError(f'connect to {self.host} failed: {exc!r}') from exc
+        return _Connection(reader, writer)
+
+    def _checkout_idle(self) -> _Connection | None:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.idle_since < IDLE_TTL and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        return None
+
+    def _checkin(self, conn: _Connection) -> None:
+        conn.idle_since = time.monotonic()
+        self._idle.append(conn)
+
+    async def request(self, target: str, headers: dict[str, str] | None = None) -> tuple[int, dict[str, str], bytes]:
+        """Send a GET for ``target`` (path + query) and return status, headers and body."""
+        async with self._semaphore:
+            conn = self._checkout_idle()
+            reused = conn is not None
+            if conn is None:
+                conn = await self._connect()
+            try:
+                result, keep_alive = await asyncio.wait_for(
+                    self._exchange(conn, target, headers), timeout=self.request_timeout,
+                )
+            except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                conn.close()
+                if not reused:
+                    raise URLError(f'{self.host}: {exc!r}') from exc
+                # The server closed an idle keep-alive connection; retry once on a new one.
+                conn = await self._connect()
+                try:
+                    result, keep_alive = await asyncio.wait_for(
+                        self._exchange(conn, target, headers), timeout=self.request_timeout,
+                    )
+                except BaseException:
+                    conn.close()
+                    raise
+            except BaseException:
+                conn.close()
+                raise
+            if keep_alive:
+                self._checkin(conn)
+            else:
+                conn.close()
+            return result
+
+    async def _exchange(self, conn: _Connection, target: str, headers: dict[str, str] | None):
+        lines = [
+            f'GET {target} HTTP/1.1',
+            f'Host: {self.host_header}',
+            f'User-Agent: {USER_AGENT}',
+            'Accept: application/json',
+            'Accept-Encoding: identity',
+            'Connection: keep-alive',
+        ]
+        lines.extend(f'{name}: {value}' for name, value in (headers or {}).items())
+        conn.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await conn.writer.drain()
+
+        status_line = await conn.reader.readuntil(b'\r\n')
+        parts = status_line.decode('latin-1').split(' ', 2)
+        version, status = parts[0], int(parts[1])
+        response_headers: dict[str, str] = {}
+        while True:
+            line = await conn.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = version == 'HTTP/1.1' and response_headers.get('connection', '').lower() != 'close'
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await self._read_chunked(conn.reader)
+        elif 'content-length' in response_headers:
+            body = await conn.reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await conn.reader.read()
+            keep_alive = False
+        return (status, response_headers, body), keep_alive
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks = []
+        while True:
+            size_line = await reader.readuntil(b'\r\n')
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip optional trailers up to the terminating blank line.
+                while await reader.readuntil(b'\r\n') != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+    def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
+
+
+class _LoopResources(dict):
+    """Values kept for one event loop, closed when the loop shuts down."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__()
+        self.closers = {}
+        self._sentinel = self._close_at_shutdown(weakref.ref(loop))
+        # Starting the generator registers it with the loop, which finalizes it in
+        # shutdown_asyncgens(): asyncio.run does that, so async_to_sync loops do too.
+        try:
+            self._sentinel.asend(None).send(None)
+        except StopIteration:
+            pass
+
+    async def _close_at_shutdown(self, loop_ref):
+        try:
+            while True:
+                yield
+        finally:
+            for name, value in list(self.items()):
+                self.closers[name](value)
+            self.clear()
+            loop = loop_ref()
+            if loop is not None:
+                _loop_resources.pop(loop, None)
+
+
+_loop_resources: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def loop_local(name, factory, close):
+    """The running loop's value for ``name``, built by ``factory`` and passed to ``close`` at loop shutdown."""
+    loop = asyncio.get_running_loop()
+    resources = _loop_resources.get(loop)
+    if resources is None:
+        # Loops closed without shutdown_asyncgens(): their sockets go with the dropped objects.
+        for stale in [other for other in _loop_resources if other.is_closed()]:
+            del _loop_resources[stale]
+        resources = _loop_resources[loop] = _LoopResources(loop)
+    value = resources.get(name)
+    if value is None:
+        value = resources[name] = factory()
+        resources.closers[name] = close
+    return value
+
+
+def get_pool(scheme: str, host: str, port: int) -> HostPool:
+    return loop_local(
+        ('http', scheme, host, port),
+        lambda: HostPool(
+            scheme, host, port,
+            max_connections=settings.MARKET_HTTP_MAX_CONNECTIONS_PER_HOST,
+            connect_timeout=settings.MARKET_HTTP_CONNECT_TIMEOUT,
+            request_timeout=settings.MARKET_HTTP_REQUEST_TIMEOUT,
+        ),
+        HostPool.close,
+    )
+
+
+async def get_json(url: str, headers: dict[str, str] | None = None):
+    """Async counterpart of ``core.views._http_get_json`` over pooled connections."""
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    target = parts.path or '/'
+    if parts.query:
+        target = f'{target}?{parts.query}'
+    pool = get_pool(parts.scheme, parts.hostname, port)
+    try:
+        status, response_headers, body = await pool.request(target, headers)
+    except asyncio.TimeoutError as exc:
+        raise TimeoutError(f'{parts.hostname} timed out') from exc
+    if status >= 400:
+        raise HTTPError(url, status, f'HTTP {status}', response_headers, None)
+    return json.loads(body.decode('utf-8'))
@@ -0,0 +1,394 @@
+"""
+Async versions of the market API views for ASGI deployments.
+
+They mirror the sync views in ``core.views`` and share their request and
+shaping helpers, but fetch upstream data through ``core.async_http`` so a
+handful of event-loop workers can serve many concurrent pollers over pooled
+keep-alive connections. ``core.urls`` routes the market endpoints here when
+MARKET_ASYNC_VIEWS is enabled.
+"""
+
+import asyncio
+import json
+from urllib import parse
+from urllib.error import HTTPError, URLError
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.http import JsonResponse, StreamingHttpResponse
+
+from . import (
+    async_http, encodings, last_good, market_cache, push, rate_limit, router, ticker_index, timing, upstream_fixtures,
+)
+from .conditional import conditional
+from .encodings import encodable
+from .rate_limit import rate_limited
+from .views import (
+    BINANCE_BASE_URL,
+    COINAPI_BASE_URL,
+    COINGECKO_BASE_URL,
+    COINGECKO_MARKETS_QUERY,
+    CRYPTOCOMPARE_BASE_URL,
+    CRYPTOCOMPARE_HEADERS,
+    PERIOD_TO_INTERVAL,
+    _batch_error_result,
+    _batch_queries,
+    _batch_response,
+    _batch_response_result,
+    _batch_subrequest,
+    _binance_assets_result,
+    _binance_pair,
+    _binance_price_result,
+    _coinapi_ohlcv_query,
+    _coinapi_ohlcv_result,
+    _coingecko_assets_result,
+    _depth_payload,
+    _depth_query,
+    _depth_result,
+    _depth_snapshot_response,
+    _ingestor_only,
+    _klines_query,
+    _klines_result,
+    _last_good_response,
+    _last_good_ticker_index,
+    _live_json,
+    _news_fallback_payload,
+    _news_fallback_response,
+    _news_needs_latest,
+    _news_params,
+    _news_query,
+    _news_result,
+    _news_rows,
+    _news_store_response,
+    _not_ingested_response,
+    _ohlcv_params,
+    _ohlcv_snapshot_response,
+    _ohlcv_store_payload,
+    _read_snapshot,
+    _snapshot_response,
+    _stale_response,
+    _tickers_page_result,
+    _tickers_params,
+    _trades_payload,
+    _trades_query,
+    _trades_result,
+    _trades_snapshot_response,
+)
+
+
+def _off_loop(func):
+    """``func`` as a coroutine run in the loop's executor.
+
+    For the shared helpers that block: snapshot reads (file locks, mmap, writer
+    election), last-good bodies and the candle and news stores. Not
+    thread-sensitive, so concurrent requests don't queue for the one
+    sync_to_async thread; connections are released like a sync request's.
+    """
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+_aread_snapshot = _off_loop(_read_snapshot)
+_aohlcv_snapshot_response = _off_loop(_ohlcv_snapshot_response)
+_adepth_snapshot_response = _off_loop(_depth_snapshot_response)
+_atrades_snapshot_response = _off_loop(_trades_snapshot_response)
+_alast_good_response = _off_loop(_last_good_response)
+_alast_good_ticker_index = _off_loop(_last_good_ticker_index)
+_aohlcv_store_payload = _off_loop(_ohlcv_store_payload)
+_anews_store_response = _off_loop(_news_store_response)
+
+
+async def _abudgeted_get_json(
+    provider: str, path: str, url: str, headers: dict[str, str] | None = None, query: dict[str, str] | None = None,
+):
+    rate_limit.spend_upstream(provider, path, query)
+    with timing.upstream(provider):
+        payload = await async_http.get_json(url, headers)
+    upstream_fixtures.record(provider, url, payload)
+    return payload
+
+
+async def _acoinapi_get(path: str, query: dict[str, str]):
+    if not settings.COINAPI_KEY:
+        raise ValueError('COINAPI_KEY is missing')
+    url = f'{COINAPI_BASE_URL}{path}?{parse.urlencode(query)}'
+    return await market_cache.afetch(
+        'coinapi', path, query,
+        lambda: _abudgeted_get_json('coinapi', path, url, {'X-CoinAPI-Key': settings.COINAPI_KEY}),
+    )
+
+
+async def _abinance_get(path: str, query: dict[str, str]):
+    url = f'{BINANCE_BASE_URL}{path}?{parse.urlencode(query)}'
+    return await market_cache.afetch(
+        'binance', path, query, lambda: _abudgeted_get_json('binance', path, url, query=query),
+    )
+
+
+async def _acoingecko_get(path: str, query: dict[str, str]):
+    url = f'{COINGECKO_BASE_URL}{path}?{parse.urlencode(query)}'
+    return await market_cache.afetch('coingecko', path, query, lambda: _abudgeted_get_json('coingecko', path, url))
+
+
+async def _acryptocompare_news_get(query: dict[str, str]):
+    url = f'{CRYPTOCOMPARE_BASE_URL}/data/v2/news/?{parse.urlencode(query)}'
+    return await _abudgeted_get_json('cryptocompare', '/data/v2/news/', url, CRYPTOCOMPARE_HEADERS)
+
+
+@login_required(login_url='login')
+@rate_limited('ohlcv')
+@encodable('ohlcv')
+async def market_ohlcv(request):
+    params = _ohlcv_params(request)
+    snapshot_response = await _aohlcv_snapshot_response(params)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    pair = f'{params["base"]}{params["quote"]}'
+    interval = PERIOD_TO_INTERVAL.get(params['period'].upper())
+    if interval:
+        fmt = encodings.requested_format(request)
+        payload = await _aohlcv_store_payload(
+            pair, interval, params['binance_limit'], sync=not _ingestor_only(), raw=fmt != 'json',
+        )
+        if payload is not None:
+            return JsonResponse(payload) if fmt == 'json' else encodings.encode(payload, 'ohlcv', fmt)
+    if _ingestor_only():
+        return _not_ingested_response('candles')
+
+    async def coinapi():
+        return _coinapi_ohlcv_result(params['symbol'], await _acoinapi_get(*_coinapi_ohlcv_query(params)))
+
+    async def binance():
+        query = _klines_query(pair, interval or '1m', params['binance_limit'])
+        return _klines_result(pair, await _abinance_get('/api/v3/klines', query))
+
+    providers = [('coinapi', coinapi)] if settings.COINAPI_KEY else []
+    return JsonResponse(await router.aroute(providers + [('binance', binance)]))
+
+
+@login_required(login_url='login')
+@rate_limited('price')
+async def market_price(request):
+    asset_base = request.GET.get('base', 'BTC')
+    asset_quote = request.GET.get('quote', 'USD')
+
+    async def coinapi():
+        data = await _acoinapi_get(f'/v1/exchangerate/{asset_base}/{asset_quote}', {})
+        return {'ok': True, 'source': 'coinapi', 'data': data}
+
+    async def binance():
+        ticker = await _abinance_get('/api/v3/ticker/price', {'symbol': _binance_pair(asset_base, asset_quote)})
+        return _binance_price_result(asset_base, asset_quote, ticker)
+
+    providers = [('coinapi', coinapi)] if settings.COINAPI_KEY else []
+    return JsonResponse(await router.aroute(providers + [('binance', binance)]))
+
+
+@login_required(login_url='login')
+@rate_limited('depth')
+@conditional('depth')
+@encodable('depth')
+async def market_depth(request):
+    base = (request.GET.get('base') or 'BTC').upper()
+    quote = (request.GET.get('quote') or 'USDT').upper()
+    try:
+        limit = min(max(int(request.GET.get('limit', '30')), 5), 100)
+    except ValueError:
+        limit = 30
+
+    symbol = f'{base}{quote}'
+    snapshot_response = await _adepth_snapshot_response(symbol, limit)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    key = f'depth.{symbol}'
+    error = 'upstream unavailable'
+    if not last_good.is_failing(key):
+        try:
+            payload = await _abinance_get('/api/v3/depth', _depth_query(symbol, limit))
+            return _live_json(key, _depth_result(symbol, payload))
+        except Exception as exc:
+            error = exc
+    stale_response = await _alast_good_response(key, lambda: _depth_payload(symbol, limit), limit, ('asks', 'bids'))
+    if stale_response is not None:
+        return stale_response
+    return JsonResponse({'ok': False, 'error': f'Failed to load depth: {error}'}, status=502)
+
+
+@login_required(login_url='login')
+@rate_limited('tickers')
+@conditional('tickers')
+async def market_tickers(request):
+    if not request.GET.keys() - {'since'}:
+        snapshot = await _aread_snapshot('tickers')
+        if snapshot is not None:
+            return _snapshot_response(snapshot)
+
+    params = _tickers_params(request)
+    snapshot = await _aread_snapshot('tickers.index')
+    stale_age = None
+    if snapshot is not None:
+        index = ticker_index.for_snapshot(snapshot.version, snapshot.payload)
+    elif _ingestor_only():
+        return _not_ingested_response('tickers')
+    else:
+        index = None
+        error = 'upstream unavailable'
+        if not last_good.is_failing('tickers.index'):
+            try:
+                index = ticker_index.for_tickers(await _abinance_get('/api/v3/ticker/24hr', {}))
+                last_good.remember('tickers.index', index, index.encode)
+            except Exception as exc:
+                error = exc
+        if index is None:
+            stale = await _alast_good_ticker_index()
+            if stale is None:
+                return JsonResponse({'ok': False, 'error': f'Failed to load tickers: {error}'}, status=502)
+            index, stale_age = stale
+
+    try:
+        payload = _tickers_page_result(index, **params)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+    return JsonResponse(payload) if stale_age is None else _stale_response(payload, stale_age)
+
+
+@login_required(login_url='login')
+@rate_limited('trades')
+@encodable('trades')
+async def market_trades(request):
+    base = (request.GET.get('base') or 'BTC').upper()
+    quote = (request.GET.get('quote') or 'USDT').upper()
+    try:
+        limit = min(max(int(request.GET.get('limit', '20')), 10), 100)
+    except ValueError:
+        limit = 20
+
+    symbol = f'{base}{quote}'
+    snapshot_response = await _atrades_snapshot_response(symbol, limit)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    key = f'trades.{symbol}'
+    error = 'upstream unavailable'
+    if not last_good.is_failing(key):
+        try:
+            payload = await _abinance_get('/api/v3/trades', _trades_query(symbol, limit))
+            return _live_json(key, _trades_result(symbol, payload))
+        except Exception as exc:
+            error = exc
+    stale_response = await _alast_good_response(key, lambda: _trades_payload(symbol, limit), limit, ('rows',))
+    if stale_response is not None:
+        return stale_response
+    return JsonResponse({'ok': False, 'error': f'Failed to load trades: {error}'}, status=502)
+
+
+@login_required(login_url='login')
+@rate_limited('top_assets')
+async def top_assets(request):
+    snapshot = await _aread_snapshot('top_assets')
+    if snapshot is not None:
+        return _snapshot_response(snapshot)
+    if _ingestor_only():
+        return _not_ingested_response('top assets')
+
+    async def coingecko():
+        return _coingecko_assets_result(await _acoingecko_get('/api/v3/coins/markets', COINGECKO_MARKETS_QUERY))
+
+    async def binance():
+        return _binance_assets_result(await _abinance_get('/api/v3/ticker/24hr', {}))
+
+    try:
+        return JsonResponse(await router.aroute([('coingecko', coingecko), ('binance', binance)]))
+    except Exception as exc:
+        return JsonResponse({'ok': False, 'error': f'Failed to load top assets: {exc}'}, status=502)
+
+
+@login_required(login_url='login')
+@rate_limited('news')
+@conditional('news')
+async def market_news(request):
+    params = _news_params(request)
+    category = params['category']
+
+    if not params['q'] and not params['cursor'] and 'limit' not in request.GET:
+        snapshot = await _aread_snapshot(f'news.{category}')
+        if snapshot is not None:
+            return _snapshot_response(snapshot)
+
+    response = await _anews_store_response(params)
+    if response is not None:
+        return response
+
+    try:
+        if _ingestor_only():
+            raise ValueError('news not ingested yet')
+        rows = _news_rows(await _acryptocompare_news_get(_news_query(category)))
+        latest_rows = []
+        if _news_needs_latest(category, rows):
+            latest_rows = _news_rows(await _acryptocompare_news_get({'lang': 'EN'}))
+        return _news_fallback_response(params, _news_result(category, rows, latest_rows))
+    except (
+        HTTPError, URLError, TimeoutError, ValueError, json.JSONDecodeError, rate_limit.UpstreamBudgetExceeded,
+    ) as exc:
+        return _news_fallback_response(params, _news_fallback_payload(category, exc))
+
+
+@login_required(login_url='login')
+async def market_batch(request):
+    """Resolve several market sub-queries concurrently; one status per sub-query."""
+    try:
+        queries = _batch_queries(request)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+
+    async def run(index: int, query: dict) -> bytes:
+        try:
+            response = await BATCH_VIEWS[query['type']](_batch_subrequest(request, query))
+            return _batch_response_result(index, query, response)
+        except Exception as exc:
+            return _batch_error_result(index, query, 502, f'Failed to load {query["type"]}: {exc}')
+
+    return _batch_response(await asyncio.gather(*(run(index, query) for index, query in enumerate(queries))))
+
+
+BATCH_VIEWS = {
+    'price': market_price,
+    'depth': market_depth,
+    'trades': market_trades,
+    'ohlcv': market_ohlcv,
+    'tickers': market_tickers,
+    'top_assets': top_assets,
+    'news': market_news,
+}
+
+
+@login_required(login_url='login')
+@rate_limited('stream')
+async def market_stream(request):
+    """Server-Sent Events push for ``?channels=tickers,depth@BTCUSDT,...``."""
+    if not hasattr(request, 'scope'):
+        return JsonResponse({'ok': False, 'error': 'Streaming requires the ASGI server.'}, status=501)
+
+    names = list(dict.fromkeys(
+        name.strip() for name in (request.GET.get('channels') or '').split(',') if name.strip()
+    ))
+    if not names:
+        return JsonResponse({'ok': False, 'error': 'channels is required.'}, status=400)
+    if len(names) > settings.MARKET_PUSH_MAX_CHANNELS:
+        return JsonResponse({'ok': False, 'error': 'Too many channels.'}, status=400)
+    invalid = [name for name in names if push.channel_key(name) is None]
+    if invalid:
+        return JsonResponse({'ok': False, 'error': f'Unknown channel: {invalid[0]}'}, status=400)
+
+    response = StreamingHttpResponse(push.get_hub().subscribe(names), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,156 @@
+"""
+Local OHLCV candle store backed by ``core.models.Candle``.
+
+Bars are keyed by (symbol, interval, open_time) and filled incrementally from
+Binance klines: :func:`sync` asks upstream only for the bars after the last
+stored one (re-fetching that one, which may still be open) or, when the
+requested window has a hole, from the first missing bar. A window reaching
+back before the oldest bar upstream has (a symbol listed later, or history
+Binance no longer serves) starts at that bar instead, once a fetch has shown
+where it is. :func:`rows` serves a window with one range scan over the
+(symbol, interval, open_time) index.
+"""
+
+import time
+from typing import Callable
+
+from django.db.models import Count, Exists, Max, Min, OuterRef
+
+from . import market_cache
+from .models import Candle
+
+INTERVAL_MS: dict[str, int] = {
+    '1m': 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 3_600_000,
+    '4h': 4 * 3_600_000,
+    '1d': 86_400_000,
+    '1w': 7 * 86_400_000,
+}
+
+# Binance weekly bars open on Monday 00:00 UTC; the Unix epoch was a Thursday.
+WEEK_OFFSET_MS = 4 * 86_400_000
+MAX_KLINES_PER_REQUEST = 1000
+
+ROW_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+UPDATE_FIELDS = ['close_time', 'open', 'high', 'low', 'close', 'volume']
+
+# (symbol, interval) -> (monotonic time of last sync, oldest open_time it covered)
+_synced: dict[tuple[str, str], tuple[float, int]] = {}
+# (symbol, interval) -> open time of the oldest bar upstream serves
+_earliest: dict[tuple[str, str], int] = {}
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def bucket_start(ms: int, interval: str) -> int:
+    """Open time of the ``interval`` bar containing ``ms`` (UTC aligned)."""
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == '1w' else 0
+    return (ms - offset) // step * step + offset
+
+
+def window_start(interval: str, limit: int, at_ms: int | None = None) -> int:
+    """Open time of the oldest bar in the latest ``limit`` bars."""
+    at_ms = now_ms() if at_ms is None else at_ms
+    return bucket_start(at_ms, interval) - (limit - 1) * INTERVAL_MS[interval]
+
+
+def _resume_from(symbol: str, interval: str, start: int) -> int:
+    """First open time to fetch so that [start, now] has no holes (``start`` already clamped)."""
+    step = INTERVAL_MS[interval]
+    series = Candle.objects.filter(symbol=symbol, interval=interval)
+    stored = series.filter(open_time__gte=start).aggregate(
+        first=Min('open_time'), last=Max('open_time'), count=Count('open_time'),
+    )
+    if stored['first'] != start:
+        return start
+    if (stored['last'] - start) // step + 1 == stored['count']:
+        return stored['last']
+    # A hole: resume after the first stored bar whose successor is missing.
+    before_hole = (
+        series.filter(open_time__gte=start, open_time__lt=stored['last'])
+        .exclude(Exists(series.filter(open_time=OuterRef('open_time') + step)))
+        .order_by('open_time')
+        .values_list('open_time', flat=True)
+        .first()
+    )
+    return before_hole + step
+
+
+def store_klines(symbol: str, interval: str, klines: list) -> int:
+    """Upsert Binance kline rows; returns how many were written."""
+    Candle.objects.bulk_create(
+        [
+            Candle(
+                symbol=symbol,
+                interval=interval,
+                open_time=int(item[0]),
+                open=float(item[1]),
+                high=float(item[2]),
+                low=float(item[3]),
+                close=float(item[4]),
+                volume=float(item[5]),
+                close_time=int(item[6]),
+            )
+            for item in klines
+        ],
+        update_conflicts=True,
+        unique_fields=['symbol', 'interval', 'open_time'],
+        update_fields=UPDATE_FIELDS,
+    )
+    return len(klines)
+
+
+def sync(symbol: str, interval: str, limit: int, fetch_klines: Callable[[dict[str, str]], list]) -> int:
+    """Bring the latest ``limit`` bars up to date; returns the number of bars fetched.
+
+    ``fetch_klines`` takes a Binance ``/api/v3/klines`` query. Calls within the
+    klines cache TTL that need no older bars than the previous sync are skipped
+    without touching the database or upstream.
+    """
+    start = window_start(interval, limit)
+    key = (symbol, interval)
+    synced_at, covered = _synced.get(key, (0.0, None))
+    ttl = market_cache.ttl_for('binance', '/api/v3/klines')
+    if covered is not None and covered <= start and time.monotonic() - synced_at < ttl:
+        return 0
+
+    current = bucket_start(now_ms(), interval)
+    lower = max(start, _earliest.get(key, start))
+    resume = _resume_from(symbol, interval, lower)
+    fetched = 0
+    while True:
+        klines = fetch_klines({
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': str(resume),
+            'limit': str(MAX_KLINES_PER_REQUEST),
+        })
+        if not klines:
+            break
+        if resume == lower and int(klines[0][0]) > resume:
+            # Nothing upstream before this bar: later windows start here.
+            _earliest[key] = int(klines[0][0])
+        fetched += store_klines(symbol, interval, klines)
+        last_open = int(klines[-1][0])
+        if len(klines) < MAX_KLINES_PER_REQUEST or last_open >= current:
+            break
+        resume = last_open + INTERVAL_MS[interval]
+
+    _synced[key] = (time.monotonic(), start)
+    return fetched
+
+
+def rows(symbol: str, interval: str, limit: int) -> list[tuple]:
+    """Latest ``limit`` bars, oldest first, as Binance-kline-ordered tuples."""
+    newest = (
+        Candle.objects.filter(symbol=symbol, interval=interval)
+        .order_by('-open_time')
+        .values_list(*ROW_FIELDS)[:limit]
+    )
+    return list(reversed(newest))
@@ -0,0 +1,80 @@
+"""
+Content-Encoding negotiation and incremental gzip/brotli compressors.
+
+Shared by ``core.middleware.CompressionMiddleware`` (dynamic responses) and
+``core.storage`` / ``core.middleware.PrecompressedStaticMiddleware``
+(precompressed static files). Brotli is used when the optional ``brotli``
+package is installed; gzip always works.
+"""
+
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Preference order when the client accepts several with equal weight.
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+FILE_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def accepted_encodings(header: str) -> dict[str, float]:
+    """Parse Accept-Encoding into {coding: q}."""
+    accepted = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate(header: str, available=SUPPORTED_ENCODINGS) -> str | None:
+    """Best of ``available`` for an Accept-Encoding header, or None for identity."""
+    accepted = accepted_encodings(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class StreamCompressor:
+    """Compress a body chunk by chunk, flushing after each so every chunk is decodable on arrival."""
+
+    def __init__(self, coding: str, level: int | None = None) -> None:
+        self.coding = coding
+        if coding == 'br':
+            self._compressor = brotli.Compressor(quality=5 if level is None else level)
+        else:
+            self._compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.coding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.coding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, coding: str, level: int | None = None) -> bytes:
+    """One-shot compression of a whole body."""
+    if coding == 'br':
+        return brotli.compress(data, quality=5 if level is None else level)
+    compressor = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
@@ -0,0 +1,171 @@
+"""
+Strong ETags, conditional GET and ``since=<version>`` deltas for polled
+market endpoints.
+
+:func:`conditional` wraps a market view. Every 200 JSON response gets a
+version: ``v<seq>`` when it was served from a shared snapshot
+(``X-Snapshot-Version``), otherwise ``h<digest>`` of the body. The version is
+sent as a strong ETag and as ``X-Market-Version``. A matching
+``If-None-Match`` gets a bodiless 304. A client that passes
+``since=<version>`` gets only the rows or price levels that changed since
+that version, as long as this process still holds it in its short
+per-variant history; otherwise it gets the full body. Columnar and binary
+encodings (``core.encodings``) get ETags and 304s but no deltas.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+
+from .encodings import BINARY_CONTENT_TYPE
+
+MAX_VARIANTS = 512
+# Browsers revalidate with If-None-Match on every poll instead of guessing freshness.
+CACHE_CONTROL = 'private, no-cache'
+
+
+class _History:
+    """Recent bodies per response variant (endpoint kind + query), keyed by version."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._variants: OrderedDict[str, OrderedDict[str, bytes]] = OrderedDict()
+
+    def remember(self, variant: str, version: str, body: bytes) -> None:
+        with self._lock:
+            versions = self._variants.pop(variant, None) or OrderedDict()
+            self._variants[variant] = versions
+            versions[version] = body
+            versions.move_to_end(version)
+            while len(versions) > settings.MARKET_DELTA_HISTORY:
+                versions.popitem(last=False)
+            while len(self._variants) > MAX_VARIANTS:
+                self._variants.popitem(last=False)
+
+    def get(self, variant: str, version: str) -> bytes | None:
+        with self._lock:
+            versions = self._variants.get(variant)
+            return versions.get(version) if versions else None
+
+
+history = _History()
+
+
+def _levels_delta(old: list, new: list) -> list:
+    """Changed [price, qty] levels; levels that left the book come back with qty 0."""
+    old_levels = {str(price): qty for price, qty in old}
+    new_prices = set()
+    changed = []
+    for price, qty in new:
+        new_prices.add(str(price))
+        if old_levels.get(str(price)) != qty:
+            changed.append([price, qty])
+    changed.extend([price, '0'] for price in old_levels if price not in new_prices)
+    return changed
+
+
+def _rows_delta(old: list, new: list, key) -> dict:
+    """Changed rows, removed keys and the new order of keys."""
+    old_rows = {key(row): row for row in old}
+    order = [key(row) for row in new]
+    present = set(order)
+    return {
+        'rows': [row for row_key, row in zip(order, new) if old_rows.get(row_key) != row],
+        'removed': [row_key for row_key in old_rows if row_key not in present],
+        'order': order,
+    }
+
+
+def _news_key(row: dict) -> str:
+    return str(row.get('id') or row.get('url', '')) + '|' + str(row.get('title', ''))
+
+
+def diff(kind: str, old: dict, new: dict) -> dict:
+    if kind == 'depth':
+        changes = {
+            'asks': _levels_delta(old.get('asks', []), new.get('asks', [])),
+            'bids': _levels_delta(old.get('bids', []), new.get('bids', [])),
+        }
+    elif kind == 'tickers':
+        changes = _rows_delta(old.get('rows', []), new.get('rows', []), lambda row: row.get('symbol'))
+    else:
+        changes = _rows_delta(old.get('rows', []), new.get('rows', []), _news_key)
+    fields = {name: value for name, value in new.items() if name not in ('asks', 'bids', 'rows')}
+    return {**fields, **changes, 'delta': True}
+
+
+def _version(response: HttpResponse) -> str:
+    snapshot_version = response.get('X-Snapshot-Version')
+    if not snapshot_version:
+        return 'h' + hashlib.blake2b(response.content, digest_size=8).hexdigest()
+    fmt = response.get('X-Market-Format')
+    # One snapshot version, several representations (core.encodings).
+    return f'v{snapshot_version}-{fmt}' if fmt else f'v{snapshot_version}'
+
+
+def _variant(kind: str, request) -> str:
+    query = sorted((name, value) for name, value in request.GET.items() if name != 'since')
+    return f'{kind}?{query}'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Weak comparison: CompressionMiddleware sends the ETag back as W/"...".
+    return any(tag.strip().removeprefix('W/') in (etag, '*') for tag in header.split(','))
+
+
+def finalize(request, response: HttpResponse, kind: str) -> HttpResponse:
+    """Tag ``response`` with its version and answer If-None-Match / since= against it."""
+    content_type = response.get('Content-Type', '')
+    if response.status_code != 200 or not content_type.startswith(('application/json', BINARY_CONTENT_TYPE)):
+        return response
+    version = _version(response)
+    etag = f'"{version}"'
+    variant = _variant(kind, request)
+    history.remember(variant, version, response.content)
+
+    if _etag_matches(request.headers.get('If-None-Match', ''), etag):
+        not_modified = HttpResponseNotModified()
+        not_modified['ETag'] = etag
+        not_modified['X-Market-Version'] = version
+        not_modified['Cache-Control'] = CACHE_CONTROL
+        return not_modified
+
+    since = request.GET.get('since')
+    if since and 'X-Market-Format' not in response:
+        previous = history.get(variant, since)
+        if previous is not None:
+            payload = diff(kind, json.loads(previous), json.loads(response.content))
+            payload['since'] = since
+            payload['version'] = version
+            delta = JsonResponse(payload)
+            for header in ('X-Snapshot-Version', 'X-Snapshot-Age', 'X-Stale-Age'):
+                if header in response:
+                    delta[header] = response[header]
+            response = delta
+
+    response['ETag'] = etag
+    response['X-Market-Version'] = version
+    response['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def conditional(kind: str):
+    """Decorate a sync or async market view of ``kind`` (depth, tickers or news)."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return finalize(request, await view(request, *args, **kwargs), kind)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return finalize(request, view(request, *args, **kwargs), kind)
+        return wrapper
+    return decorator
@@ -0,0 +1,161 @@
+"""
+Compact encodings for the OHLCV, depth and trades market payloads.
+
+``format=json`` (the default) keeps the row-per-object payloads. With
+``format=columnar`` a payload's rows become ``columns``: one array per field,
+timestamps in epoch milliseconds. ``format=binary`` packs the same columns
+as little-endian int64/float64 buffers behind a small header, so the
+browser can wrap them in typed arrays without parsing
+(``static/js/market_codec.js``)::
+
+    '<4sHHI'   magic b'NXB1', layout version, column count, metadata length
+    metadata   UTF-8 JSON object: every non-row field of the payload
+    columns    per column '<cBI' (type 'q' int64 | 'd' float64, name length,
+               value count) followed by the ASCII name
+    padding    zero bytes up to a multiple of 8
+    buffers    each column's values, back to back, in descriptor order
+"""
+
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.http import HttpResponse, JsonResponse
+
+FORMATS = ('json', 'columnar', 'binary')
+BINARY_CONTENT_TYPE = 'application/vnd.nexus.columns'
+MAGIC = b'NXB1'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+COLUMN = struct.Struct('<cBI')
+ROW_FIELDS = ('rows', 'klines', 'asks', 'bids')
+
+
+def requested_format(request) -> str:
+    fmt = (request.GET.get('format') or 'json').lower()
+    return fmt if fmt in FORMATS else 'json'
+
+
+def _epoch_ms(value) -> int:
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).replace('Z', '+00:00')
+    head, dot, tail = text.partition('.')
+    if dot:
+        # CoinAPI sends 7 fractional digits; datetime takes at most 6.
+        digits = len(tail) - len(tail.lstrip('0123456789'))
+        text = f'{head}.{tail[:min(digits, 6)]}{tail[digits:]}'
+    return int(datetime.fromisoformat(text).timestamp() * 1000)
+
+
+def _ohlcv_columns(payload: dict) -> list[tuple[str, str, list]]:
+    if 'klines' in payload:
+        # Kline tuples straight from the candle store: (open_time, o, h, l, c, v, close_time).
+        klines = payload['klines']
+        times, opens, highs, lows, closes, volumes = (
+            [row[index] for row in klines] for index in range(6)
+        )
+    else:
+        rows = payload.get('rows') or []
+        times = [_epoch_ms(row.get('time_period_start')) for row in rows]
+        opens = [float(row.get('price_open') or 0) for row in rows]
+        highs = [float(row.get('price_high') or 0) for row in rows]
+        lows = [float(row.get('price_low') or 0) for row in rows]
+        closes = [float(row.get('price_close') or 0) for row in rows]
+        volumes = [float(row.get('volume_traded') or 0) for row in rows]
+    return [
+        ('time', 'q', times),
+        ('open', 'd', opens),
+        ('high', 'd', highs),
+        ('low', 'd', lows),
+        ('close', 'd', closes),
+        ('volume', 'd', volumes),
+    ]
+
+
+def _depth_columns(payload: dict) -> list[tuple[str, str, list]]:
+    columns = []
+    for side, prefix in (('asks', 'ask'), ('bids', 'bid')):
+        levels = payload.get(side) or []
+        columns.append((f'{prefix}_price', 'd', [float(price) for price, _ in levels]))
+        columns.append((f'{prefix}_qty', 'd', [float(qty) for _, qty in levels]))
+    return columns
+
+
+def _trades_columns(payload: dict) -> list[tuple[str, str, list]]:
+    rows = payload.get('rows') or []
+    return [
+        ('id', 'q', [int(row.get('id') or 0) for row in rows]),
+        ('time', 'q', [int(row.get('time') or 0) for row in rows]),
+        ('price', 'd', [float(row.get('price') or 0) for row in rows]),
+        ('qty', 'd', [float(row.get('qty') or 0) for row in rows]),
+        ('quote_qty', 'd', [float(row.get('quoteQty') or 0) for row in rows]),
+        ('buyer_maker', 'q', [1 if row.get('isBuyerMaker') else 0 for row in rows]),
+    ]
+
+
+COLUMN_BUILDERS = {'ohlcv': _ohlcv_columns, 'depth': _depth_columns, 'trades': _trades_columns}
+
+
+def _metadata(payload: dict, fmt: str) -> dict:
+    return {**{name: value for name, value in payload.items() if name not in ROW_FIELDS}, 'format': fmt}
+
+
+def pack(metadata: dict, columns: list[tuple[str, str, list]]) -> bytes:
+    meta = json.dumps(metadata, separators=(',', ':')).encode('utf-8')
+    parts = [HEADER.pack(MAGIC, LAYOUT_VERSION, len(columns), len(meta)), meta]
+    for name, kind, values in columns:
+        parts.append(COLUMN.pack(kind.encode('ascii'), len(name), len(values)))
+        parts.append(name.encode('ascii'))
+    size = sum(map(len, parts))
+    parts.append(b'\0' * (-size % 8))
+    for _, kind, values in columns:
+        buffer = array(kind, values)
+        if sys.byteorder == 'big':
+            buffer.byteswap()
+        parts.append(buffer.tobytes())
+    return b''.join(parts)
+
+
+def encode(payload: dict, kind: str, fmt: str) -> HttpResponse:
+    """Render ``payload`` of ``kind`` (ohlcv, depth or trades) as ``fmt``."""
+    columns = COLUMN_BUILDERS[kind](payload)
+    metadata = _metadata(payload, fmt)
+    if fmt == 'binary':
+        response = HttpResponse(pack(metadata, columns), content_type=BINARY_CONTENT_TYPE)
+    else:
+        response = JsonResponse({**metadata, 'columns': {name: values for name, _, values in columns}})
+    response['X-Market-Format'] = fmt
+    return response
+
+
+def _convert(request, response: HttpResponse, kind: str) -> HttpResponse:
+    fmt = requested_format(request)
+    if (fmt == 'json' or response.status_code != 200 or 'X-Market-Format' in response
+            or not response.get('Content-Type', '').startswith('application/json')):
+        return response
+    converted = encode(json.loads(response.content), kind, fmt)
+    for header in ('X-Snapshot-Version', 'X-Snapshot-Age', 'X-Stale-Age'):
+        if header in response:
+            converted[header] = response[header]
+    return converted
+
+
+def encodable(kind: str):
+    """Let a sync or async market view of ``kind`` answer ``format=columnar|binary``."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                return _convert(request, await view(request, *args, **kwargs), kind)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return _convert(request, view(request, *args, **kwargs), kind)
+        return wrapper
+    return decorator
@@ -0,0 +1,206 @@
+"""
+Last-known-good market payloads, persisted across restarts.
+
+Live market views :func:`remember` every payload they fetched successfully.
+When the upstream fails they serve the remembered payload instead, marked
+stale with its age, and :func:`serve_stale` starts one background refresher
+per key that retries the upstream every MARKET_LAST_GOOD_RETRY seconds.
+Until it succeeds, requests for that key skip the upstream and go straight
+to the stale payload, so an outage costs one failed call rather than one
+per request.
+
+Payloads are flushed to MARKET_LAST_GOOD_DIR at most every
+MARKET_LAST_GOOD_FLUSH_INTERVAL seconds, one file per key::
+
+    '<4sHQI'  magic b'NXLG', layout version, saved-at epoch ms, raw length
+    body      zlib-compressed payload bytes
+
+:func:`load` reads them back when the app starts. Bodies are only
+decompressed when first served.
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NXLG'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sHQI')
+SUFFIX = '.lkg'
+
+
+class _Entry:
+    """The latest good value for a key; bytes are produced lazily from ``value``."""
+
+    __slots__ = ('value', 'encode', 'saved_at_ms', 'payload', 'compressed', 'dirty')
+
+    def __init__(self, value: Any, encode: Callable[[], bytes] | None, saved_at_ms: int) -> None:
+        self.value = value
+        self.encode = encode
+        self.saved_at_ms = saved_at_ms
+        self.payload: bytes | None = value if encode is None else None
+        self.compressed: bytes | None = None
+        self.dirty = True
+
+    def body(self) -> bytes:
+        if self.payload is None:
+            if self.compressed is not None:
+                self.payload = zlib.decompress(self.compressed)
+            else:
+                self.payload = self.encode()
+        return self.payload
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.saved_at_ms / 1000)
+
+
+_lock = threading.Lock()
+_entries: dict[str, _Entry] = {}
+_refreshing: set[str] = set()
+_flusher: threading.Thread | None = None
+
+
+def _directory() -> Path:
+    return Path(settings.MARKET_LAST_GOOD_DIR)
+
+
+def _path(key: str) -> Path:
+    safe = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in key)
+    return _directory() / f'{safe}{SUFFIX}'
+
+
+def remember(key: str, value: Any, encode: Callable[[], bytes] | None = None) -> None:
+    """Record a good ``value`` for ``key``: bytes, or any object with an ``encode`` callable."""
+    now_ms = int(time.time() * 1000)
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry.value is value:
+            entry.saved_at_ms = now_ms  # same object from the upstream cache: still good
+        else:
+            _entries[key] = _Entry(value, encode, now_ms)
+    _ensure_flusher()
+
+
+def get(key: str) -> tuple[bytes, float] | None:
+    """The remembered payload for ``key`` and its age in seconds."""
+    with _lock:
+        entry = _entries.get(key)
+    if entry is None:
+        return None
+    return entry.body(), entry.age_seconds
+
+
+def is_failing(key: str) -> bool:
+    """Whether a background refresh is still waiting for ``key``'s upstream to recover."""
+    with _lock:
+        return key in _refreshing and key in _entries
+
+
+def serve_stale(key: str, refresh: Callable[[], tuple[Any, Callable[[], bytes] | None]]) -> tuple[bytes, float] | None:
+    """Return the last good payload for ``key`` and keep retrying ``refresh`` until it succeeds.
+
+    ``refresh`` returns the ``(value, encode)`` pair that :func:`remember` takes.
+    """
+    stale = get(key)
+    if stale is None:
+        return None
+    with _lock:
+        if key in _refreshing:
+            return stale
+        _refreshing.add(key)
+
+    def run() -> None:
+        try:
+            while True:
+                time.sleep(settings.MARKET_LAST_GOOD_RETRY)
+                try:
+                    remember(key, *refresh())
+                    return
+                except Exception:
+                    logger.debug('Upstream for %s still failing', key, exc_info=True)
+                finally:
+                    close_old_connections()
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f'last-good-{key}', daemon=True).start()
+    return stale
+
+
+def flush() -> int:
+    """Write changed entries to disk; returns how many files were written."""
+    with _lock:
+        dirty = [(key, entry) for key, entry in _entries.items() if entry.dirty]
+        for _, entry in dirty:
+            entry.dirty = False
+    if not dirty:
+        return 0
+    directory = _directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    for key, entry in dirty:
+        body = entry.body()
+        path = _path(key)
+        tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as fh:
+            fh.write(HEADER.pack(MAGIC, LAYOUT_VERSION, entry.saved_at_ms, len(body)))
+            fh.write(zlib.compress(body, 1))
+        os.replace(tmp_path, path)
+    return len(dirty)
+
+
+def _run_flusher() -> None:
+    while True:
+        time.sleep(settings.MARKET_LAST_GOOD_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            logger.warning('Could not persist last-known-good market payloads', exc_info=True)
+
+
+def _ensure_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run_flusher, name='last-good-flusher', daemon=True)
+            _flusher.start()
+
+
+def load() -> int:
+    """Read persisted payloads (still compressed) into memory; returns how many were loaded."""
+    directory = _directory()
+    if not directory.is_dir():
+        return 0
+    loaded = 0
+    for path in directory.glob(f'*{SUFFIX}'):
+        try:
+            data = path.read_bytes()
+            magic, layout, saved_at_ms, _ = HEADER.unpack_from(data, 0)
+        except (OSError, struct.error):
+            continue
+        if magic != MAGIC or layout != LAYOUT_VERSION:
+            continue
+        entry = _Entry(None, None, saved_at_ms)
+        entry.payload = None
+        entry.compressed = data[HEADER.size:]
+        entry.dirty = False
+        key = path.name[:-len(SUFFIX)]
+        with _lock:
+            current = _entries.get(key)
+            if current is None or current.saved_at_ms < saved_at_ms:
+                _entries[key] = entry
+                loaded += 1
+    return loaded
@@ -0,0 +1,394 @@
+"""
+In-process load benchmark of the dashboard pages and the market API.
+
+Simulated clients (one thread and one logged-in session each) follow the
+polling schedule of the real front end, sped up by a time-scale factor:
+
+* futures (``futures.js``): page load, one batch for tickers, depth and
+  candles, then tickers every 25 s, depth every 3.5 s, candles every 60 s;
+* overview (``overview.js``): page load, then a batch of 1DAY series for the
+  holdings every 60 s (its 4 s refresh goes to Binance directly);
+* dashboard: page load only.
+
+Every client signs in through ``LoginAccountView`` first, and some page
+sessions end with a ``PaymentCompleteView`` deposit. Upstream providers are
+replaced by :class:`StubUpstream`, which answers with synthetic payloads (or
+recorded fixtures, see ``core.upstream_fixtures``) after a configurable
+delay and counts calls per benchmark endpoint. :func:`run` returns per
+endpoint latency percentiles, requests/s, database queries and upstream
+calls per request.
+"""
+
+import asyncio
+import contextvars
+import json
+import math
+import platform
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qsl, urlsplit
+
+import django
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from . import async_http, market_cache, router, upstream_fixtures, views
+
+PASSWORD = 'bench-password-1!'
+SYMBOLS = ('BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'ADA', 'DOGE', 'AVAX', 'DOT', 'LINK')
+HOLDINGS = ('BTC', 'ETH', 'SOL')
+PAGE_MIX = (('futures', 0.5), ('overview', 0.3), ('dashboard', 0.2))
+# Application seconds one page stays open before the client navigates on.
+SESSION_SECONDS = 120.0
+PAYMENT_PROBABILITY = 0.2
+INTERVAL_MS = {'1m': 60_000, '5m': 300_000, '15m': 900_000, '1h': 3_600_000, '4h': 14_400_000, '1d': 86_400_000}
+
+_endpoint: contextvars.ContextVar[str] = contextvars.ContextVar('loadtest_endpoint', default='(background)')
+
+
+class _ContextExecutor(ThreadPoolExecutor):
+    """Runs tasks in the submitter's context, so hedged and batched calls keep their endpoint label."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class StubUpstream:
+    """Stand-in for every provider: synthetic or recorded payloads after ``latency`` seconds."""
+
+    def __init__(self, latency: float = 0.05, fixtures: Path | None = None, seed: int = 0) -> None:
+        self.latency = latency
+        self.fixtures = fixtures
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls: Counter[str] = Counter()
+        self.bases = {
+            'binance': views.BINANCE_BASE_URL,
+            'coinapi': views.COINAPI_BASE_URL,
+            'coingecko': views.COINGECKO_BASE_URL,
+            'cryptocompare': views.CRYPTOCOMPARE_BASE_URL,
+        }
+
+    def _route(self, url: str) -> tuple[str, str, dict[str, str]]:
+        for provider, base in self.bases.items():
+            if url.startswith(base):
+                parts = urlsplit(url[len(base):])
+                return provider, parts.path, dict(parse_qsl(parts.query))
+        raise ValueError(f'No stub for {url}')
+
+    def payload(self, url: str):
+        provider, path, query = self._route(url)
+        with self.lock:
+            self.calls[_endpoint.get()] += 1
+        if self.fixtures is not None:
+            body = upstream_fixtures.load(self.fixtures, provider, path, query)
+            if body is None:
+                raise ValueError(f'No fixture for {provider} {path}')
+            return json.loads(body)
+        return getattr(self, f'_{provider}')(path, query)
+
+    def get_json(self, url: str, headers: dict[str, str] | None = None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.payload(url)
+
+    async def aget_json(self, url: str, headers: dict[str, str] | None = None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.payload(url)
+
+    def _price(self, base: str) -> float:
+        return 100.0 * (SYMBOLS.index(base) + 1) if base in SYMBOLS else 1.0
+
+    def _binance(self, path: str, query: dict[str, str]):
+        now_ms = int(time.time() * 1000)
+        if path == '/api/v3/ticker/24hr':
+            pairs = [f'{base}USDT' for base in SYMBOLS] + [f'ALT{i}USDT' for i in range(390)] + ['ETHBTC']
+            return [{
+                'symbol': pair, 'lastPrice': f'{10 + i * 0.5:.4f}', 'priceChangePercent': f'{(i % 13) - 6:.2f}',
+                'highPrice': f'{11 + i * 0.5:.4f}', 'lowPrice': f'{9 + i * 0.5:.4f}', 'volume': f'{1000 + i}',
+                'quoteVolume': f'{(400 - i) * 1000.0:.2f}',
+            } for i, pair in enumerate(pairs)]
+        if path == '/api/v3/ticker/price':
+            return {'symbol': query.get('symbol', ''), 'price': f'{self._price(query.get("symbol", "")[:-4]):.2f}'}
+        if path == '/api/v3/depth':
+            mid = self._price(query.get('symbol', 'BTCUSDT')[:-4])
+            limit = int(query.get('limit', 100))
+            return {
+                'lastUpdateId': now_ms,
+                'asks': [[f'{mid + 0.01 * (i + 1):.2f}', f'{self.rng.uniform(0.1, 5):.4f}'] for i in range(limit)],
+                'bids': [[f'{mid - 0.01 * (i + 1):.2f}', f'{self.rng.uniform(0.1, 5):.4f}'] for i in range(limit)],
+            }
+        if path == '/api/v3/trades':
+            mid = self._price(query.get('symbol', 'BTCUSDT')[:-4])
+            return [{
+                'id': now_ms + i, 'price': f'{mid:.2f}', 'qty': '0.5', 'quoteQty': f'{mid / 2:.2f}',
+                'time': now_ms - i * 100, 'isBuyerMaker': i % 2 == 0,
+            } for i in range(int(query.get('limit', 500)))]
+        if path == '/api/v3/klines':
+            step = INTERVAL_MS.get(query.get('interval', '1m'), 60_000)
+            limit = int(query.get('limit', 500))
+            start = now_ms // step * step - (limit - 1) * step
+            mid = self._price(query.get('symbol', 'BTCUSDT')[:-4])
+            return [[
+                start + i * step, f'{mid:.2f}', f'{mid * 1.01:.2f}', f'{mid * 0.99:.2f}', f'{mid:.2f}', '10.0',
+                start + (i + 1) * step - 1, f'{mid * 10:.2f}', 42, '5.0', f'{mid * 5:.2f}', '0',
+            ] for i in range(limit)]
+        raise ValueError(f'No stub for binance {path}')
+
+    def _coinapi(self, path: str, query: dict[str, str]):
+        if path.startswith('/v1/exchangerate/'):
+            _, _, _, base, quote = path.split('/')[:5]
+            return {'asset_id_base': base, 'asset_id_quote': quote, 'rate': self._price(base)}
+        raise ValueError(f'No stub for coinapi {path}')
+
+    def _coingecko(self, path: str, query: dict[str, str]):
+        return [
+            {'symbol': base.lower(), 'name': f'{base} coin', 'image': f'https://example.invalid/{base}.png'}
+            for base in SYMBOLS
+        ]
+
+    def _cryptocompare(self, path: str, query: dict[str, str]):
+        now = int(time.time())
+        category = query.get('categories', 'BTC')
+        return {'Data': [{
+            'id': f'{category}-{i}', 'title': f'{category} market update {i}', 'body': f'{category} news body',
+            'url': f'https://example.invalid/news/{category}/{i}', 'published_on': now - i * 60,
+            'categories': category, 'source_info': {'name': 'bench'},
+        } for i in range(50)]}
+
+
+class Recorder:
+    """(latency, status, query count) samples per endpoint label."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[tuple[float, int, int]]] = defaultdict(list)
+
+    def add(self, label: str, latency: float, status: int, queries: int) -> None:
+        with self.lock:
+            self.samples[label].append((latency, status, queries))
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted ``values``."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class SimulatedClient:
+    """One browser: signs in, then opens pages and polls like the real front end."""
+
+    def __init__(self, index: int, email: str, speed: float, deadline: float, recorder: Recorder,
+                 measure_from: float) -> None:
+        self.email = email
+        self.speed = speed
+        self.deadline = deadline
+        self.recorder = recorder
+        self.measure_from = measure_from
+        self.rng = random.Random(index)
+        # A view exception is a 500 sample, not the end of this client.
+        self.client = Client(raise_request_exception=False)
+        self.base = SYMBOLS[index % len(SYMBOLS)]
+
+    def request(self, label: str, method: str, path: str, always: bool = False, **kwargs) -> int:
+        token = _endpoint.set(label)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(self.client, method)(path, **kwargs)
+                elapsed = time.perf_counter() - started
+        finally:
+            _endpoint.reset(token)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if always or started >= self.measure_from:
+            self.recorder.add(label, elapsed, response.status_code, len(queries.captured_queries))
+        return response.status_code
+
+    def _batch(self, queries: list[dict]) -> None:
+        self.request('api:batch', 'get', '/api/market/batch/', data={'queries': json.dumps(queries)})
+
+    def _page_polls(self, page: str) -> list[tuple[float, Callable[[], object]]]:
+        """(interval in app seconds, action) pairs polled while ``page`` is open."""
+        base = self.base
+        if page == 'futures':
+            return [
+                (25.0, lambda: self.request('api:tickers', 'get', '/api/market/tickers/')),
+                (3.5, lambda: self.request(
+                    'api:depth', 'get', '/api/market/depth/', data={'base': base, 'quote': 'USDT', 'limit': 30},
+                )),
+                (60.0, lambda: self.request(
+                    'api:ohlcv', 'get', '/api/market/ohlcv/',
+                    data={'base': base, 'quote': 'USDT', 'period_id': '1MIN', 'limit': 90},
+                )),
+            ]
+        if page == 'overview':
+            return [(60.0, self._overview_series)]
+        return []
+
+    def _overview_series(self) -> None:
+        self._batch([
+            {'id': symbol, 'type': 'ohlcv', 'base': symbol, 'quote': 'USDT', 'period_id': '1DAY', 'limit': 30}
+            for symbol in HOLDINGS
+        ])
+
+    def _open(self, page: str) -> None:
+        if page == 'futures':
+            self.request('page:futures_dashboard', 'get', '/dashboard/futures/')
+            self._batch([
+                {'id': 'tickers', 'type': 'tickers'},
+                {'id': 'depth', 'type': 'depth', 'base': self.base, 'quote': 'USDT', 'limit': 30},
+                {'id': 'candles', 'type': 'ohlcv', 'base': self.base, 'quote': 'USDT', 'period_id': '1MIN', 'limit': 90},
+            ])
+        elif page == 'overview':
+            self.request('page:overview', 'get', '/overview/')
+            self._overview_series()
+        else:
+            self.request('page:dashboard', 'get', '/dashboard/')
+
+    def _sleep_until(self, moment: float) -> bool:
+        delay = min(moment, self.deadline) - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return time.perf_counter() < self.deadline
+
+    def run(self) -> None:
+        try:
+            # Every client signs in once, during the warmup; record it anyway.
+            self.request('login', 'post', '/login/', always=True, data={'email': self.email, 'password': PASSWORD})
+            pages, weights = zip(*PAGE_MIX)
+            while time.perf_counter() < self.deadline:
+                page = self.rng.choices(pages, weights)[0]
+                opened = time.perf_counter()
+                self._open(page)
+                closes = opened + SESSION_SECONDS / self.speed
+                polls = self._page_polls(page)
+                due = [opened + interval / self.speed for interval, _ in polls]
+                while polls and min(due) < closes:
+                    slot = due.index(min(due))
+                    if not self._sleep_until(due[slot]):
+                        return
+                    polls[slot][1]()
+                    due[slot] += polls[slot][0] / self.speed
+                if not self._sleep_until(closes):
+                    return
+                if self.rng.random() < PAYMENT_PROBABILITY:
+                    self.request(
+                        'payment', 'post', '/wallet/payment/complete/',
+                        data=json.dumps({'amount': '25.00', 'method': 'Card'}), content_type='application/json',
+                    )
+        finally:
+            connection.close()
+
+
+def summarize(recorder: Recorder, upstream_calls: Counter, elapsed: float) -> dict:
+    endpoints = {}
+    total = []
+    for label in sorted(recorder.samples):
+        samples = recorder.samples[label]
+        total.extend(samples)
+        latencies = sorted(latency for latency, _, _ in samples)
+        endpoints[label] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, status, _ in samples if status >= 400),
+            'rps': len(samples) / elapsed,
+            'p50_ms': _percentile(latencies, 0.50) * 1000,
+            'p90_ms': _percentile(latencies, 0.90) * 1000,
+            'p99_ms': _percentile(latencies, 0.99) * 1000,
+            'max_ms': latencies[-1] * 1000,
+            'queries_per_request': sum(queries for _, _, queries in samples) / len(samples),
+            'upstream_calls': upstream_calls.get(label, 0),
+            'upstream_per_request': upstream_calls.get(label, 0) / len(samples),
+        }
+    latencies = sorted(latency for latency, _, _ in total)
+    return {
+        'endpoints': endpoints,
+        'total': {
+            'requests': len(total),
+            'errors': sum(1 for _, status, _ in total if status >= 400),
+            'rps': len(total) / elapsed,
+            'p50_ms': _percentile(latencies, 0.50) * 1000 if latencies else 0.0,
+            'p99_ms': _percentile(latencies, 0.99) * 1000 if latencies else 0.0,
+            'upstream_calls': sum(upstream_calls.values()),
+            'background_upstream_calls': upstream_calls.get('(background)', 0),
+        },
+    }
+
+
+def run(emails: list[str], duration: float, warmup: float, speed: float, stub: StubUpstream) -> dict:
+    """Drive one simulated client per email for ``warmup`` + ``duration`` seconds; returns the summary."""
+    recorder = Recorder()
+    patched = [
+        (views, '_http_get_json', stub.get_json),
+        (async_http, 'get_json', stub.aget_json),
+        (router, '_pool', _ContextExecutor(len(emails) + 8, thread_name_prefix='bench-router')),
+        (views, '_batch_pool', _ContextExecutor(len(emails) + 8, thread_name_prefix='bench-batch')),
+    ]
+    originals = [(module, name, getattr(module, name)) for module, name, _ in patched]
+    for module, name, value in patched:
+        setattr(module, name, value)
+    market_cache.clear()
+    try:
+        started = time.perf_counter()
+        measure_from = started + warmup
+        deadline = measure_from + duration
+        clients = [
+            SimulatedClient(index, email, speed, deadline, recorder, measure_from)
+            for index, email in enumerate(emails)
+        ]
+        threads = [threading.Thread(target=client.run, name=f'bench-client-{i}') for i, client in enumerate(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - measure_from
+    finally:
+        for module, name, value in originals:
+            if isinstance(getattr(module, name), _ContextExecutor):
+                getattr(module, name).shutdown(wait=False)
+            setattr(module, name, value)
+    summary = summarize(recorder, stub.calls, elapsed)
+    summary['meta'] = {
+        'clients': len(emails),
+        'duration_s': duration,
+        'warmup_s': warmup,
+        'speed': speed,
+        'upstream_latency_ms': stub.latency * 1000,
+        'fixtures': str(stub.fixtures) if stub.fixtures else None,
+        'async_views': settings.MARKET_ASYNC_VIEWS,
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'started_at': int(time.time() - elapsed - warmup),
+    }
+    return summary
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[tuple[str, str, float, float, bool]]:
+    """(endpoint, metric, baseline, current, regressed) for p50, p99 and requests/s."""
+    rows = []
+    for label, metrics in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(label)
+        if not before:
+            continue
+        for metric, higher_is_worse in (('p50_ms', True), ('p99_ms', True), ('rps', False)):
+            old, new = before[metric], metrics[metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            rows.append((label, metric, old, new, change > threshold if higher_is_worse else change < -threshold))
+    return rows
+
+
+def shape_differences(current: dict, baseline: dict) -> list[str]:
+    """Run parameters that differ between two results, which makes them incomparable."""
+    keys = ('clients', 'duration_s', 'speed', 'upstream_latency_ms', 'fixtures', 'async_views', 'database')
+    before, after = baseline.get('meta', {}), current.get('meta', {})
+    return [f'{key}: {before.get(key)} -> {after.get(key)}' for key in keys if before.get(key) != after.get(key)]
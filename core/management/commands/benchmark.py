@@ -0,0 +1,163 @@
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts import ledger
+from accounts.models import LedgerEntry, UserPreferences
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test the dashboard pages and market API in process: seeded users in a throwaway '
+        'database, stubbed upstream providers, and concurrent clients polling like futures.js '
+        'and overview.js. Reports p50/p90/p99 latency, requests/s, queries and upstream calls '
+        'per endpoint; --output saves JSON that --compare checks a later run against.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20, help='Concurrent simulated clients.')
+        parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds.')
+        parser.add_argument('--warmup', type=float, default=3.0, help='Seconds run before measuring starts.')
+        parser.add_argument(
+            '--speed',
+            type=float,
+            default=10.0,
+            help='Time-scale of the front-end polling intervals (10: depth every 0.35s instead of 3.5s).',
+        )
+        parser.add_argument('--upstream-latency', type=float, default=50.0, help='Stubbed provider delay in ms.')
+        parser.add_argument(
+            '--fixtures',
+            default=None,
+            help='Serve recorded provider fixtures (MARKET_UPSTREAM_RECORD=1) instead of synthetic payloads.',
+        )
+        parser.add_argument(
+            '--rate-limits',
+            action='store_true',
+            help='Keep the client and upstream rate limits on (off by default so they do not cap the load).',
+        )
+        parser.add_argument('--output', default=None, help='Write the results as JSON to this file.')
+        parser.add_argument('--compare', default=None, help='Earlier --output file to compare against.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.10,
+            help='Relative p50/p99 increase or requests/s drop counted as a regression.',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit non-zero when --compare finds a regression.',
+        )
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['duration'] <= 0 or options['speed'] <= 0:
+            raise CommandError('--clients, --duration and --speed must be positive.')
+        baseline = None
+        if options['compare']:
+            try:
+                baseline = json.loads(Path(options['compare']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f'Cannot read {options["compare"]}: {exc}') from exc
+
+        workdir = Path(tempfile.mkdtemp(prefix='nexus-benchmark-'))
+        overrides = override_settings(
+            DEBUG=False,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            CACHES={
+                alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+                for alias in settings.CACHES
+            },
+            # Pages render without a collectstatic manifest.
+            STORAGES={**settings.STORAGES, 'staticfiles': {
+                'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+            }},
+            STATIC_SERVE_PRECOMPRESSED=False,
+            MARKET_SNAPSHOT_DIR=workdir / 'snapshots',
+            MARKET_LAST_GOOD_DIR=workdir / 'last_good',
+            MARKET_UPSTREAM_RECORD=False,
+            RATE_LIMIT_ENABLED=options['rate_limits'],
+            RATE_LIMIT_FILE=workdir / 'rate_limit.bin',
+        )
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            # A file, not the shared in-memory test database: clients write concurrently.
+            connection.settings_dict['TEST']['NAME'] = str(workdir / 'benchmark.sqlite3')
+        self.stdout.write('Creating the benchmark database...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with overrides:
+                emails = self.seed_users(options['clients'])
+                stub = loadtest.StubUpstream(
+                    options['upstream_latency'] / 1000,
+                    Path(options['fixtures']) if options['fixtures'] else None,
+                )
+                self.stdout.write(
+                    f'Running {options["clients"]} clients for {options["warmup"]:g}s warmup + '
+                    f'{options["duration"]:g}s at {options["speed"]:g}x polling speed...'
+                )
+                results = loadtest.run(emails, options['duration'], options['warmup'], options['speed'], stub)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(f'Results written to {options["output"]}')
+        if baseline is not None:
+            regressions = self.report_comparison(results, baseline, options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{regressions} metrics regressed by more than {options["threshold"]:.0%}.')
+
+    def seed_users(self, count: int) -> list[str]:
+        User = get_user_model()
+        password = make_password(loadtest.PASSWORD)  # hash once; every seeded user shares it
+        users = User.objects.bulk_create([
+            User(email=f'bench{i}@example.invalid', username=f'bench{i}@example.invalid', password=password)
+            for i in range(count)
+        ])
+        UserPreferences.objects.bulk_create([UserPreferences(user=user) for user in users])
+        for user in users:
+            ledger.credit(user, Decimal('1000.00'), LedgerEntry.OPENING, 'benchmark')
+        return [user.email for user in users]
+
+    def report(self, results: dict) -> None:
+        header = (
+            f'{"endpoint":<26} {"requests":>8} {"errors":>6} {"req/s":>8} {"p50 ms":>8} {"p90 ms":>8} '
+            f'{"p99 ms":>8} {"queries":>8} {"upstream":>8}'
+        )
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        for label, row in results['endpoints'].items():
+            self.stdout.write(
+                f'{label:<26} {row["requests"]:>8} {row["errors"]:>6} {row["rps"]:>8.1f} {row["p50_ms"]:>8.1f} '
+                f'{row["p90_ms"]:>8.1f} {row["p99_ms"]:>8.1f} {row["queries_per_request"]:>8.2f} '
+                f'{row["upstream_per_request"]:>8.2f}'
+            )
+        total = results['total']
+        self.stdout.write(
+            f'total: {total["requests"]} requests, {total["errors"]} errors, {total["rps"]:.1f} req/s, '
+            f'p50 {total["p50_ms"]:.1f} ms, p99 {total["p99_ms"]:.1f} ms, '
+            f'{total["upstream_calls"]} upstream calls ({total["background_upstream_calls"]} in background)'
+        )
+
+    def report_comparison(self, results: dict, baseline: dict, threshold: float) -> int:
+        regressions = 0
+        self.stdout.write(f'\nCompared with the baseline (threshold {threshold:.0%}):')
+        for difference in loadtest.shape_differences(results, baseline):
+            self.stdout.write(self.style.WARNING(f'  run shape differs, {difference}'))
+        for label, metric, old, new, regressed in loadtest.compare(results, baseline, threshold):
+            regressions += regressed
+            line = f'{label:<26} {metric:<7} {old:>10.1f} -> {new:>10.1f} ({(new - old) / old:+.1%})'
+            self.stdout.write(self.style.ERROR(line + '  REGRESSION') if regressed else line)
+        return regressions
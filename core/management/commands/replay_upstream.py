@@ -0,0 +1,130 @@
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import upstream_fixtures
+
+
+class _Bucket:
+    """Requests per second allowed by the simulated provider limit."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve recorded upstream fixtures (MARKET_UPSTREAM_RECORD=1) as a local stand-in for '
+        'Binance, CoinAPI, CoinGecko and CryptoCompare, with optional latency, jitter, errors '
+        'and 429 rate limiting. Point MARKET_<PROVIDER>_BASE_URL at http://<addr>/<provider>.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addr', default='127.0.0.1', help='Interface to listen on.')
+        parser.add_argument('--port', type=int, default=8765, help='Port to listen on.')
+        parser.add_argument(
+            '--fixtures',
+            default=str(settings.MARKET_UPSTREAM_FIXTURES_DIR),
+            help='Directory of recorded fixtures.',
+        )
+        parser.add_argument('--latency', type=float, default=0.0, help='Base response delay in milliseconds.')
+        parser.add_argument('--jitter', type=float, default=0.0, help='Extra random delay of up to this many milliseconds.')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests (0-1) answered with 503.')
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=0.0,
+            help='Requests per second per provider before answering 429 with Retry-After (0: unlimited).',
+        )
+        parser.add_argument('--rate-limit-burst', type=float, default=10.0, help='Burst allowed by --rate-limit.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible jitter and errors.')
+
+    def handle(self, *args, **options):
+        root = Path(options['fixtures'])
+        if not root.is_dir():
+            raise CommandError(f'No fixtures in {root}; record some with MARKET_UPSTREAM_RECORD=1 first.')
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError('--error-rate must be between 0 and 1.')
+        rng = random.Random(options['seed'])
+        rng_lock = threading.Lock()
+        buckets = {
+            provider: _Bucket(options['rate_limit'], options['rate_limit_burst'])
+            for provider in upstream_fixtures.PROVIDERS
+        } if options['rate_limit'] > 0 else {}
+        latency = options['latency'] / 1000
+        jitter = options['jitter'] / 1000
+        error_rate = options['error_rate']
+        stdout = self.stdout
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _send(self, status: int, body: bytes, headers: dict[str, str] | None = None) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                provider, _, path = parts.path.lstrip('/').partition('/')
+                if provider not in upstream_fixtures.PROVIDERS:
+                    self._send(404, b'{"error":"unknown provider"}')
+                    return
+                with rng_lock:
+                    delay = latency + rng.uniform(0, jitter)
+                    failed = rng.random() < error_rate
+                if delay:
+                    time.sleep(delay)
+                bucket = buckets.get(provider)
+                retry_after = bucket.take() if bucket else 0.0
+                if retry_after:
+                    self._send(429, b'{"error":"rate limited"}', {'Retry-After': str(max(1, round(retry_after)))})
+                    return
+                if failed:
+                    self._send(503, b'{"error":"injected failure"}')
+                    return
+                body = upstream_fixtures.load(root, provider, '/' + path, dict(parse_qsl(parts.query)))
+                if body is None:
+                    self._send(404, b'{"error":"no fixture recorded"}')
+                    return
+                self._send(200, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options['addr'], options['port']), Handler)
+        server.daemon_threads = True
+        base = f'http://{options["addr"]}:{server.server_port}'
+        stdout.write(f'Replaying {root} on {base}; set:')
+        for provider in upstream_fixtures.PROVIDERS:
+            stdout.write(f'  MARKET_{provider.upper()}_BASE_URL={base}/{provider}')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
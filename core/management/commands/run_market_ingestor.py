@@ -0,0 +1,99 @@
+import asyncio
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import news_store, orderbook, snapshot_store, views
+
+
+class Command(BaseCommand):
+    help = (
+        'Continuously ingest market data (tickers, depth, trades, klines, CoinGecko markets '
+        'and CryptoCompare news) into the local snapshot store. Run with '
+        'MARKET_DATA_MODE=ingestor so the market API serves only from this state.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--symbols',
+            default=','.join(settings.MARKET_SNAPSHOT_SYMBOLS),
+            help='Comma-separated Binance symbols for depth, trades and klines.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Refresh every feed a single time and exit.',
+        )
+        parser.add_argument(
+            '--depth-stream',
+            action='store_true',
+            help='Maintain incremental order books from the diff-depth stream instead of polling depth.',
+        )
+
+    def build_feeds(self, symbols: list[str], depth_stream: bool = False) -> list[snapshot_store.Feed]:
+        intervals = settings.MARKET_INGESTOR_INTERVALS
+        kline_limit = settings.MARKET_INGESTOR_KLINE_LIMIT
+        feeds = views._snapshot_feeds(symbols, intervals)
+        if depth_stream:
+            feeds = [feed for feed in feeds if not feed.key.startswith('depth.')]
+        for symbol in symbols:
+            for interval in settings.MARKET_INGESTOR_KLINE_INTERVALS:
+                feeds.append(snapshot_store.Feed(
+                    f'ohlcv.{symbol}.{interval}', intervals['klines'],
+                    lambda symbol=symbol, interval=interval: self.candles_payload(symbol, interval, kline_limit),
+                ))
+        for category in views.NEWS_CATEGORIES:
+            feeds.append(snapshot_store.Feed(
+                f'news.{category}', intervals['news'],
+                lambda category=category: self.news_payload(category),
+            ))
+        return feeds
+
+    def news_payload(self, category: str) -> bytes:
+        # The ALL feed ingests into the news store; every category snapshot is a page of it.
+        if category == 'ALL':
+            news_store.sync(views._news_feed_rows, force=True)
+        payload = views._news_store_payload(category)
+        if payload is None:
+            raise ValueError('no news stored yet')
+        return views._encode_payload(payload)
+
+    def candles_payload(self, symbol: str, interval: str, limit: int) -> bytes:
+        # Keeps the local candle store current as a side effect.
+        payload = views._ohlcv_store_payload(symbol, interval, limit)
+        if payload is None:
+            raise ValueError(f'no candles stored for {symbol} {interval}')
+        return views._encode_payload(payload)
+
+    def handle(self, *args, **options):
+        logging.basicConfig(level=logging.INFO if options['verbosity'] > 1 else logging.WARNING)
+        symbols = [s.strip().upper() for s in options['symbols'].split(',') if s.strip()]
+        feeds = self.build_feeds(symbols, options['depth_stream'])
+        writer = snapshot_store.SnapshotWriter(feeds)
+
+        if options['once']:
+            writer.run_once({})
+            self.stdout.write(self.style.SUCCESS(f'Ingested {len(feeds)} feeds once.'))
+            return
+
+        self.stdout.write(
+            f'Ingesting {len(feeds)} feeds for {", ".join(symbols)} into {snapshot_store.snapshot_dir()} '
+            '(waiting for writer lock)...'
+        )
+        try:
+            if options['depth_stream']:
+                writer.start()
+                asyncio.run(self.run_depth_streams(writer, symbols))
+            else:
+                writer.run()
+        except KeyboardInterrupt:
+            writer.stop()
+            self.stdout.write('Market ingestor stopped.')
+
+    async def run_depth_streams(self, writer: snapshot_store.SnapshotWriter, symbols: list[str]) -> None:
+        # Only the elected writer may publish, so wait for the lock before streaming.
+        while not writer.is_leader:
+            await asyncio.sleep(0.5)
+        self.stdout.write(f'Streaming order books for {", ".join(symbols)}.')
+        await orderbook.run_depth_streams(symbols, asyncio.Event())
@@ -0,0 +1,211 @@
+"""
+In-process TTL cache for upstream market fetches.
+
+Every provider helper in ``core.views`` (``_binance_get``, ``_coinapi_get``,
+``_coingecko_get``) goes through :func:`fetch`. Entries are keyed by
+provider + path + normalized query and expire after a TTL chosen per
+endpoint class. Concurrent misses for the same key collapse into a single
+upstream call (single-flight); the other callers wait for and reuse its
+result. :func:`afetch` is the asyncio counterpart used by the async views;
+both share the same entries and counters.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+
+DEFAULT_TTLS: dict[str, float] = {
+    'tickers': 5.0,
+    'depth': 1.0,
+    'trades': 1.0,
+    'price': 2.0,
+    'ohlcv': 15.0,
+    'top_assets': 120.0,
+    'default': 2.0,
+}
+
+# (provider, path prefix) -> endpoint class. First match wins.
+ENDPOINT_CLASSES: tuple[tuple[str, str, str], ...] = (
+    ('binance', '/api/v3/ticker/24hr', 'tickers'),
+    ('binance', '/api/v3/ticker/price', 'price'),
+    ('binance', '/api/v3/depth', 'depth'),
+    ('binance', '/api/v3/trades', 'trades'),
+    ('binance', '/api/v3/klines', 'ohlcv'),
+    ('coinapi', '/v1/exchangerate/', 'price'),
+    ('coinapi', '/v1/ohlcv/', 'ohlcv'),
+    ('coingecko', '/api/v3/coins/markets', 'top_assets'),
+)
+
+MAX_ENTRIES = 4096
+
+CacheKey = tuple[str, str, tuple[tuple[str, str], ...]]
+
+
+class _Flight:
+    """A single upstream call that other callers may wait on."""
+
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+_lock = threading.Lock()
+_entries: dict[CacheKey, tuple[float, Any]] = {}
+_flights: dict[CacheKey, _Flight] = {}
+_async_flights: dict[tuple[int, CacheKey], asyncio.Task] = {}
+_counters = {'hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+
+
+def make_key(provider: str, path: str, query: dict[str, str]) -> CacheKey:
+    normalized = tuple(sorted((str(k), str(v)) for k, v in (query or {}).items()))
+    return provider, path, normalized
+
+
+def endpoint_class(provider: str, path: str) -> str:
+    for class_provider, prefix, name in ENDPOINT_CLASSES:
+        if provider == class_provider and path.startswith(prefix):
+            return name
+    return 'default'
+
+
+def ttl_for(provider: str, path: str) -> float:
+    ttls = {**DEFAULT_TTLS, **getattr(settings, 'MARKET_CACHE_TTLS', {})}
+    name = endpoint_class(provider, path)
+    return float(ttls.get(name, ttls['default']))
+
+
+def _evict_expired(now: float) -> None:
+    expired = [key for key, (expires_at, _) in _entries.items() if expires_at <= now]
+    for key in expired:
+        del _entries[key]
+    if len(_entries) >= MAX_ENTRIES:
+        # Still full of live entries: drop the ones closest to expiry.
+        for key, _ in sorted(_entries.items(), key=lambda item: item[1][0])[:MAX_ENTRIES // 4]:
+            del _entries[key]
+
+
+def fetch(provider: str, path: str, query: dict[str, str], loader: Callable[[], Any]) -> Any:
+    """Return a cached upstream payload, calling ``loader`` at most once per key and TTL."""
+    if not getattr(settings, 'MARKET_CACHE_ENABLED', True):
+        return loader()
+
+    key = make_key(provider, path, query)
+    ttl = ttl_for(provider, path)
+    now = time.monotonic()
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > now:
+            _counters['hits'] += 1
+            return entry[1]
+        flight = _flights.get(key)
+        if flight is not None:
+            _counters['coalesced'] += 1
+            leader = False
+        else:
+            _counters['misses'] += 1
+            flight = _Flight()
+            _flights[key] = flight
+            leader = True
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    try:
+        value = loader()
+    except BaseException as exc:
+        flight.error = exc
+        with _lock:
+            _counters['errors'] += 1
+            _flights.pop(key, None)
+        flight.done.set()
+        raise
+
+    flight.value = value
+    with _lock:
+        if ttl > 0:
+            if len(_entries) >= MAX_ENTRIES:
+                _evict_expired(time.monotonic())
+            _entries[key] = (time.monotonic() + ttl, value)
+        _flights.pop(key, None)
+    flight.done.set()
+    return value
+
+
+async def _aload(key: CacheKey, ttl: float, loader: Callable[[], Awaitable[Any]]) -> Any:
+    try:
+        value = await loader()
+    except BaseException:
+        with _lock:
+            _counters['errors'] += 1
+        raise
+    with _lock:
+        if ttl > 0:
+            if len(_entries) >= MAX_ENTRIES:
+                _evict_expired(time.monotonic())
+            _entries[key] = (time.monotonic() + ttl, value)
+    return value
+
+
+def _end_flight(flight_key: tuple[int, CacheKey], task: asyncio.Task) -> None:
+    if _async_flights.get(flight_key) is task:
+        del _async_flights[flight_key]
+    if not task.cancelled():
+        # Mark retrieved so an exception nobody awaited is not logged.
+        task.exception()
+
+
+async def afetch(provider: str, path: str, query: dict[str, str],
+                 loader: Callable[[], Awaitable[Any]]) -> Any:
+    """Async :func:`fetch`: concurrent misses on one event loop await a single ``loader()``.
+
+    The load runs as its own task that every waiter shields, so a cancelled
+    caller (e.g. a disconnected client) leaves the others and the load alone.
+    """
+    if not getattr(settings, 'MARKET_CACHE_ENABLED', True):
+        return await loader()
+
+    key = make_key(provider, path, query)
+    ttl = ttl_for(provider, path)
+    loop = asyncio.get_running_loop()
+    flight_key = (id(loop), key)
+
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _counters['hits'] += 1
+            return entry[1]
+        task = _async_flights.get(flight_key)
+        # A task left behind by a closed loop whose id was reused is not a flight.
+        if task is not None and task.get_loop() is loop:
+            _counters['coalesced'] += 1
+        else:
+            _counters['misses'] += 1
+            task = None
+
+    if task is None:
+        task = loop.create_task(_aload(key, ttl, loader))
+        _async_flights[flight_key] = task
+        task.add_done_callback(lambda done: _end_flight(flight_key, done))
+    return await asyncio.shield(task)
+
+
+def stats() -> dict[str, int]:
+    with _lock:
+        return {**_counters, 'entries': len(_entries), 'in_flight': len(_flights) + len(_async_flights)}
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        for counter in _counters:
+            _counters[counter] = 0
@@ -0,0 +1,210 @@
+"""
+Response compression, precompressed static file serving and request timing.
+"""
+
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from . import timing
+from .compression import FILE_SUFFIXES, SUPPORTED_ENCODINGS, StreamCompressor, compress, negotiate
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+TIMED_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+def _compressible(response) -> bool:
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    return content_type in settings.COMPRESSION_CONTENT_TYPES
+
+
+def _weaken_etag(response) -> None:
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    gzip or brotli, negotiated per request from Accept-Encoding.
+
+    Bodies under COMPRESSION_MIN_SIZE stay as they are. Streaming responses
+    (sync or async) are compressed chunk by chunk with a flush after each, so
+    clients see every chunk as soon as it is sent. text/html is left out of
+    COMPRESSION_CONTENT_TYPES by default: pages carry CSRF tokens, and
+    compressing them would expose the tokens to BREACH-style length attacks.
+    The SSE market stream (text/event-stream) is left out too.
+    """
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or response.status_code in (204, 304)
+                or 'no-transform' in response.get('Cache-Control', '') or not _compressible(response)):
+            return response
+        # The representation depends on Accept-Encoding even when it stays identity.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        coding = negotiate(request.headers.get('Accept-Encoding', ''))
+        if coding is None:
+            return response
+
+        if response.streaming:
+            compressor = StreamCompressor(coding)
+            if response.is_async:
+                original = response.streaming_content
+
+                async def compressed_stream():
+                    async for chunk in original:
+                        yield compressor.compress(chunk)
+                    yield compressor.finish()
+
+                response.streaming_content = compressed_stream()
+            else:
+                chunks = response.streaming_content
+
+                def compressed_chunks():
+                    for chunk in chunks:
+                        yield compressor.compress(chunk)
+                    yield compressor.finish()
+
+                response.streaming_content = compressed_chunks()
+            del response['Content-Length']
+        else:
+            compressed = compress(response.content, coding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # A compressed body is a different byte sequence; keep ETags comparable only weakly.
+        _weaken_etag(response)
+        response['Content-Encoding'] = coding
+        return response
+
+
+class PrecompressedStaticMiddleware(MiddlewareMixin):
+    """
+    Serve collected static files from STATIC_ROOT, choosing the ``.br`` or
+    ``.gz`` variant written by ``core.storage`` when the client accepts it.
+    Content-hashed names are cached for a year as immutable; the original
+    names get a short max-age and revalidate on Last-Modified.
+
+    Enabled by STATIC_SERVE_PRECOMPRESSED (on when DEBUG is off); under
+    DEBUG, runserver keeps serving from the app static directories.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_SERVE_PRECOMPRESSED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/')
+        self.root = Path(settings.STATIC_ROOT)
+        self._hashed_names = None
+
+    def _is_hashed(self, name: str) -> bool:
+        if self._hashed_names is None:
+            self._hashed_names = frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+        return name in self._hashed_names
+
+    def process_request(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path_info.startswith(self.prefix):
+            return None
+        name = posixpath.normpath(request.path_info[len(self.prefix):]).lstrip('/')
+        try:
+            path = Path(safe_join(self.root, name))
+        except SuspiciousFileOperation:
+            return None
+        if not path.is_file():
+            return None
+
+        stat = path.stat()
+        hashed = self._is_hashed(name)
+        variants = {
+            coding: path.with_name(path.name + FILE_SUFFIXES[coding])
+            for coding in SUPPORTED_ENCODINGS
+            if path.with_name(path.name + FILE_SUFFIXES[coding]).is_file()
+        }
+        if not hashed and not was_modified_since(request.headers.get('If-Modified-Since'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            coding = negotiate(request.headers.get('Accept-Encoding', ''), tuple(variants)) if variants else None
+            served = variants[coding] if coding else path
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(served.open('rb'), content_type=content_type or 'application/octet-stream')
+            if coding:
+                response['Content-Encoding'] = coding
+            response['Content-Length'] = str(served.stat().st_size)
+        if variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if hashed else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Time every request by phase (core.timing), observe it into the
+    ``/metrics/`` histograms under its URL name, and send the phases as a
+    ``Server-Timing`` header. Listed first, so ``total`` covers the other
+    middleware too; for streaming responses it is the time to headers.
+
+    SERVER_TIMING_HEADER picks who gets the header: 'staff' (default),
+    'all' or 'off'. It tells clients which calls were served from cache.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.audience = settings.SERVER_TIMING_HEADER
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = timing.begin()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.end(token)
+        header = self._finish(request, timings)
+        if self.audience == 'all' or (self.audience == 'staff' and self._is_staff(getattr(request, 'user', None))):
+            response['Server-Timing'] = header
+        return response
+
+    async def __acall__(self, request):
+        timings, token = timing.begin()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.end(token)
+        header = self._finish(request, timings)
+        if self.audience == 'all' or (
+            self.audience == 'staff' and hasattr(request, 'auser') and self._is_staff(await request.auser())
+        ):
+            response['Server-Timing'] = header
+        return response
+
+    def _finish(self, request, timings) -> str:
+        match = request.resolver_match
+        method = request.method if request.method in TIMED_METHODS else 'other'
+        return timing.finish(timings, match.view_name if match else 'unmatched', method)
+
+    @staticmethod
+    def _is_staff(user) -> bool:
+        return user is not None and user.is_authenticated and user.is_staff
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-18 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=20)),
+                ('interval', models.CharField(max_length=4)),
+                ('open_time', models.BigIntegerField(help_text='Bar open time in epoch milliseconds (UTC)')),
+                ('close_time', models.BigIntegerField(help_text='Bar close time in epoch milliseconds (UTC)')),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.FloatField()),
+            ],
+            options={
+                'ordering': ['symbol', 'interval', 'open_time'],
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'interval', 'open_time'), name='core_candle_series_open_time')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.9 on 2026-10-18 15:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsArticle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='Article URL, or provider id when it has none', max_length=500, unique=True)),
+                ('provider_id', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('published_on', models.BigIntegerField(help_text='Publication time in epoch seconds (UTC)')),
+                ('data', models.JSONField(help_text='The article as served by the news API')),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-published_on', '-id'],
+                'indexes': [models.Index(fields=['published_on', 'id'], name='core_news_published')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NewsToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=64)),
+                ('published_on', models.BigIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='core.newsarticle')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['token', 'published_on', 'article'], name='core_newstoken_postings')],
+                'constraints': [models.UniqueConstraint(fields=('token', 'article'), name='core_newstoken_token_article')],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+from django.db import models
+
+
+class Candle(models.Model):
+    """One OHLCV bar for a Binance symbol and kline interval."""
+    symbol = models.CharField(max_length=20)
+    interval = models.CharField(max_length=4)
+    open_time = models.BigIntegerField(help_text='Bar open time in epoch milliseconds (UTC)')
+    close_time = models.BigIntegerField(help_text='Bar close time in epoch milliseconds (UTC)')
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.FloatField()
+
+    class Meta:
+        ordering = ['symbol', 'interval', 'open_time']
+        constraints = [
+            # Also the index behind every (symbol, interval, open_time range) read.
+            models.UniqueConstraint(
+                fields=['symbol', 'interval', 'open_time'],
+                name='core_candle_series_open_time',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.symbol} {self.interval} @ {self.open_time}'
+
+
+class NewsArticle(models.Model):
+    """A CryptoCompare news article, deduplicated by URL (or provider id)."""
+    key = models.CharField(max_length=500, unique=True, help_text='Article URL, or provider id when it has none')
+    provider_id = models.CharField(max_length=64, blank=True, db_index=True)
+    published_on = models.BigIntegerField(help_text='Publication time in epoch seconds (UTC)')
+    data = models.JSONField(help_text='The article as served by the news API')
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-published_on', '-id']
+        indexes = [
+            # Keyset pagination over the unfiltered feed.
+            models.Index(fields=['published_on', 'id'], name='core_news_published'),
+        ]
+
+    def __str__(self):
+        return str(self.data.get('title') or self.key)
+
+
+class NewsToken(models.Model):
+    """Inverted index entry: one search token or category tag of an article."""
+    token = models.CharField(max_length=64)
+    article = models.ForeignKey(NewsArticle, on_delete=models.CASCADE, related_name='tokens')
+    # Copied from the article so a token's postings are read in feed order from the index.
+    published_on = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'article'], name='core_newstoken_token_article'),
+        ]
+        indexes = [
+            models.Index(fields=['token', 'published_on', 'article'], name='core_newstoken_postings'),
+        ]
+
+    def __str__(self):
+        return f'{self.token} -> {self.article_id}'
@@ -0,0 +1,260 @@
+"""
+Local news store backed by ``core.models.NewsArticle`` / ``NewsToken``.
+
+:func:`sync` pulls the CryptoCompare latest feed and each category feed,
+keeps articles it has not seen (deduplicated by URL, then provider id) and
+drops those older than MARKET_NEWS_RETENTION_DAYS. Every article is indexed
+under its title/body/category tokens and under a ``category:<name>`` tag for
+each category it matches, so category filters and ``q=`` searches are index
+lookups. :func:`page` walks one token's postings newest first with keyset
+cursors (published_on, article id), so paging back never calls upstream.
+"""
+
+import base64
+import json
+import logging
+import re
+import threading
+import time
+from typing import Callable
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import NewsArticle, NewsToken
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ('BTC', 'ETH', 'DEFI', 'REGULATION')
+# Keyword phrases (token sequences) that put an article in a category. A word
+# ending in '*' matches any token it starts ('regulat*': regulations,
+# regulatory, regulators). Short keywords stay whole words, so unlike the old
+# substring scan 'eth' no longer matches "method" nor 'sec' "second".
+CATEGORY_KEYWORDS: dict[str, tuple[tuple[str, ...], ...]] = {
+    'BTC': (('bitcoin*',), ('btc',)),
+    'ETH': (('ethereum*',), ('eth',)),
+    'DEFI': (('defi',), ('decentrali*', 'financ*'), ('dex',), ('dexs',), ('dexes',), ('yield*',)),
+    'REGULATION': (('regulat*',), ('sec',), ('complian*',), ('law',), ('laws',), ('lawsuit*',), ('polic*',)),
+}
+CATEGORY_TAG = 'category:'
+MAX_QUERY_TOKENS = 8
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'will', 'with',
+))
+
+_sync_lock = threading.Lock()
+_last_sync = 0.0
+_refreshing = threading.Event()
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens in order, stopwords included (phrases need them)."""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _article_text(row: dict) -> str:
+    return f'{row.get("title") or ""} {row.get("body") or ""} {row.get("categories") or ""}'
+
+
+def _word_matches(word: str, token: str) -> bool:
+    return token.startswith(word[:-1]) if word.endswith('*') else token == word
+
+
+def _has_phrase(tokens: list[str], token_set: set[str], phrase: tuple[str, ...]) -> bool:
+    if len(phrase) == 1:
+        word = phrase[0]
+        return any(_word_matches(word, token) for token in token_set) if word.endswith('*') else word in token_set
+    width = len(phrase)
+    return any(
+        all(_word_matches(word, token) for word, token in zip(phrase, tokens[i:i + width]))
+        for i in range(len(tokens) - width + 1)
+    )
+
+
+def categories_of(tokens: list[str]) -> list[str]:
+    token_set = set(tokens)
+    return [
+        category for category, phrases in CATEGORY_KEYWORDS.items()
+        if any(_has_phrase(tokens, token_set, phrase) for phrase in phrases)
+    ]
+
+
+def matches_category(row: dict, category: str) -> bool:
+    return category in categories_of(tokenize(_article_text(row)))
+
+
+def index_tokens(row: dict) -> set[str]:
+    """Every token an article is indexed under."""
+    tokens = tokenize(_article_text(row))
+    indexed = {token[:64] for token in tokens if token not in STOPWORDS}
+    indexed.update(CATEGORY_TAG + category.lower() for category in categories_of(tokens))
+    return indexed
+
+
+def query_tokens(q: str) -> list[str]:
+    tokens = [token for token in dict.fromkeys(tokenize(q)) if token not in STOPWORDS]
+    return [token[:64] for token in tokens[:MAX_QUERY_TOKENS]]
+
+
+def article_key(row: dict) -> str:
+    url = str(row.get('url') or row.get('guid') or '').strip()
+    if url:
+        return url.rstrip('/')[:500]
+    return f'id:{row.get("id")}'
+
+
+def _published_on(row: dict) -> int:
+    try:
+        return int(row.get('published_on') or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def store_articles(rows: list[dict]) -> int:
+    """Insert articles not stored yet and index them; returns how many were new."""
+    fresh: dict[str, dict] = {}
+    for row in rows:
+        if not isinstance(row, dict) or not (row.get('url') or row.get('id')):
+            continue
+        fresh.setdefault(article_key(row), row)
+    if not fresh:
+        return 0
+    provider_ids = {str(row['id']) for row in fresh.values() if row.get('id')}
+    seen = set(NewsArticle.objects.filter(key__in=fresh).values_list('key', flat=True))
+    seen_ids = set(NewsArticle.objects.filter(provider_id__in=provider_ids).values_list('provider_id', flat=True))
+    new = {
+        key: row for key, row in fresh.items()
+        if key not in seen and str(row.get('id') or '') not in seen_ids
+    }
+    if not new:
+        return 0
+    with transaction.atomic():
+        NewsArticle.objects.bulk_create(
+            [
+                NewsArticle(
+                    key=key,
+                    provider_id=str(row.get('id') or '')[:64],
+                    published_on=_published_on(row),
+                    data=row,
+                )
+                for key, row in new.items()
+            ],
+            ignore_conflicts=True,
+        )
+        # ignore_conflicts leaves primary keys unset; read them back (also covers a concurrent writer).
+        articles = NewsArticle.objects.filter(key__in=new).values_list('id', 'key', 'published_on')
+        NewsToken.objects.bulk_create(
+            [
+                NewsToken(token=token, article_id=article_id, published_on=published_on)
+                for article_id, key, published_on in articles
+                for token in index_tokens(new[key])
+            ],
+            ignore_conflicts=True,
+            batch_size=1000,
+        )
+    return len(new)
+
+
+def prune() -> int:
+    """Drop articles (and their index entries) past the retention window."""
+    cutoff = int(time.time()) - settings.MARKET_NEWS_RETENTION_DAYS * 86_400
+    deleted, _ = NewsArticle.objects.filter(published_on__lt=cutoff).delete()
+    return deleted
+
+
+def sync(fetch_rows: Callable[[dict[str, str]], list[dict]], force: bool = False) -> int:
+    """Ingest the latest and per-category feeds; at most once per MARKET_NEWS_REFRESH_INTERVAL."""
+    global _last_sync
+    with _sync_lock:
+        if not force and time.monotonic() - _last_sync < settings.MARKET_NEWS_REFRESH_INTERVAL and _last_sync:
+            return 0
+        rows = list(fetch_rows({'lang': 'EN'}))
+        for category in CATEGORIES:
+            try:
+                rows.extend(fetch_rows({'lang': 'EN', 'categories': category}))
+            except Exception:
+                logger.warning('News feed for %s failed', category, exc_info=True)
+        stored = store_articles(rows)
+        prune()
+        _last_sync = time.monotonic()
+        return stored
+
+
+def is_stale() -> bool:
+    return not _last_sync or time.monotonic() - _last_sync >= settings.MARKET_NEWS_REFRESH_INTERVAL
+
+
+def refresh_in_background(fetch_rows: Callable[[dict[str, str]], list[dict]]) -> None:
+    """Start one background :func:`sync` unless one is already running."""
+    if _refreshing.is_set():
+        return
+    _refreshing.set()
+
+    def run() -> None:
+        try:
+            sync(fetch_rows)
+        except Exception:
+            logger.warning('Background news refresh failed', exc_info=True)
+        finally:
+            connection.close()
+            _refreshing.clear()
+
+    threading.Thread(target=run, name='news-refresh', daemon=True).start()
+
+
+def has_articles() -> bool:
+    return NewsArticle.objects.exists()
+
+
+def _encode_cursor(published_on: int, article_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([published_on, article_id]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple[int, int]:
+    try:
+        published_on, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(published_on), int(article_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.') from None
+
+
+def page(category: str = 'ALL', q: str = '', limit: int = 36,
+         cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """Return (articles newest first, next cursor) for a category and/or search.
+
+    The first search token (else the category tag) drives the lookup: its
+    postings are read in (published_on, article) order from the
+    ``core_newstoken_postings`` index, and every other token is an existence
+    probe on the (token, article) unique index.
+    """
+    tokens = query_tokens(q)
+    if category != 'ALL':
+        tokens.append(CATEGORY_TAG + category.lower())
+    if tokens:
+        postings = NewsToken.objects.filter(token=tokens[0])
+        for token in tokens[1:]:
+            postings = postings.filter(Exists(NewsToken.objects.filter(token=token, article_id=OuterRef('article_id'))))
+        article_field = 'article_id'
+    else:
+        postings = NewsArticle.objects.all()
+        article_field = 'id'
+    if cursor:
+        published_on, article_id = _decode_cursor(cursor)
+        postings = postings.filter(
+            Q(published_on__lt=published_on) | Q(published_on=published_on, **{f'{article_field}__lt': article_id})
+        )
+    found = list(
+        postings.order_by('-published_on', f'-{article_field}').values_list(article_field, 'published_on')[:limit + 1]
+    )
+    ids = [article_id for article_id, _ in found[:limit]]
+    data = dict(NewsArticle.objects.filter(id__in=ids).values_list('id', 'data'))
+    # An article pruned since its postings were read is skipped.
+    rows = [data[article_id] for article_id in ids if article_id in data]
+    next_cursor = None
+    if len(found) > limit:
+        last_id, last_published_on = found[limit - 1]
+        next_cursor = _encode_cursor(last_published_on, last_id)
+    return rows, next_cursor
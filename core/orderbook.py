@@ -0,0 +1,247 @@
+"""
+Incremental order books kept current from Binance diff-depth updates.
+
+An :class:`OrderBook` is seeded from a REST ``/api/v3/depth`` snapshot and
+then advanced by sequenced diff events (``depthUpdate`` from the
+``<symbol>@depth`` stream). Each side keeps a binary heap of prices next to
+a price -> level dict: adding a level is O(log n), removing one is O(1)
+(its heap entry is dropped lazily), the best price is read off the heap
+top and top-N walks only the top of the heap, so queries never sort.
+
+:class:`DepthSync` drives one book per symbol following Binance's "how to
+manage a local order book" procedure, resyncing from a fresh snapshot on any
+sequence gap, and publishes the top of book into the shared snapshot store
+so every worker serves ``/api/market/depth/`` from it.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from heapq import heapify, heappop, heappush
+from itertools import accumulate, islice
+from urllib import parse
+
+from django.conf import settings
+
+from . import async_http, rate_limit, snapshot_store, timing, views, ws_client
+
+logger = logging.getLogger(__name__)
+
+
+class OrderBookGap(Exception):
+    """A diff update does not continue the book's sequence; a resync is needed."""
+
+
+class _Side:
+    """
+    One side of the book. Keys are signed so that the smallest is the best level.
+
+    ``heap`` holds each key at most once (``queued``); keys whose level was
+    removed stay in it until they surface at the top or the heap is rebuilt.
+    """
+
+    __slots__ = ('sign', 'heap', 'queued', 'levels')
+
+    def __init__(self, descending: bool) -> None:
+        self.sign = -1.0 if descending else 1.0
+        self.heap: list[float] = []
+        self.queued: set[float] = set()
+        self.levels: dict[float, tuple[str, str]] = {}
+
+    def clear(self) -> None:
+        self.heap.clear()
+        self.queued.clear()
+        self.levels.clear()
+
+    def set(self, price: str, qty: str) -> None:
+        key = self.sign * float(price)
+        if float(qty) == 0.0:
+            if self.levels.pop(key, None) is not None and len(self.heap) > 2 * len(self.levels) + 64:
+                # Mostly removed levels: rebuild (O(n), amortized over the removals).
+                self.heap = list(self.levels)
+                heapify(self.heap)
+                self.queued = set(self.levels)
+            return
+        if key not in self.queued:
+            heappush(self.heap, key)
+            self.queued.add(key)
+        self.levels[key] = (price, qty)
+
+    def _ordered(self):
+        """Live keys, best first, walking the heap top-down: O(k log k) for the first k."""
+        heap, levels = self.heap, self.levels
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            key, index = heappop(frontier)
+            if key in levels:
+                yield key
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heappush(frontier, (heap[child], child))
+
+    def top(self, n: int) -> list[list[str]]:
+        return [list(self.levels[key]) for key in islice(self._ordered(), n)]
+
+    def best(self) -> float | None:
+        heap = self.heap
+        while heap and heap[0] not in self.levels:
+            self.queued.discard(heappop(heap))
+        return self.sign * heap[0] if heap else None
+
+    def cumulative(self, n: int) -> list[float]:
+        return list(accumulate(float(self.levels[key][1]) for key in islice(self._ordered(), n)))
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+
+class OrderBook:
+    def __init__(self, symbol: str) -> None:
+        self.symbol = symbol
+        self.bids = _Side(descending=True)
+        self.asks = _Side(descending=False)
+        self.last_update_id = 0
+        self.synced = False
+        self.updated_at_ms = 0
+
+    def apply_snapshot(self, last_update_id: int, bids: list, asks: list) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in bids:
+            self.bids.set(price, qty)
+        for price, qty in asks:
+            self.asks.set(price, qty)
+        self.last_update_id = int(last_update_id)
+        self.synced = False
+        self.updated_at_ms = int(time.time() * 1000)
+
+    def apply_diff(self, first_id: int, final_id: int, bids: list, asks: list) -> bool:
+        """Apply one diff event; return False if it predates the book, raise on a gap."""
+        if final_id <= self.last_update_id:
+            return False
+        if self.synced:
+            if first_id != self.last_update_id + 1:
+                raise OrderBookGap(f'{self.symbol}: expected {self.last_update_id + 1}, got {first_id}')
+        elif not first_id <= self.last_update_id + 1 <= final_id:
+            raise OrderBookGap(f'{self.symbol}: first event {first_id}-{final_id} misses {self.last_update_id + 1}')
+        for price, qty in bids:
+            self.bids.set(price, qty)
+        for price, qty in asks:
+            self.asks.set(price, qty)
+        self.last_update_id = final_id
+        self.synced = True
+        self.updated_at_ms = int(time.time() * 1000)
+        return True
+
+    def spread(self) -> float | None:
+        bid, ask = self.bids.best(), self.asks.best()
+        return None if bid is None or ask is None else ask - bid
+
+    def mid(self) -> float | None:
+        bid, ask = self.bids.best(), self.asks.best()
+        return None if bid is None or ask is None else (ask + bid) / 2
+
+    def depth_payload(self, limit: int) -> dict:
+        """Same shape as ``core.views._depth_result`` plus top-of-book statistics."""
+        return {
+            'ok': True,
+            'source': 'orderbook',
+            'symbol': self.symbol,
+            'asks': self.asks.top(limit),
+            'bids': self.bids.top(limit),
+            'lastUpdateId': self.last_update_id,
+            'bestBid': self.bids.best(),
+            'bestAsk': self.asks.best(),
+            'spread': self.spread(),
+            'mid': self.mid(),
+            'cumulative': {
+                'asks': self.asks.cumulative(limit),
+                'bids': self.bids.cumulative(limit),
+            },
+        }
+
+
+class DepthSync:
+    """Keep an :class:`OrderBook` in sync with the Binance diff-depth stream."""
+
+    def __init__(self, symbol: str, publish_limit: int | None = None) -> None:
+        self.book = OrderBook(symbol)
+        self.publish_limit = publish_limit or settings.MARKET_SNAPSHOT_DEPTH_LIMIT
+        self.publish_interval = settings.MARKET_ORDERBOOK_PUBLISH_INTERVAL
+        self._last_publish = 0.0
+
+    @property
+    def stream_url(self) -> str:
+        return f'{settings.MARKET_ORDERBOOK_STREAM_URL}/{self.book.symbol.lower()}@depth@100ms'
+
+    async def _fetch_snapshot(self) -> dict:
+        query = {'symbol': self.book.symbol, 'limit': str(settings.MARKET_ORDERBOOK_SNAPSHOT_LIMIT)}
+        rate_limit.spend_upstream('binance', '/api/v3/depth', query)
+        with timing.upstream('binance'):
+            return await async_http.get_json(f'{views.BINANCE_BASE_URL}/api/v3/depth?{parse.urlencode(query)}')
+
+    def publish(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_publish < self.publish_interval:
+            return
+        self._last_publish = now
+        payload = json.dumps(self.book.depth_payload(self.publish_limit), separators=(',', ':'))
+        snapshot_store.publish(f'depth.{self.book.symbol}', payload.encode('utf-8'))
+
+    async def _resync(self, socket: ws_client.WebSocket, buffered: list[dict]) -> None:
+        """Seed the book from REST, replaying buffered events that arrived meanwhile."""
+        while True:
+            snapshot = await self._fetch_snapshot()
+            if not buffered or int(snapshot['lastUpdateId']) >= buffered[0]['U'] - 1:
+                break
+            buffered.append(json.loads(await socket.recv()))
+        self.book.apply_snapshot(snapshot['lastUpdateId'], snapshot['bids'], snapshot['asks'])
+        for event in buffered:
+            self.book.apply_diff(event['U'], event['u'], event['b'], event['a'])
+        buffered.clear()
+        self.publish(force=True)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        backoff = 1.0
+        while not stop.is_set():
+            try:
+                socket = await ws_client.connect(self.stream_url)
+            except OSError:
+                logger.warning('Depth stream %s unavailable; retrying', self.book.symbol, exc_info=True)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            retry_after = 0.0
+            try:
+                await self._consume(socket, stop)
+            except (OSError, asyncio.IncompleteReadError, OrderBookGap, KeyError, ValueError):
+                logger.warning('Depth stream %s dropped; resyncing', self.book.symbol, exc_info=True)
+            except rate_limit.UpstreamBudgetExceeded as exc:
+                # Events would pile up while waiting for the budget: drop the stream, resync after.
+                logger.warning(
+                    'Depth snapshot for %s over budget; resyncing in %.1fs', self.book.symbol, exc.retry_after,
+                )
+                retry_after = exc.retry_after
+            finally:
+                await socket.close()
+            if retry_after:
+                await asyncio.sleep(retry_after)
+
+    async def _consume(self, socket: ws_client.WebSocket, stop: asyncio.Event) -> None:
+        buffered = [json.loads(await socket.recv())]
+        await self._resync(socket, buffered)
+        while not stop.is_set():
+            event = json.loads(await socket.recv())
+            try:
+                self.book.apply_diff(event['U'], event['u'], event['b'], event['a'])
+            except OrderBookGap:
+                logger.info('Order book gap on %s; resyncing', self.book.symbol)
+                await self._resync(socket, [event])
+                continue
+            self.publish()
+
+
+async def run_depth_streams(symbols: list[str], stop: asyncio.Event) -> None:
+    await asyncio.gather(*(DepthSync(symbol).run(stop) for symbol in symbols))
@@ -0,0 +1,166 @@
+"""
+Server-Sent Events fan-out for market channels on the ASGI app.
+
+Clients subscribe to channels such as ``tickers``, ``top_assets``,
+``depth@BTCUSDT`` or ``trades@BTCUSDT``. Each event loop runs one
+:class:`Hub` that, every MARKET_PUSH_TICK seconds, checks the source of each
+channel that has subscribers and, when it changed, encodes one SSE frame
+that every subscriber shares. Subscribers always receive the newest frame
+per channel, so a slow consumer skips intermediate updates instead of
+queueing them: CPU and bandwidth follow the update rate, not clients times
+poll rate.
+
+Sources are the shared snapshot segments when MARKET_DATA_MODE is
+``shared``/``ingestor``, read for all channels in one executor call per tick
+(reads map files and may run writer election, so never on the loop).
+Otherwise, or for symbols without a snapshot, the hub itself polls the view
+builders (through the upstream cache) once per channel.
+"""
+
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import async_http, views
+
+HEARTBEAT = b': keep-alive\n\n'
+CHANNEL_KINDS = ('tickers', 'top_assets', 'depth', 'trades')
+
+
+def channel_key(channel: str) -> str | None:
+    """Map a public channel name to its snapshot key, or None if unknown."""
+    kind, _, symbol = channel.partition('@')
+    if kind not in CHANNEL_KINDS:
+        return None
+    if kind in ('depth', 'trades'):
+        if not symbol.isalnum():
+            return None
+        return f'{kind}.{symbol.upper()}'
+    return None if symbol else kind
+
+
+def _live_producer(key: str):
+    kind, _, symbol = key.partition('.')
+    if kind == 'tickers':
+        return lambda: views._encode_payload(views._tickers_payload())
+    if kind == 'top_assets':
+        return lambda: views._encode_payload(views._top_assets_payload())
+    if kind == 'depth':
+        return lambda: views._encode_payload(views._depth_payload(symbol, settings.MARKET_SNAPSHOT_DEPTH_LIMIT))
+    return lambda: views._encode_payload(views._trades_payload(symbol, settings.MARKET_SNAPSHOT_TRADES_LIMIT))
+
+
+def _read_snapshots(keys: list[str]) -> list:
+    return [views._read_snapshot(key) for key in keys]
+
+
+class _Channel:
+    __slots__ = ('name', 'key', 'version', 'payload', 'frame', 'subscribers', 'next_poll', 'updated')
+
+    def __init__(self, name: str, key: str) -> None:
+        self.name = name
+        self.key = key
+        self.version = 0
+        self.payload = b''
+        self.frame = b''
+        self.subscribers = 0
+        self.next_poll = 0.0
+        self.updated = asyncio.Event()
+
+
+class Hub:
+    def __init__(self) -> None:
+        self.channels: dict[str, _Channel] = {}
+        self._task: asyncio.Task | None = None
+
+    def _channel(self, name: str, key: str) -> _Channel:
+        channel = self.channels.get(name)
+        if channel is None:
+            channel = self.channels[name] = _Channel(name, key)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._pump())
+        return channel
+
+    def _set_frame(self, channel: _Channel, version: int, payload: bytes) -> None:
+        channel.version = version
+        channel.payload = payload
+        channel.frame = (
+            f'id: {version}\nevent: {channel.name}\ndata: '.encode('utf-8') + payload + b'\n\n'
+        )
+        event, channel.updated = channel.updated, asyncio.Event()
+        event.set()
+
+    async def _refresh(self, channel: _Channel, snapshot) -> None:
+        if snapshot is not None:
+            if snapshot.version != channel.version:
+                self._set_frame(channel, snapshot.version, snapshot.payload)
+            return
+        if views._ingestor_only():
+            return
+
+        now = time.monotonic()
+        if now < channel.next_poll:
+            return
+        kind = channel.key.partition('.')[0]
+        channel.next_poll = now + settings.MARKET_SNAPSHOT_INTERVALS[kind]
+        try:
+            payload = await sync_to_async(_live_producer(channel.key), thread_sensitive=False)()
+        except Exception:
+            return
+        if payload != channel.payload:
+            self._set_frame(channel, channel.version + 1, payload)
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self.channels.clear()
+
+    async def _pump(self) -> None:
+        while self.channels:
+            for name, channel in list(self.channels.items()):
+                if channel.subscribers <= 0:
+                    del self.channels[name]
+            channels = list(self.channels.values())
+            if channels:
+                snapshots = await sync_to_async(_read_snapshots, thread_sensitive=False)(
+                    [channel.key for channel in channels]
+                )
+                for channel, snapshot in zip(channels, snapshots):
+                    await self._refresh(channel, snapshot)
+            await asyncio.sleep(settings.MARKET_PUSH_TICK)
+
+    async def subscribe(self, names: list[str]):
+        """Yield SSE frames for ``names`` until the client goes away."""
+        channels = [self._channel(name, channel_key(name)) for name in names]
+        for channel in channels:
+            channel.subscribers += 1
+        sent = {channel.name: 0 for channel in channels}
+        try:
+            yield b'retry: 3000\n\n'
+            while True:
+                pending = [c for c in channels if c.version != sent[c.name] and c.frame]
+                if not pending:
+                    waiters = [asyncio.ensure_future(c.updated.wait()) for c in channels]
+                    try:
+                        await asyncio.wait(waiters, timeout=settings.MARKET_PUSH_HEARTBEAT,
+                                           return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        for waiter in waiters:
+                            waiter.cancel()
+                    if not any(c.version != sent[c.name] and c.frame for c in channels):
+                        yield HEARTBEAT
+                    continue
+                for channel in pending:
+                    # Only the newest frame is sent: updates made while this client was
+                    # still writing the previous one are coalesced.
+                    sent[channel.name] = channel.version
+                    yield channel.frame
+        finally:
+            for channel in channels:
+                channel.subscribers -= 1
+
+
+def get_hub() -> Hub:
+    return async_http.loop_local('push.hub', Hub, Hub.close)
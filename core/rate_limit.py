@@ -0,0 +1,216 @@
+"""
+Token buckets shared by every worker process on a host.
+
+Buckets live in a memory-mapped table at RATE_LIMIT_FILE::
+
+    '<4sHI'   magic b'NXRL', layout version, slot count
+    slots     '<Qdd' key hash, tokens, last refill (epoch seconds)
+
+A key hashes to a slot and probes at most PROBE_SLOTS neighbours, so a
+check is a few memory reads and writes under an exclusive ``flock`` on the
+table: O(1) whatever the number of clients. When every probed slot is taken
+the least recently used one is recycled.
+
+:func:`rate_limited` gives each user (or client address) a budget per
+market endpoint from RATE_LIMITS and answers 429 with ``Retry-After`` once
+it is spent. :func:`spend_upstream` charges one global budget per provider
+from UPSTREAM_RATE_LIMITS, in the provider's own request weight, before
+every upstream call, so the app as a whole stays under provider limits.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: buckets are then per process
+    fcntl = None
+
+MAGIC = b'NXRL'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sHI')
+SLOT = struct.Struct('<Qdd')
+PROBE_SLOTS = 8
+
+# Request weight of upstream endpoints, by path prefix; anything else weighs 1.
+# Weights given as (up to limit, weight) steps depend on the ``limit`` query
+# parameter; a missing limit takes the first step (the provider's default).
+UPSTREAM_WEIGHTS: dict[str, tuple[tuple[str, float | tuple[tuple[int, float], ...]], ...]] = {
+    'binance': (
+        ('/api/v3/ticker/24hr', 80),
+        ('/api/v3/trades', 25),
+        ('/api/v3/depth', ((100, 5), (500, 25), (1000, 50), (5000, 250))),
+        ('/api/v3/klines', 2),
+        ('/api/v3/ticker/price', 2),
+    ),
+}
+
+
+class UpstreamBudgetExceeded(Exception):
+    """The shared budget for an upstream provider is spent for now."""
+
+    def __init__(self, provider: str, retry_after: float) -> None:
+        super().__init__(f'{provider} request budget exhausted, retry in {retry_after:.1f}s')
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class _Table:
+    """The mapped bucket table of this process."""
+
+    def __init__(self, path: Path, slots: int) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = HEADER.size + slots * SLOT.size
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._lock()
+        try:
+            if os.fstat(self.fd).st_size != size:
+                os.ftruncate(self.fd, size)
+            self.map = mmap.mmap(self.fd, size)
+            if HEADER.unpack_from(self.map, 0) != (MAGIC, LAYOUT_VERSION, slots):
+                # New file, or one laid out differently: start with every bucket empty.
+                self.map[:] = bytes(size)
+                HEADER.pack_into(self.map, 0, MAGIC, LAYOUT_VERSION, slots)
+        finally:
+            self._unlock()
+        self.slots = slots
+        self.pid = os.getpid()
+
+    def _lock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def _unlock(self) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def take(self, key_hash: int, rate: float, burst: float, cost: float, now: float) -> float:
+        start = key_hash % self.slots
+        self._lock()
+        try:
+            victim = None
+            victim_updated = math.inf
+            for step in range(PROBE_SLOTS):
+                offset = HEADER.size + (start + step) % self.slots * SLOT.size
+                slot_hash, tokens, updated = SLOT.unpack_from(self.map, offset)
+                if slot_hash == key_hash:
+                    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+                    break
+                if updated < victim_updated:
+                    victim, victim_updated = offset, updated
+            else:
+                offset, tokens = victim, burst
+            if tokens >= cost:
+                SLOT.pack_into(self.map, offset, key_hash, tokens - cost, now)
+                return 0.0
+            SLOT.pack_into(self.map, offset, key_hash, tokens, now)
+            return (cost - tokens) / rate
+        finally:
+            self._unlock()
+
+
+_table: _Table | None = None
+_table_lock = threading.Lock()
+
+
+def _get_table() -> _Table:
+    global _table
+    table = _table
+    # A forked worker must not share its parent's open file: flock would not exclude it.
+    if table is None or table.pid != os.getpid():
+        with _table_lock:
+            if _table is None or _table.pid != os.getpid():
+                _table = _Table(Path(settings.RATE_LIMIT_FILE), settings.RATE_LIMIT_SLOTS)
+            table = _table
+    return table
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+def take(key: str, rate: float, burst: float, cost: float = 1.0) -> float:
+    """Spend ``cost`` tokens from ``key``'s bucket; 0 if allowed, else seconds until it would be."""
+    if not settings.RATE_LIMIT_ENABLED or rate <= 0:
+        return 0.0
+    table = _get_table()
+    with _table_lock:
+        return table.take(_hash(key), rate, burst, cost, time.time())
+
+
+def upstream_weight(provider: str, path: str, query: dict | None = None) -> float:
+    for prefix, weight in UPSTREAM_WEIGHTS.get(provider, ()):
+        if not path.startswith(prefix):
+            continue
+        if not isinstance(weight, tuple):
+            return weight
+        try:
+            limit = int((query or {}).get('limit', 0))
+        except (TypeError, ValueError):
+            limit = 0
+        for up_to, step_weight in weight:
+            if limit <= up_to:
+                return step_weight
+        return weight[-1][1]
+    return 1.0
+
+
+def spend_upstream(provider: str, path: str, query: dict | None = None) -> None:
+    """Charge one ``provider`` call to the global budget; raises UpstreamBudgetExceeded when spent."""
+    budget = settings.UPSTREAM_RATE_LIMITS.get(provider)
+    if budget is None:
+        return
+    retry_after = take(f'upstream:{provider}', *budget, cost=upstream_weight(provider, path, query))
+    if retry_after:
+        raise UpstreamBudgetExceeded(provider, retry_after)
+
+
+def _client_key(request, user) -> str:
+    if user is not None and user.is_authenticated:
+        return f'u{user.pk}'
+    return f'ip{request.META.get("REMOTE_ADDR", "")}'
+
+
+def _limit(kind: str, request, user):
+    """A 429 response when the client's budget for ``kind`` is spent, else None."""
+    budget = settings.RATE_LIMITS.get(kind)
+    if budget is None:
+        return None
+    retry_after = take(f'{kind}:{_client_key(request, user)}', *budget)
+    if not retry_after:
+        return None
+    response = JsonResponse({'ok': False, 'error': 'Too many requests.'}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limited(kind: str):
+    """Decorate a sync or async market view with the RATE_LIMITS budget of ``kind``."""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                user = await request.auser() if hasattr(request, 'auser') else getattr(request, 'user', None)
+                limited = _limit(kind, request, user)
+                if limited is not None:
+                    return limited
+                return await view(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            limited = _limit(kind, request, getattr(request, 'user', None))
+            return limited if limited is not None else view(request, *args, **kwargs)
+        return wrapper
+    return decorator
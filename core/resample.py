@@ -0,0 +1,187 @@
+"""
+OHLCV resampling of stored 1-minute candles into larger timeframes.
+
+Bars are held column-wise in ``array`` buffers. :func:`resample` derives
+bucket boundaries arithmetically when no minute is missing (bisect over the
+sorted open times otherwise) and reduces every column slice with ``map`` over
+the C builtins, so no per-bar Python loop runs: open=first, high=max,
+low=min, close=last, volume=sum. Buckets are UTC aligned the way Binance
+aligns klines (``core.candles.bucket_start``; weeks open on Monday).
+
+:func:`window` keeps one resampled :class:`Bars` per (symbol, interval) and
+folds in only the minutes finalized since the last call, updating the current
+partial bar in place instead of recomputing the window. The newest stored
+minute may have been written while still open; ``core.candles.sync``
+re-fetches it along with the next newer one, so until then it is merged only
+into a copy for the response, never into the kept bars.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+
+from . import candles
+from .models import Candle
+
+MINUTE_MS = candles.INTERVAL_MS['1m']
+MINUTE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+
+class Bars:
+    """Column-oriented OHLCV bars sorted by open time."""
+
+    __slots__ = MINUTE_FIELDS
+
+    def __init__(self) -> None:
+        self.open_time = array('q')
+        self.open = array('d')
+        self.high = array('d')
+        self.low = array('d')
+        self.close = array('d')
+        self.volume = array('d')
+
+    @classmethod
+    def from_rows(cls, rows) -> 'Bars':
+        """Build from (open_time, open, high, low, close, volume) rows."""
+        bars = cls()
+        columns = list(zip(*rows))
+        if columns:
+            for name, column in zip(MINUTE_FIELDS, columns):
+                getattr(bars, name).extend(column)
+        return bars
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def since(self, open_time: int) -> 'Bars':
+        """Bars opening at or after ``open_time``."""
+        start = bisect_left(self.open_time, open_time)
+        bars = Bars()
+        for name in MINUTE_FIELDS:
+            setattr(bars, name, getattr(self, name)[start:])
+        return bars
+
+    def merge(self, newer: 'Bars') -> None:
+        """Append ``newer`` bars, folding its first bar into our last one if they share a bucket."""
+        if not newer:
+            return
+        start = 0
+        if self and newer.open_time[0] == self.open_time[-1]:
+            self.high[-1] = max(self.high[-1], newer.high[0])
+            self.low[-1] = min(self.low[-1], newer.low[0])
+            self.close[-1] = newer.close[0]
+            self.volume[-1] += newer.volume[0]
+            start = 1
+        for name in MINUTE_FIELDS:
+            getattr(self, name).extend(getattr(newer, name)[start:])
+
+    def rows(self, interval: str, limit: int) -> list[tuple]:
+        """Latest ``limit`` bars as Binance-kline-ordered tuples (see ``core.candles.ROW_FIELDS``)."""
+        step = candles.INTERVAL_MS[interval]
+        start = max(len(self) - limit, 0)
+        return [
+            (open_time, o, h, l, c, v, open_time + step - 1)
+            for open_time, o, h, l, c, v in zip(
+                self.open_time[start:], self.open[start:], self.high[start:],
+                self.low[start:], self.close[start:], self.volume[start:],
+            )
+        ]
+
+
+def _bucket_starts(times: array, interval: str) -> tuple[list[int], list[int]]:
+    """Return (bucket open times, index of each bucket's first bar)."""
+    step = candles.INTERVAL_MS[interval]
+    count = len(times)
+    first = candles.bucket_start(times[0], interval)
+    if times[-1] - times[0] == (count - 1) * MINUTE_MS:
+        # No missing minutes: every bucket after the first holds step/1m bars.
+        per_bucket = step // MINUTE_MS
+        lead = (first + step - times[0]) // MINUTE_MS
+        indexes = [0, *range(lead, count, per_bucket)]
+        return list(range(first, first + len(indexes) * step, step)), indexes
+    buckets, indexes = [], []
+    index = 0
+    while index < count:
+        bucket = candles.bucket_start(times[index], interval)
+        buckets.append(bucket)
+        indexes.append(index)
+        index = bisect_left(times, bucket + step, index)
+    return buckets, indexes
+
+
+def resample(bars: Bars, interval: str) -> Bars:
+    """Aggregate sorted minute ``bars`` into UTC-aligned ``interval`` buckets."""
+    out = Bars()
+    if not bars:
+        return out
+    buckets, starts = _bucket_starts(bars.open_time, interval)
+    ends = starts[1:] + [len(bars)]
+    slices = list(map(slice, starts, ends))
+    out.open_time.extend(buckets)
+    out.open.extend(map(bars.open.__getitem__, starts))
+    out.high.extend(map(max, map(bars.high.__getitem__, slices)))
+    out.low.extend(map(min, map(bars.low.__getitem__, slices)))
+    out.close.extend(map(bars.close.__getitem__, [end - 1 for end in ends]))
+    out.volume.extend(map(sum, map(bars.volume.__getitem__, slices)))
+    return out
+
+
+def minutes_needed(interval: str, limit: int) -> int:
+    """How many trailing minute bars cover the latest ``limit`` ``interval`` bars."""
+    return (candles.now_ms() - candles.window_start(interval, limit)) // MINUTE_MS + 1
+
+
+class _Series:
+    __slots__ = ('lock', 'start', 'consumed', 'bars')
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.start: int | None = None
+        self.consumed = 0
+        self.bars = Bars()
+
+
+_series: dict[tuple[str, str], _Series] = {}
+_series_lock = threading.Lock()
+
+
+def _stored_minutes(symbol: str, after: int) -> tuple[Bars, Bars]:
+    """(final, newest) stored minutes from ``after``: every one but the newest is final."""
+    minutes = Bars.from_rows(
+        Candle.objects.filter(symbol=symbol, interval='1m', open_time__gte=after)
+        .order_by('open_time')
+        .values_list(*MINUTE_FIELDS)
+    )
+    final, newest = Bars(), Bars()
+    for name in MINUTE_FIELDS:
+        column = getattr(minutes, name)
+        setattr(final, name, column[:-1])
+        setattr(newest, name, column[-1:])
+    return final, newest
+
+
+def window(symbol: str, interval: str, limit: int) -> list[tuple]:
+    """Latest ``limit`` ``interval`` bars derived from stored, closed 1-minute candles."""
+    with _series_lock:
+        series = _series.setdefault((symbol, interval), _Series())
+    start = candles.window_start(interval, limit)
+    current_minute = candles.bucket_start(candles.now_ms(), '1m')
+
+    with series.lock:
+        if series.start is None or series.start > start:
+            series.bars = Bars()
+            series.start = start
+            series.consumed = start - MINUTE_MS
+        final, newest = _stored_minutes(symbol, series.consumed + MINUTE_MS)
+        if final:
+            series.bars.merge(resample(final, interval))
+            series.consumed = final.open_time[-1]
+        if series.start < start:
+            series.bars = series.bars.since(start)
+            series.start = start
+        if not newest or newest.open_time[0] >= current_minute:
+            return series.bars.rows(interval, limit)
+        # Closed, but maybe stored while open: count it in this response only.
+        bars = series.bars.since(start)
+        bars.merge(resample(newest, interval))
+        return bars.rows(interval, limit)
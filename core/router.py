@@ -0,0 +1,265 @@
+"""
+Latency-aware routing between redundant upstream providers.
+
+Each provider (coinapi, binance, coingecko, ...) keeps a rolling window of
+call outcomes and a circuit breaker. :func:`route` / :func:`aroute` take
+candidates in preference order and:
+
+* skip providers whose breaker is open (it trips on
+  MARKET_ROUTER_BREAKER_FAILURES consecutive failures, or on an error rate of
+  MARKET_ROUTER_BREAKER_ERROR_RATE over at least MARKET_ROUTER_BREAKER_MIN_CALLS
+  calls, and lets one probe through after MARKET_ROUTER_BREAKER_COOLDOWN);
+* move providers whose median latency exceeds the hedge delay behind those
+  that answer within it;
+* start the first candidate, and if it has not answered after
+  MARKET_ROUTER_HEDGE_DELAY seconds (or as soon as it fails) start the next
+  one too, returning whichever succeeds first.
+
+A request therefore waits roughly for the fastest healthy provider rather
+than for the upstream timeout of a slow one. Hedged calls that lose keep
+running to completion so their latency still feeds the statistics.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable
+
+from django.conf import settings
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ProviderHealth:
+    """Rolling outcomes and circuit breaker state of one upstream provider."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._outcomes: deque[tuple[bool, float]] = deque(maxlen=settings.MARKET_ROUTER_WINDOW)
+        self._consecutive_failures = 0
+        self.state = CLOSED
+        self._opened_at = 0.0
+
+    def available(self) -> bool:
+        """Whether :meth:`allows` would let a call through now, without taking the probe."""
+        with self._lock:
+            return (self.state == CLOSED
+                    or time.monotonic() - self._opened_at >= settings.MARKET_ROUTER_BREAKER_COOLDOWN)
+
+    def allows(self) -> bool:
+        """Whether a call may go out now; after the cooldown, one probe per cooldown period.
+
+        Call it only right before making the call: in the half-open state it uses up the probe.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < settings.MARKET_ROUTER_BREAKER_COOLDOWN:
+                return False
+            # Half-open: restart the cooldown so concurrent requests don't all probe.
+            self.state = HALF_OPEN
+            self._opened_at = now
+            return True
+
+    def record(self, ok: bool, latency: float) -> None:
+        with self._lock:
+            self._outcomes.append((ok, latency))
+            if ok:
+                self._consecutive_failures = 0
+                if self.state != CLOSED:
+                    # Recovered: forget the failures that opened the breaker.
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    self._outcomes.append((ok, latency))
+                return
+            self._consecutive_failures += 1
+            if self.state == HALF_OPEN or self._should_trip():
+                if self.state != OPEN:
+                    self._opened_at = time.monotonic()
+                self.state = OPEN
+
+    def _should_trip(self) -> bool:
+        if self._consecutive_failures >= settings.MARKET_ROUTER_BREAKER_FAILURES:
+            return True
+        calls = len(self._outcomes)
+        if calls < settings.MARKET_ROUTER_BREAKER_MIN_CALLS:
+            return False
+        errors = sum(1 for ok, _ in self._outcomes if not ok)
+        return errors / calls >= settings.MARKET_ROUTER_BREAKER_ERROR_RATE
+
+    def median_latency(self) -> float | None:
+        with self._lock:
+            latencies = sorted(latency for ok, latency in self._outcomes if ok)
+        return latencies[len(latencies) // 2] if latencies else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            outcomes = list(self._outcomes)
+            state = self.state
+        latencies = sorted(latency for ok, latency in outcomes if ok)
+        errors = sum(1 for ok, _ in outcomes if not ok)
+        return {
+            'state': state,
+            'calls': len(outcomes),
+            'error_rate': errors / len(outcomes) if outcomes else 0.0,
+            'p50': latencies[len(latencies) // 2] if latencies else None,
+            'p95': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] if latencies else None,
+        }
+
+
+_health: dict[str, ProviderHealth] = {}
+_health_lock = threading.Lock()
+_pool = ThreadPoolExecutor(settings.MARKET_ROUTER_WORKERS, thread_name_prefix='market-router')
+# Hedged async calls that lost the race, kept referenced until they finish.
+_stragglers: set[asyncio.Task] = set()
+
+
+def health(name: str) -> ProviderHealth:
+    with _health_lock:
+        provider = _health.get(name)
+        if provider is None:
+            provider = _health[name] = ProviderHealth(name)
+        return provider
+
+
+def stats() -> dict[str, dict]:
+    """Rolling statistics per provider, e.g. for monitoring."""
+    with _health_lock:
+        providers = list(_health.values())
+    return {provider.name: provider.stats() for provider in providers}
+
+
+def _plan(candidates: list[tuple[str, Any]]) -> tuple[list[tuple[str, Any]], bool]:
+    """(candidates to try in order, forced): healthy and fast first, preference order within that.
+
+    Breakers are only looked at here; :func:`_next` claims a half-open probe
+    when a candidate is actually launched, so planning a provider that is
+    never needed leaves its probe for a later call. ``forced`` means every
+    breaker is open and the preferred provider is tried regardless.
+    """
+    allowed = [candidate for candidate in candidates if health(candidate[0]).available()]
+    if not allowed:
+        # Every breaker is open: trying the preferred provider beats failing outright.
+        return candidates[:1], True
+    delay = settings.MARKET_ROUTER_HEDGE_DELAY
+
+    def slow(candidate) -> bool:
+        median = health(candidate[0]).median_latency()
+        return median is not None and median > delay
+
+    return sorted(allowed, key=slow), False
+
+
+def _next(remaining: list[tuple[str, Any]], forced: bool) -> tuple[str, Any] | None:
+    """Pop the next candidate whose breaker lets this call through."""
+    while remaining:
+        candidate = remaining.pop(0)
+        if forced or health(candidate[0]).allows():
+            return candidate
+    return None
+
+
+def _call(name: str, call: Callable[[], Any]) -> Any:
+    started = time.monotonic()
+    try:
+        result = call()
+    except Exception:
+        health(name).record(False, time.monotonic() - started)
+        raise
+    health(name).record(True, time.monotonic() - started)
+    return result
+
+
+def route(candidates: list[tuple[str, Callable[[], Any]]]) -> Any:
+    """Return the first successful result among ``(provider, call)`` candidates, hedging slow ones."""
+    ordered, forced = _plan(candidates)
+    remaining = list(ordered)
+    # Another request may have taken a probe since planning; then the preferred one goes anyway.
+    first = _next(remaining, forced) or ordered[0]
+    if not remaining:
+        return _call(*first)
+    pending = set()
+    error = None
+
+    def launch(candidate) -> None:
+        if candidate is not None:
+            # In the caller's context, so the call's phases count towards its request (core.timing).
+            pending.add(_pool.submit(contextvars.copy_context().run, _call, *candidate))
+
+    launch(first)
+    while pending:
+        done, pending = wait(
+            pending, timeout=settings.MARKET_ROUTER_HEDGE_DELAY if remaining else None,
+            return_when=FIRST_COMPLETED,
+        )
+        if not done:
+            launch(_next(remaining, forced))
+            continue
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+        if remaining:
+            launch(_next(remaining, forced))
+    raise error
+
+
+async def _acall(name: str, call: Callable[[], Awaitable[Any]]) -> Any:
+    started = time.monotonic()
+    try:
+        result = await call()
+    except Exception:
+        health(name).record(False, time.monotonic() - started)
+        raise
+    health(name).record(True, time.monotonic() - started)
+    return result
+
+
+def _release(task: asyncio.Task) -> None:
+    _stragglers.discard(task)
+    if not task.cancelled():
+        task.exception()  # already recorded by _acall; don't log it as unretrieved
+
+
+async def aroute(candidates: list[tuple[str, Callable[[], Awaitable[Any]]]]) -> Any:
+    """Async :func:`route` for the ASGI market views."""
+    ordered, forced = _plan(candidates)
+    remaining = list(ordered)
+    first = _next(remaining, forced) or ordered[0]
+    if not remaining:
+        return await _acall(*first)
+    pending: set[asyncio.Task] = set()
+    error = None
+
+    def launch(candidate) -> None:
+        if candidate is not None:
+            pending.add(asyncio.ensure_future(_acall(*candidate)))
+
+    launch(first)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=settings.MARKET_ROUTER_HEDGE_DELAY if remaining else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                launch(_next(remaining, forced))
+                continue
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+            if remaining:
+                launch(_next(remaining, forced))
+        raise error
+    finally:
+        for task in pending:
+            _stragglers.add(task)
+            task.add_done_callback(_release)
@@ -0,0 +1,34 @@
+"""
+Database-backed sessions whose reads and writes count as the ``session``
+phase of the request (core.timing). Enabled with SESSION_ENGINE = 'core.sessions'.
+"""
+
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+
+from . import timing
+
+
+class SessionStore(DatabaseSessionStore):
+    def load(self):
+        with timing.phase('session'):
+            return super().load()
+
+    def save(self, must_create=False):
+        with timing.phase('session'):
+            return super().save(must_create)
+
+    def delete(self, session_key=None):
+        with timing.phase('session'):
+            return super().delete(session_key)
+
+    async def aload(self):
+        with timing.phase('session'):
+            return await super().aload()
+
+    async def asave(self, must_create=False):
+        with timing.phase('session'):
+            return await super().asave(must_create)
+
+    async def adelete(self, session_key=None):
+        with timing.phase('session'):
+            return await super().adelete(session_key)
@@ -0,0 +1,264 @@
+"""
+Host-wide market snapshot store shared by all worker processes.
+
+Each snapshot lives in its own memory-mapped segment file under
+``MARKET_SNAPSHOT_DIR``. A segment holds a fixed header followed by the
+encoded JSON body that the matching view would return::
+
+    magic    4s   b'NXSS'
+    layout   H    segment layout version
+    flags    H    bit 0 set once the segment has been replaced by a bigger one
+    seq      Q    seqlock counter; odd while a write is in progress
+    updated  Q    wall-clock publish time in epoch milliseconds
+    length   I    payload length in bytes
+    capacity I    payload capacity in bytes
+
+``version`` is ``seq // 2`` and only ever grows. Readers never block the
+writer: they retry if the counter moved while they were copying the body.
+
+Exactly one process per host refreshes the segments. Workers race for an
+exclusive ``flock`` on ``writer.lock``; the holder runs the refresh loop and
+the others keep retrying so a replacement is elected if the writer dies.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX hosts
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'NXSS'
+LAYOUT_VERSION = 1
+HEADER = struct.Struct('<4sHHQQII')
+FLAG_RETIRED = 0x1
+MIN_CAPACITY = 64 * 1024
+READ_RETRIES = 8
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    key: str
+    version: int
+    updated_at_ms: int
+    payload: bytes
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.updated_at_ms / 1000)
+
+
+@dataclass(frozen=True)
+class Feed:
+    """A snapshot key refreshed every ``interval`` seconds by ``producer``."""
+
+    key: str
+    interval: float
+    producer: Callable[[], bytes]
+
+
+def snapshot_dir() -> Path:
+    return Path(getattr(settings, 'MARKET_SNAPSHOT_DIR', settings.BASE_DIR / 'var' / 'snapshots'))
+
+
+def _segment_path(key: str) -> Path:
+    safe = ''.join(ch if ch.isalnum() or ch in '._-' else '_' for ch in key)
+    return snapshot_dir() / f'{safe}.seg'
+
+
+class _Segment:
+    def __init__(self, path: Path, fd: int, mm: mmap.mmap) -> None:
+        self.path = path
+        self.fd = fd
+        self.mm = mm
+
+    @property
+    def capacity(self) -> int:
+        return len(self.mm) - HEADER.size
+
+    def header(self) -> tuple:
+        return HEADER.unpack_from(self.mm, 0)
+
+    def close(self) -> None:
+        try:
+            self.mm.close()
+        finally:
+            os.close(self.fd)
+
+
+def _open_segment(path: Path, writable: bool) -> _Segment | None:
+    try:
+        fd = os.open(path, os.O_RDWR if writable else os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+    try:
+        size = os.fstat(fd).st_size
+        if size < HEADER.size:
+            os.close(fd)
+            return None
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        mm = mmap.mmap(fd, size, access=access)
+    except (OSError, ValueError):
+        os.close(fd)
+        return None
+    segment = _Segment(path, fd, mm)
+    if segment.header()[0] != MAGIC:
+        segment.close()
+        return None
+    return segment
+
+
+def _create_segment(path: Path, capacity: int, seq: int) -> _Segment:
+    """Create a fresh segment and atomically swap it in place of ``path``."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as fh:
+        fh.write(HEADER.pack(MAGIC, LAYOUT_VERSION, 0, seq, 0, 0, capacity))
+        fh.truncate(HEADER.size + capacity)
+    os.replace(tmp_path, path)
+    segment = _open_segment(path, writable=True)
+    if segment is None:
+        raise OSError(f'Could not map snapshot segment {path}')
+    return segment
+
+
+_reader_lock = threading.Lock()
+_readers: dict[str, _Segment] = {}
+_writer_segments: dict[str, _Segment] = {}
+_publish_lock = threading.Lock()
+
+
+def read(key: str) -> Snapshot | None:
+    """Return the latest published snapshot for ``key`` without touching the network."""
+    for _ in range(READ_RETRIES):
+        with _reader_lock:
+            segment = _readers.get(key)
+            if segment is None:
+                segment = _open_segment(_segment_path(key), writable=False)
+                if segment is None:
+                    return None
+                _readers[key] = segment
+        magic, _, flags, seq, updated, length, _ = segment.header()
+        if flags & FLAG_RETIRED:
+            with _reader_lock:
+                if _readers.get(key) is segment:
+                    del _readers[key]
+            segment.close()
+            continue
+        if seq == 0:
+            return None
+        if seq % 2:
+            time.sleep(0)
+            continue
+        payload = segment.mm[HEADER.size:HEADER.size + length]
+        if segment.header()[3] == seq:
+            return Snapshot(key=key, version=seq // 2, updated_at_ms=updated, payload=payload)
+    return None
+
+
+def publish(key: str, payload: bytes) -> int:
+    """Write ``payload`` as the next version of ``key``; returns the new version."""
+    with _publish_lock:
+        return _publish(key, payload)
+
+
+def _publish(key: str, payload: bytes) -> int:
+    segment = _writer_segments.get(key)
+    if segment is None:
+        segment = _open_segment(_segment_path(key), writable=True)
+        if segment is None:
+            segment = _create_segment(_segment_path(key), max(MIN_CAPACITY, len(payload) * 2), seq=0)
+        _writer_segments[key] = segment
+
+    if len(payload) > segment.capacity:
+        seq = segment.header()[3]
+        replacement = _create_segment(segment.path, len(payload) * 2, seq=seq + seq % 2)
+        HEADER.pack_into(segment.mm, 0, *segment.header()[:2], FLAG_RETIRED, *segment.header()[3:])
+        segment.close()
+        segment = _writer_segments[key] = replacement
+
+    magic, layout, flags, seq, _, _, capacity = segment.header()
+    seq += 1 if seq % 2 == 0 else 2
+    HEADER.pack_into(segment.mm, 0, magic, layout, flags, seq, 0, 0, capacity)
+    segment.mm[HEADER.size:HEADER.size + len(payload)] = payload
+    seq += 1
+    HEADER.pack_into(segment.mm, 0, magic, layout, flags, seq, int(time.time() * 1000), len(payload), capacity)
+    return seq // 2
+
+
+class SnapshotWriter(threading.Thread):
+    """Daemon thread that wins the host-wide writer election and refreshes feeds."""
+
+    def __init__(self, feeds: list[Feed], elect: bool = True) -> None:
+        super().__init__(name='market-snapshot-writer', daemon=True)
+        self.feeds = feeds
+        self.elect = elect
+        self.stop_event = threading.Event()
+        self.is_leader = False
+        self._lock_fh = None
+
+    def _try_acquire(self) -> bool:
+        if not self.elect or fcntl is None:
+            return True
+        snapshot_dir().mkdir(parents=True, exist_ok=True)
+        fh = open(snapshot_dir() / 'writer.lock', 'a+')
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._lock_fh = fh
+        return True
+
+    def run_once(self, due: dict[str, float]) -> float:
+        """Refresh every due feed; return seconds until the next one is due."""
+        now = time.monotonic()
+        for feed in self.feeds:
+            if due.get(feed.key, 0.0) > now:
+                continue
+            try:
+                publish(feed.key, feed.producer())
+            except Exception:
+                logger.warning('Snapshot feed %s failed to refresh', feed.key, exc_info=True)
+            due[feed.key] = time.monotonic() + feed.interval
+        return max(0.05, min(due.values(), default=now + 1.0) - time.monotonic())
+
+    def run(self) -> None:
+        retry = float(getattr(settings, 'MARKET_SNAPSHOT_ELECTION_RETRY', 5.0))
+        while not self.stop_event.is_set():
+            if self._try_acquire():
+                break
+            self.stop_event.wait(retry)
+        self.is_leader = True
+        due: dict[str, float] = {}
+        while not self.stop_event.is_set():
+            self.stop_event.wait(self.run_once(due))
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+
+_writer: SnapshotWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def ensure_writer(feeds_factory: Callable[[], list[Feed]]) -> SnapshotWriter:
+    """Start this process's writer candidate once; later calls are no-ops."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter(feeds_factory())
+            _writer.start()
+        return _writer
@@ -0,0 +1,43 @@
+"""
+Static files storage that writes content-hashed names plus ``.gz`` (and,
+with the optional ``brotli`` package, ``.br``) siblings at collectstatic
+time, so ``core.middleware.PrecompressedStaticMiddleware`` never compresses
+a static file per request.
+"""
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .compression import FILE_SUFFIXES, SUPPORTED_ENCODINGS, compress
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Templates keep rendering before the first collectstatic (unhashed names).
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Precompress both the hashed and the original names; either may be requested.
+        names = set(self.hashed_files.values()) | set(self.hashed_files.keys())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self._write_variants(name)
+
+    def _write_variants(self, name: str) -> None:
+        with self.open(name) as source:
+            data = source.read()
+        if len(data) < settings.COMPRESSION_MIN_SIZE:
+            return
+        for coding in SUPPORTED_ENCODINGS:
+            compressed = compress(data, coding, level=9 if coding == 'gzip' else 11)
+            variant = name + FILE_SUFFIXES[coding]
+            if self.exists(variant):
+                self.delete(variant)
+            # Only keep a variant that actually saves bytes.
+            if len(compressed) < len(data):
+                self._save(variant, ContentFile(compressed))
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from core import candles
+from core.models import Candle
+
+MINUTE = candles.INTERVAL_MS['1m']
+NOW = 1_700_000_000_000
+
+
+def kline(open_time):
+    return [open_time, '1', '2', '0.5', '1.5', '10', open_time + MINUTE - 1]
+
+
+class Upstream:
+    """Binance klines for a symbol listed at ``listed``: nothing older exists."""
+
+    def __init__(self, listed):
+        self.listed = listed
+        self.starts = []
+
+    def __call__(self, query):
+        start = int(query['startTime'])
+        self.starts.append(start)
+        first = max(start, self.listed)
+        last = candles.bucket_start(NOW, '1m')
+        return [kline(t) for t in range(first, last + 1, MINUTE)][:int(query['limit'])]
+
+
+class SyncTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(candles, 'now_ms', return_value=NOW)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        candles._synced.clear()
+        candles._earliest.clear()
+        self.addCleanup(candles._synced.clear)
+        self.addCleanup(candles._earliest.clear)
+
+    def sync(self, upstream, limit=100):
+        candles._synced.clear()  # past the TTL
+        return candles.sync('NEWUSDT', '1m', limit, upstream)
+
+    def test_late_listing_moves_forward(self):
+        current = candles.bucket_start(NOW, '1m')
+        upstream = Upstream(listed=current - 9 * MINUTE)
+        self.assertEqual(self.sync(upstream), 10)
+        self.assertEqual(upstream.starts, [candles.window_start('1m', 100, NOW)])
+        self.sync(upstream)
+        # Only the newest (possibly still open) bar, not the whole window again.
+        self.assertEqual(upstream.starts[1:], [current])
+
+    def test_hole_in_window_is_refetched_from_the_first_missing_bar(self):
+        current = candles.bucket_start(NOW, '1m')
+        upstream = Upstream(listed=0)
+        self.sync(upstream, limit=20)
+        Candle.objects.filter(open_time__in=[current - 5 * MINUTE, current - 4 * MINUTE]).delete()
+        self.sync(upstream, limit=20)
+        self.assertEqual(upstream.starts[-1], current - 5 * MINUTE)
+        self.assertEqual(Candle.objects.filter(symbol='NEWUSDT').count(), 20)
+
+    def test_wider_window_backfills_older_bars(self):
+        upstream = Upstream(listed=0)
+        self.sync(upstream, limit=10)
+        self.sync(upstream, limit=30)
+        self.assertEqual(upstream.starts[-1], candles.window_start('1m', 30, NOW))
+        self.assertEqual(Candle.objects.filter(symbol='NEWUSDT').count(), 30)
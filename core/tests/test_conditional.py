@@ -0,0 +1,88 @@
+import json
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from core import market_cache
+from core.conditional import conditional
+
+BOOK = {'ok': True, 'asks': [['101', '1.0'], ['102', '2.0']], 'bids': [['100', '3.0'], ['99', '1.0']]}
+
+
+class ConditionalTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.book = json.loads(json.dumps(BOOK))
+
+        @conditional('depth')
+        def view(request):
+            return JsonResponse(self.book)
+
+        self.view = view
+
+    def test_matching_if_none_match_gets_bodiless_304(self):
+        first = self.view(self.factory.get('/depth', {'base': 'BTC'}))
+        self.assertEqual(first.status_code, 200)
+        again = self.view(self.factory.get('/depth', {'base': 'BTC'}, HTTP_IF_NONE_MATCH=first['ETag']))
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_weak_etag_from_compression_still_matches(self):
+        first = self.view(self.factory.get('/depth', {'base': 'ETH'}))
+        again = self.view(self.factory.get('/depth', {'base': 'ETH'}, HTTP_IF_NONE_MATCH='W/' + first['ETag']))
+        self.assertEqual(again.status_code, 304)
+
+    def test_changed_body_gets_new_etag(self):
+        first = self.view(self.factory.get('/depth', {'base': 'SOL'}))
+        self.book['asks'][0][1] = '5.0'
+        again = self.view(self.factory.get('/depth', {'base': 'SOL'}, HTTP_IF_NONE_MATCH=first['ETag']))
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], first['ETag'])
+
+    def test_since_returns_only_changed_and_removed_levels(self):
+        first = self.view(self.factory.get('/depth', {'base': 'ADA'}))
+        self.book['asks'] = [['101', '1.5'], ['103', '1.0']]
+        delta = self.view(self.factory.get('/depth', {'base': 'ADA', 'since': first['X-Market-Version']}))
+        payload = json.loads(delta.content)
+        self.assertTrue(payload['delta'])
+        self.assertEqual(payload['since'], first['X-Market-Version'])
+        self.assertEqual(payload['version'], delta['X-Market-Version'])
+        self.assertEqual(payload['asks'], [['101', '1.5'], ['103', '1.0'], ['102', '0']])
+        self.assertEqual(payload['bids'], [])
+
+    def test_unknown_since_returns_full_body(self):
+        response = self.view(self.factory.get('/depth', {'base': 'XRP', 'since': 'h0000000000000000'}))
+        payload = json.loads(response.content)
+        self.assertNotIn('delta', payload)
+        self.assertEqual(payload['asks'], BOOK['asks'])
+
+
+class DepthEndpointConditionalTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        overrides = override_settings(
+            RATE_LIMIT_ENABLED=False, MARKET_SNAPSHOT_DIR=f'{tmp.name}/snapshots',
+            MARKET_LAST_GOOD_DIR=f'{tmp.name}/last_good', MARKET_UPSTREAM_RECORD=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        market_cache.clear()
+        self.addCleanup(market_cache.clear)
+        user = get_user_model().objects.create_user(email='poller@example.com', username='poller@example.com')
+        self.client.force_login(user)
+        patcher = mock.patch('core.views._http_get_json', side_effect=lambda url, headers=None: BOOK | {'lastUpdateId': 1})
+        self.upstream = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_poll_with_etag_is_304(self):
+        params = {'base': 'BTC', 'quote': 'USDT', 'limit': 5}
+        first = self.client.get('/api/market/depth/', params)
+        self.assertEqual(first.status_code, 200)
+        again = self.client.get('/api/market/depth/', params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.upstream.call_count, 1)
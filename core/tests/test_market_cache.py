@@ -0,0 +1,32 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from core import market_cache
+
+
+class AsyncFetchTests(SimpleTestCase):
+    def setUp(self):
+        market_cache.clear()
+        self.addCleanup(market_cache.clear)
+        self.calls = 0
+
+    async def load(self):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return {'call': self.calls}
+
+    def fetch(self):
+        return market_cache.afetch('binance', '/api/v3/depth', {'symbol': 'BTCUSDT'}, self.load)
+
+    async def test_cancelled_leader_leaves_coalesced_waiters_their_result(self):
+        fetch = self.fetch
+        leader = asyncio.create_task(fetch())
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(fetch()) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        self.assertEqual(await asyncio.gather(*waiters), [{'call': 1}] * 3)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(await fetch(), {'call': 1})
+        self.assertEqual(self.calls, 1)
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core import news_store, views
+
+
+def article(i, title, body='', categories=''):
+    return {'id': str(i), 'url': f'https://news.example/{i}', 'title': title, 'body': body,
+            'categories': categories, 'published_on': 1_700_000_000 + i}
+
+
+class CategoryTests(SimpleTestCase):
+    def categories(self, text):
+        return news_store.categories_of(news_store.tokenize(text))
+
+    def test_stems_and_prefixes_match(self):
+        for text in ('New regulations for exchanges', 'Regulatory pressure mounts', 'SEC files lawsuit',
+                     'Stablecoin policies'):
+            with self.subTest(text=text):
+                self.assertIn('REGULATION', self.categories(text))
+        self.assertEqual(self.categories('Bitcoins and Ethereum staking yields'), ['BTC', 'ETH', 'DEFI'])
+        self.assertIn('DEFI', self.categories('decentralised financial apps'))
+
+    def test_short_keywords_are_whole_words(self):
+        # The substring scan this replaced matched these.
+        self.assertEqual(self.categories('A second method to index together'), [])
+
+
+class PageTests(TestCase):
+    def setUp(self):
+        news_store.store_articles([
+            article(1, 'Bitcoin ETF regulations'),
+            article(2, 'Ethereum upgrade ships'),
+            article(3, 'Bitcoin hits a high'),
+            article(4, 'Bitcoin miners face new regulatory rules'),
+            article(5, 'Bitcoin volume falls'),
+        ])
+
+    def titles(self, rows):
+        return [row['title'] for row in rows]
+
+    def test_category_pages_follow_postings_with_cursor(self):
+        rows, cursor = news_store.page('BTC', limit=2)
+        self.assertEqual(self.titles(rows), ['Bitcoin volume falls', 'Bitcoin miners face new regulatory rules'])
+        rows, cursor = news_store.page('BTC', limit=2, cursor=cursor)
+        self.assertEqual(self.titles(rows), ['Bitcoin hits a high', 'Bitcoin ETF regulations'])
+        self.assertIsNone(cursor)
+
+    def test_search_within_category(self):
+        rows, cursor = news_store.page('REGULATION', q='bitcoin')
+        self.assertEqual(self.titles(rows), ['Bitcoin miners face new regulatory rules', 'Bitcoin ETF regulations'])
+        self.assertIsNone(cursor)
+
+    def test_unfiltered_feed(self):
+        rows, cursor = news_store.page(limit=4)
+        self.assertEqual(len(rows), 4)
+        rows, cursor = news_store.page(limit=4, cursor=cursor)
+        self.assertEqual(self.titles(rows), ['Bitcoin ETF regulations'])
+
+
+class RefreshTests(SimpleTestCase):
+    def test_empty_store_is_filled_in_the_background(self):
+        with mock.patch.object(news_store, 'is_stale', return_value=True), \
+                mock.patch.object(news_store, 'sync') as sync, \
+                mock.patch.object(news_store, 'refresh_in_background') as background:
+            views._refresh_news_store()
+        sync.assert_not_called()
+        background.assert_called_once_with(views._news_feed_rows)
@@ -0,0 +1,44 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from core import views
+
+LOCMEM = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+
+
+@override_settings(CACHES={'default': LOCMEM, 'wallet': {**LOCMEM, 'LOCATION': 'wallet-tests'}})
+class WalletCacheTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='wallet@example.com', email='wallet@example.com', password='x',
+        )
+        caches['wallet'].clear()
+
+    def credit(self, amount):
+        with self.captureOnCommitCallbacks(execute=True):
+            views._credit_user_wallet(self.user, Decimal(amount))
+
+    def test_render_after_deposit_shows_new_balance(self):
+        self.credit('10')
+        self.assertEqual(views._wallet_context(self.user)['wallet_usd_display'], '10.00')
+        self.credit('2.5')
+        self.assertEqual(views._wallet_context(self.user)['wallet_usd_display'], '12.50')
+        with self.assertNumQueries(0):
+            self.assertEqual(views._wallet_context(self.user)['wallet_usd_display'], '12.50')
+
+    def test_credit_committed_between_miss_read_and_add(self):
+        self.credit('10')
+        read_balance = views._get_user_wallet_usd
+
+        def read_then_deposit(user):
+            stale = read_balance(user)
+            self.credit('5')  # commits before the miss path adds what it read
+            return stale
+
+        with mock.patch.object(views, '_get_user_wallet_usd', side_effect=read_then_deposit):
+            self.assertEqual(views._wallet_context(self.user)['wallet_usd'], Decimal('10.00'))
+        self.assertEqual(views._wallet_context(self.user)['wallet_usd'], Decimal('15.00'))
@@ -0,0 +1,171 @@
+"""
+Ranked index over the Binance 24h ticker table.
+
+The ~2,500-row ``/api/v3/ticker/24hr`` payload is parsed once per refresh
+into numeric columns. Rankings by quote volume, price change and last price
+are precomputed for every symbol and for each quote asset, so a page of
+``limit`` rows is a slice of a ranking: O(k) for top-N, plus O(log n) to
+resume from a cursor. Cursors are keysets (sort value, symbol), so paging
+stays stable when the index is rebuilt between requests.
+"""
+
+import base64
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Longest first so that e.g. FDUSD is not read as a USD quote.
+QUOTE_ASSETS = (
+    'FDUSD', 'USDT', 'USDC', 'TUSD', 'BUSD', 'DAI', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY', 'BRL',
+    'JPY', 'GBP', 'AUD', 'ZAR', 'ARS', 'MXN', 'PLN', 'RON', 'UAH', 'IDR', 'XRP', 'DOGE', 'TRX',
+)
+SORT_COLUMNS = {'volume': 'quote_volume', 'change': 'change', 'price': 'last'}
+COLUMNS = ('last', 'change', 'high', 'low', 'volume', 'quote_volume')
+ALL_QUOTES = 'ALL'
+
+
+def quote_asset(symbol: str) -> str:
+    return next((quote for quote in QUOTE_ASSETS if symbol.endswith(quote) and symbol != quote), '')
+
+
+def _number(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _encode_cursor(value: float, symbol: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([value, symbol]).encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        value, symbol = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(value), str(symbol)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor.') from None
+
+
+class TickerIndex:
+    def __init__(self, symbols: list[str], columns: dict[str, array]) -> None:
+        self.symbols = symbols
+        self.columns = columns
+        self.quotes = [quote_asset(symbol) for symbol in symbols]
+        # Descending by value, ties by symbol: (sort, quote) -> row numbers.
+        self.rankings: dict[tuple[str, str], array] = {}
+        for sort, column_name in SORT_COLUMNS.items():
+            column = columns[column_name]
+            ranked = sorted(range(len(symbols)), key=lambda row: (-column[row], symbols[row]))
+            self.rankings[(sort, ALL_QUOTES)] = array('i', ranked)
+            by_quote: dict[str, array] = {}
+            for row in ranked:
+                by_quote.setdefault(self.quotes[row], array('i')).append(row)
+            for quote, rows in by_quote.items():
+                if quote:
+                    self.rankings[(sort, quote)] = rows
+
+    @classmethod
+    def from_tickers(cls, tickers: list[dict]) -> 'TickerIndex':
+        """Parse the raw Binance 24h ticker list."""
+        symbols = [item.get('symbol', '') for item in tickers]
+        columns = {
+            'last': array('d', (_number(item.get('lastPrice')) for item in tickers)),
+            'change': array('d', (_number(item.get('priceChangePercent')) for item in tickers)),
+            'high': array('d', (_number(item.get('highPrice')) for item in tickers)),
+            'low': array('d', (_number(item.get('lowPrice')) for item in tickers)),
+            'volume': array('d', (_number(item.get('volume')) for item in tickers)),
+            'quote_volume': array('d', (_number(item.get('quoteVolume')) for item in tickers)),
+        }
+        return cls(symbols, columns)
+
+    @classmethod
+    def decode(cls, payload: bytes) -> 'TickerIndex':
+        """Rebuild from :meth:`encode` output (e.g. a shared snapshot)."""
+        data = json.loads(payload)
+        return cls(data['symbols'], {name: array('d', data[name]) for name in COLUMNS})
+
+    def encode(self) -> bytes:
+        data = {'symbols': self.symbols, **{name: self.columns[name].tolist() for name in COLUMNS}}
+        return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def row(self, row: int) -> dict:
+        columns = self.columns
+        return {
+            'symbol': self.symbols[row],
+            'lastPrice': columns['last'][row],
+            'priceChangePercent': columns['change'][row],
+            'highPrice': columns['high'][row],
+            'lowPrice': columns['low'][row],
+            'volume': columns['volume'][row],
+            'quoteVolume': columns['quote_volume'][row],
+        }
+
+    def page(self, quote: str = 'USDT', sort: str = 'volume', order: str = 'desc',
+             limit: int = 24, cursor: str | None = None) -> tuple[list[int], str | None, int]:
+        """Return (row numbers, next cursor, total rows for ``quote``)."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f'sort must be one of: {", ".join(SORT_COLUMNS)}.')
+        if order not in ('asc', 'desc'):
+            raise ValueError('order must be asc or desc.')
+        ranking = self.rankings.get((sort, quote), array('i'))
+        column = self.columns[SORT_COLUMNS[sort]]
+        symbols = self.symbols
+
+        def key(row: int) -> tuple[float, str]:
+            return -column[row], symbols[row]
+
+        if order == 'desc':
+            start = 0
+            if cursor:
+                value, symbol = _decode_cursor(cursor)
+                start = bisect_right(ranking, (-value, symbol), key=key)
+            rows = ranking[start:start + limit].tolist()
+            more = start + limit < len(ranking)
+        else:
+            end = len(ranking)
+            if cursor:
+                value, symbol = _decode_cursor(cursor)
+                end = bisect_left(ranking, (-value, symbol), key=key)
+            start = max(end - limit, 0)
+            rows = ranking[start:end].tolist()[::-1]
+            more = start > 0
+        next_cursor = _encode_cursor(column[rows[-1]], symbols[rows[-1]]) if rows and more else None
+        return rows, next_cursor, len(ranking)
+
+
+# One index per source kind, so snapshot readers and live refreshers don't evict each other.
+_current: dict[str, tuple[object, TickerIndex]] = {}
+
+
+def for_tickers(tickers: list[dict]) -> TickerIndex:
+    """Index for a raw ticker list, reused while the upstream cache returns the same list."""
+    current = _current.get('live')
+    if current is not None and current[0] is tickers:
+        return current[1]
+    index = TickerIndex.from_tickers(tickers)
+    _current['live'] = (tickers, index)
+    return index
+
+
+def for_snapshot(version: int, payload: bytes) -> TickerIndex:
+    """Index decoded from a ``tickers.index`` snapshot, reused until its version changes."""
+    current = _current.get('snapshot')
+    if current is not None and current[0] == version:
+        return current[1]
+    index = TickerIndex.decode(payload)
+    _current['snapshot'] = (version, index)
+    return index
+
+
+def for_last_good(payload: bytes) -> TickerIndex:
+    """Index decoded from a ``core.last_good`` payload, reused while it is the same bytes object."""
+    current = _current.get('last_good')
+    if current is not None and current[0] is payload:
+        return current[1]
+    index = TickerIndex.decode(payload)
+    _current['last_good'] = (payload, index)
+    return index
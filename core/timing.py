@@ -0,0 +1,217 @@
+"""
+Per-request phase timing, reported as ``Server-Timing`` and as histograms.
+
+``core.middleware.ServerTimingMiddleware`` opens a :class:`Timings` for each
+request. These phases add to it wherever they run, including the market
+batch and router pools and ``sync_to_async`` threads, which all carry the
+request's context:
+
+    db        every query, on any connection (wrapper installed on connect)
+    session   session store reads and writes (``core.sessions``), queries included
+    template  template rendering (:class:`TimedDjangoTemplates`)
+    upstream  provider calls made through :func:`upstream`, also per provider
+
+Concurrent calls add up, so a batch's upstream time can exceed its total.
+The middleware sends the phases in a ``Server-Timing`` header
+(SERVER_TIMING_HEADER decides who gets it) and observes them into the
+histograms below, which ``/metrics/`` serves in the Prometheus text format.
+Like ``market_cache.stats()`` the histograms are per process: scrape every
+worker.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+PHASES = ('db', 'session', 'template', 'upstream')
+
+
+class Timings:
+    """Seconds and occurrences per phase of one request."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.phases: dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.phases.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def snapshot(self) -> dict[str, tuple[float, int]]:
+        with self._lock:
+            return {name: (seconds, count) for name, (seconds, count) in self.phases.items()}
+
+
+_current: ContextVar[Timings | None] = ContextVar('request_timings', default=None)
+
+
+def begin() -> tuple[Timings, Token]:
+    timings = Timings()
+    return timings, _current.set(timings)
+
+
+def end(token: Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def phase(name: str):
+    """Add the time spent in the block to ``name`` of the current request, if any."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+@contextmanager
+def upstream(provider: str):
+    """Time one call to ``provider``, for the current request and the upstream histogram."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_SECONDS.observe((provider, outcome), elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add('upstream', elapsed)
+            timings.add(f'upstream-{provider}', elapsed)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add('db', time.perf_counter() - started)
+
+
+def install_query_timer(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver: time every query the connection runs."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class _TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with phase('template'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with rendering timed as the ``template`` phase."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name).template, self)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label tuple."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.bounds = tuple(sorted(settings.METRICS_BUCKETS))
+        # labels -> [count per bucket (not cumulative)..., sum, count]
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.bounds) + [0.0, 0]
+            if index < len(self.bounds):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        with self._lock:
+            snapshot = sorted((labels, list(series)) for labels, series in self._series.items())
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, series in snapshot:
+            pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip(self.bounds, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{pairs},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{pairs},le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{pairs}}} {series[-2]!r}')
+            lines.append(f'{self.name}_count{{{pairs}}} {series[-1]}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'nexus_http_request_duration_seconds', 'Time to response headers, per view.', ('view', 'method'),
+)
+PHASE_SECONDS = Histogram(
+    'nexus_http_request_phase_seconds',
+    'Time a request spent in a phase (db, session, template, upstream), for requests that had it.',
+    ('view', 'phase'),
+)
+UPSTREAM_SECONDS = Histogram(
+    'nexus_upstream_request_duration_seconds',
+    'Upstream provider calls, including those made outside requests.',
+    ('provider', 'outcome'),
+)
+HISTOGRAMS = (REQUEST_SECONDS, PHASE_SECONDS, UPSTREAM_SECONDS)
+
+
+def _header(phases: dict[str, tuple[float, int]], total: float) -> str:
+    metrics = []
+    for name, (seconds, count) in sorted(phases.items()):
+        if name == 'db':
+            desc = f';desc="{count} {"query" if count == 1 else "queries"}"'
+        elif name.startswith('upstream'):
+            desc = f';desc="{count} {"call" if count == 1 else "calls"}"'
+        else:
+            desc = ''
+        metrics.append(f'{name};dur={seconds * 1000:.1f}{desc}')
+    metrics.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+def finish(timings: Timings, view: str, method: str) -> str:
+    """Record a finished request in the histograms; returns its ``Server-Timing`` value (ms)."""
+    total = time.perf_counter() - timings.started
+    phases = timings.snapshot()
+    REQUEST_SECONDS.observe((view, method), total)
+    for name in PHASES:
+        if name in phases:
+            PHASE_SECONDS.observe((view, name), phases[name][0])
+    return _header(phases, total)
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,81 @@
+"""
+Recorded upstream responses for offline runs.
+
+With MARKET_UPSTREAM_RECORD on, every successful provider call made through
+``core.views`` / ``core.async_views`` is written to
+MARKET_UPSTREAM_FIXTURES_DIR as::
+
+    <provider>/<path with '/' as '_'>/<query digest>.json
+
+``manage.py replay_upstream`` serves those files back on the provider
+paths, so pointing the MARKET_*_BASE_URL settings at it reproduces the
+market API without network access.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ('binance', 'coinapi', 'coingecko', 'cryptocompare')
+# Provider query parameters that must never end up in a fixture file.
+SECRET_PARAMS = frozenset(('apikey', 'api_key', 'x_cg_pro_api_key'))
+
+
+def _canonical_query(query: dict[str, str]) -> str:
+    return '&'.join(f'{key}={value}' for key, value in sorted(query.items()) if key.lower() not in SECRET_PARAMS)
+
+
+def path_dir(root: Path, provider: str, path: str) -> Path:
+    return root / provider / (path.strip('/').replace('/', '_') or '_')
+
+
+def fixture_path(root: Path, provider: str, path: str, query: dict[str, str]) -> Path:
+    canonical = _canonical_query(query)
+    name = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16] if canonical else 'default'
+    return path_dir(root, provider, path) / f'{name}.json'
+
+
+def record(provider: str, url: str, payload) -> None:
+    """Write ``payload`` fetched from ``url`` as a fixture, when recording is enabled."""
+    if not settings.MARKET_UPSTREAM_RECORD:
+        return
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    base_path = urlsplit(getattr(settings, f'MARKET_{provider.upper()}_BASE_URL')).path.rstrip('/')
+    path = parts.path[len(base_path):] if parts.path.startswith(base_path) else parts.path
+    target = fixture_path(Path(settings.MARKET_UPSTREAM_FIXTURES_DIR), provider, path, query)
+    document = {
+        'provider': provider,
+        'path': path,
+        'query': {key: value for key, value in query.items() if key.lower() not in SECRET_PARAMS},
+        'recorded_at': int(time.time()),
+        'body': payload,
+    }
+    try:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_suffix(f'.{os.getpid()}.tmp')
+        tmp_path.write_text(json.dumps(document, separators=(',', ':')), encoding='utf-8')
+        os.replace(tmp_path, target)
+    except OSError:
+        logger.warning('Could not record upstream fixture %s', target, exc_info=True)
+
+
+def load(root: Path, provider: str, path: str, query: dict[str, str]) -> bytes | None:
+    """Body of the fixture for this exact call, else of any recorded call to the same path."""
+    exact = fixture_path(root, provider, path, query)
+    candidates = [exact] if exact.is_file() else sorted(path_dir(root, provider, path).glob('*.json'))
+    for candidate in candidates:
+        try:
+            document = json.loads(candidate.read_bytes())
+        except (OSError, ValueError):
+            continue
+        return json.dumps(document.get('body'), separators=(',', ':')).encode('utf-8')
+    return None
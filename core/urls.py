@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
+
+# Under ASGI the market API can run on the async views and their pooled
+# keep-alive upstream connections instead of one blocked thread per poll.
+market_views = async_views if settings.MARKET_ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.index, name='index'),
@@ -15,13 +20,17 @@ urlpatterns = [
     path('account/verification/', views.verification, name='verification'),
     path('account/security/', views.security, name='security'),
     path('dashboard/trade-history/', views.trade_history, name='trade_history'),
-    path('api/market/ohlcv/', views.market_ohlcv, name='market_ohlcv'),
-    path('api/market/price/', views.market_price, name='market_price'),
-    path('api/market/depth/', views.market_depth, name='market_depth'),
-    path('api/market/trades/', views.market_trades, name='market_trades'),
-    path('api/market/tickers/', views.market_tickers, name='market_tickers'),
-    path('api/market/top-assets/', views.top_assets, name='top_assets'),
-    path('api/market/news/', views.market_news, name='market_news'),
+    path('api/market/ohlcv/', market_views.market_ohlcv, name='market_ohlcv'),
+    path('api/market/price/', market_views.market_price, name='market_price'),
+    path('api/market/depth/', market_views.market_depth, name='market_depth'),
+    path('api/market/trades/', market_views.market_trades, name='market_trades'),
+    path('api/market/tickers/', market_views.market_tickers, name='market_tickers'),
+    path('api/market/top-assets/', market_views.top_assets, name='top_assets'),
+    path('api/market/news/', market_views.market_news, name='market_news'),
+    path('api/market/batch/', market_views.market_batch, name='market_batch'),
+    path('api/market/stream/', async_views.market_stream, name='market_stream'),
+    path('api/market/cache-stats/', views.market_cache_stats, name='market_cache_stats'),
+    path('metrics/', views.metrics, name='metrics'),
     path('api/account/settings/profile/', views.save_settings_profile, name='save_settings_profile'),
     path('api/account/settings/notifications/', views.save_settings_notifications, name='save_settings_notifications'),
     path('api/account/settings/appearance/', views.save_settings_appearance, name='save_settings_appearance'),
@@ -1,37 +1,43 @@
-import random
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal, InvalidOperation
-from datetime import datetime, timedelta, timezone as dt_timezone
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable
 from urllib import parse, request as urllib_request
 from urllib.error import HTTPError, URLError
 
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, get_user_model, login as auth_login
 from django.contrib.auth.decorators import login_required
-from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth.password_validation import validate_password
 from django.conf import settings
-from django.db import DatabaseError, connection, transaction
-from django.http import JsonResponse
+from django.core.cache import caches
+from django.db import DatabaseError, close_old_connections, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpRequest, HttpResponse, JsonResponse, QueryDict
 from django.shortcuts import redirect, render
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 from django.views.decorators.http import require_POST
 from django.views import View
 
-from accounts.models import OTP
+from accounts import caching, ledger, otp, preferences
+from accounts.models import NOTIFICATION_FLAGS, UserPreferences
+
+from . import (
+    candles, encodings, last_good, market_cache, news_store, rate_limit, resample, router, snapshot_store,
+    ticker_index, timing, upstream_fixtures,
+)
+from .conditional import conditional
+from .encodings import encodable
+from .rate_limit import rate_limited
 
 User = get_user_model()
 
+# Where older releases kept settings preferences; adopted into UserPreferences on first read.
 SETTINGS_SESSION_KEY = 'account_settings_preferences'
-NOTIFICATION_PREF_KEYS = (
-    'price_alerts',
-    'trade_execution',
-    'security_warnings',
-    'liquidation_warning',
-    'funding_rate_reminder',
-    'newsletter_updates',
-    'email_notifications',
-    'push_notifications',
-)
+NOTIFICATION_PREF_KEYS = NOTIFICATION_FLAGS
 THEME_OPTIONS = ('Dark', 'Light', 'System')
 ACCENT_OPTIONS = ('#7c3aed', '#3b82f6', '#22c55e', '#f97316', '#ef4444', '#ec4899')
 LANGUAGE_OPTIONS = ('English (US)', 'Hindi')
@@ -45,21 +51,16 @@ def _get_user_wallet_usd(user) -> Decimal:
     if not user or not getattr(user, 'is_authenticated', False):
         return Decimal('0.00')
     try:
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "SELECT available_usd FROM accounts_wallet WHERE user_id = %s LIMIT 1",
-                [user.id],
-            )
-            row = cursor.fetchone()
-            if not row or row[0] is None:
-                return Decimal('0.00')
-            return Decimal(str(row[0])).quantize(Decimal('0.01'))
+        return ledger.balance(user)
     except (DatabaseError, InvalidOperation, TypeError, ValueError):
         return Decimal('0.00')
 
 
-def _wallet_context(user) -> dict:
-    amount = _get_user_wallet_usd(user)
+def _wallet_cache_key(user_id: int) -> str:
+    return f'wallet:{user_id}'
+
+
+def _wallet_values(amount: Decimal) -> dict:
     return {
         'wallet_usd': amount,
         'wallet_usd_display': f'{amount:,.2f}',
@@ -67,6 +68,19 @@ def _wallet_context(user) -> dict:
     }
 
 
+def _wallet_context(user) -> dict:
+    """Wallet template values, from the shared ``wallet`` cache when present (see _credit_user_wallet)."""
+    if not user or not getattr(user, 'is_authenticated', False):
+        return _wallet_values(Decimal('0.00'))
+    # Generation first, balance second: see accounts.caching.
+    key = caching.key(caches['wallet'], _wallet_cache_key(user.pk))
+    values = caches['wallet'].get(key)
+    if values is None:
+        values = _wallet_values(_get_user_wallet_usd(user))
+        caches['wallet'].add(key, values, settings.WALLET_CACHE_TIMEOUT)
+    return dict(values)
+
+
 def _account_sidebar_items(active_url_name: str) -> list[dict[str, str | bool]]:
     items = [
         {'url_name': 'overview', 'icon_class': 'fas fa-th-large', 'label': 'Overview'},
@@ -82,49 +96,33 @@ def _account_sidebar_items(active_url_name: str) -> list[dict[str, str | bool]]:
     return items
 
 
-def _default_settings_preferences() -> dict:
-    return {
-        'full_name': '',
-        'phone_number': '',
-        'notifications': {
-            'price_alerts': True,
-            'trade_execution': True,
-            'security_warnings': True,
-            'liquidation_warning': True,
-            'funding_rate_reminder': False,
-            'newsletter_updates': False,
-            'email_notifications': True,
-            'push_notifications': False,
-        },
-        'theme': 'Dark',
-        'accent_color': '#7c3aed',
-        'language': 'English (US)',
-        'timezone': 'UTC+05:30 Mumbai',
-        'currency': 'USD ($)',
-        'date_format': 'DD/MM/YYYY',
-    }
+def _nest_settings_preferences(values: dict) -> dict:
+    """Settings page shape of flat preferences: notification flags under 'notifications'."""
+    prefs = {key: value for key, value in values.items() if key not in NOTIFICATION_PREF_KEYS}
+    prefs['notifications'] = {key: values[key] for key in NOTIFICATION_PREF_KEYS}
+    return prefs
 
 
-def _get_settings_preferences(request) -> dict:
-    defaults = _default_settings_preferences()
-    stored = request.session.get(SETTINGS_SESSION_KEY)
+def _adopt_session_preferences(request) -> None:
+    stored = request.session.pop(SETTINGS_SESSION_KEY, None)
     if not isinstance(stored, dict):
-        return defaults
-
-    prefs = defaults
-    prefs.update({k: v for k, v in stored.items() if k in prefs and k != 'notifications'})
+        return
+    changes = {
+        key: value[:UserPreferences._meta.get_field(key).max_length]
+        for key, value in stored.items()
+        if key in preferences.FIELDS and key not in NOTIFICATION_PREF_KEYS and isinstance(value, str)
+    }
     notif_stored = stored.get('notifications')
     if isinstance(notif_stored, dict):
-        prefs['notifications'].update({
-            key: bool(notif_stored.get(key, prefs['notifications'][key]))
-            for key in NOTIFICATION_PREF_KEYS
-        })
-    return prefs
+        changes.update({key: bool(notif_stored[key]) for key in NOTIFICATION_PREF_KEYS if key in notif_stored})
+    if changes:
+        preferences.update(request.user, **changes)
 
 
-def _save_settings_preferences(request, prefs: dict) -> None:
-    request.session[SETTINGS_SESSION_KEY] = prefs
-    request.session.modified = True
+def _get_settings_preferences(request) -> dict:
+    if SETTINGS_SESSION_KEY in request.session:
+        _adopt_session_preferences(request)
+    return _nest_settings_preferences(preferences.get(request.user))
 
 
 def _settings_page_context(user, prefs: dict) -> dict:
@@ -254,43 +252,21 @@ def _settings_page_context(user, prefs: dict) -> dict:
     }
 
 
-def _credit_user_wallet(user, credit_amount: Decimal) -> Decimal:
-    """Atomically credit a user's wallet balance and return new amount."""
+def _credit_user_wallet(user, credit_amount: Decimal, reference: str = '') -> Decimal:
+    """Atomically credit a user's wallet balance, record it in the ledger and return new amount."""
     if credit_amount <= 0:
         return _get_user_wallet_usd(user)
-
-    now = timezone.now()
-    with transaction.atomic():
-        with connection.cursor() as cursor:
-            cursor.execute(
-                "SELECT id, available_usd FROM accounts_wallet WHERE user_id = %s LIMIT 1",
-                [user.id],
-            )
-            row = cursor.fetchone()
-            if row:
-                wallet_id, current_amount = row[0], Decimal(str(row[1] or 0))
-                new_amount = (current_amount + credit_amount).quantize(Decimal('0.01'))
-                cursor.execute(
-                    "UPDATE accounts_wallet SET available_usd = %s, updated_at = %s WHERE id = %s",
-                    [str(new_amount), now, wallet_id],
-                )
-                return new_amount
-
-            new_amount = credit_amount.quantize(Decimal('0.01'))
-            cursor.execute(
-                "INSERT INTO accounts_wallet (available_usd, updated_at, user_id) VALUES (%s, %s, %s)",
-                [str(new_amount), now, user.id],
-            )
-            return new_amount
+    new_amount = ledger.credit(user, credit_amount, reference=reference)
+    # Invalidate rather than write through: commits of concurrent credits land in
+    # any order, so a set here could leave the lower balance cached. A new
+    # generation also orphans a value read before the commit and added after it.
+    transaction.on_commit(lambda: caching.invalidate(caches['wallet'], _wallet_cache_key(user.pk)))
+    return new_amount
 
 
 def _create_otp_for_user(user):
-    """Generate a 6-digit OTP, store hashed version, return plain code for sending."""
-    code = ''.join(str(random.randint(0, 9)) for _ in range(6))
-    otp_hash = make_password(code)
-    expires_at = timezone.now() + timedelta(minutes=5)
-    OTP.objects.create(user=user, otp_hash=otp_hash, expires_at=expires_at)
-    return code
+    """Issue a 6-digit OTP (replacing any earlier one) and return the plain code for sending."""
+    return otp.issue(user)
 
 
 def index(request):
@@ -377,6 +353,10 @@ def save_settings_profile(request):
 
     if not username:
         return JsonResponse({'ok': False, 'error': 'Username is required.'}, status=400)
+    if len(full_name) > UserPreferences._meta.get_field('full_name').max_length:
+        return JsonResponse({'ok': False, 'error': 'Full name is too long.'}, status=400)
+    if len(phone_number) > UserPreferences._meta.get_field('phone_number').max_length:
+        return JsonResponse({'ok': False, 'error': 'Phone number is too long.'}, status=400)
 
     if User.objects.exclude(pk=request.user.pk).filter(username=username).exists():
         return JsonResponse({'ok': False, 'error': 'This username is already in use.'}, status=400)
@@ -387,10 +367,7 @@ def save_settings_profile(request):
     request.user.last_name = name_parts[1] if len(name_parts) > 1 else ''
     request.user.save(update_fields=['username', 'first_name', 'last_name'])
 
-    prefs = _get_settings_preferences(request)
-    prefs['full_name'] = full_name
-    prefs['phone_number'] = phone_number
-    _save_settings_preferences(request, prefs)
+    preferences.update(request.user, full_name=full_name, phone_number=phone_number)
 
     return JsonResponse({
         'ok': True,
@@ -412,12 +389,12 @@ def save_settings_notifications(request):
     if not isinstance(raw_notifications, dict):
         return JsonResponse({'ok': False, 'error': 'notifications must be an object.'}, status=400)
 
-    prefs = _get_settings_preferences(request)
-    for key in NOTIFICATION_PREF_KEYS:
-        prefs['notifications'][key] = bool(raw_notifications.get(key, False))
-    _save_settings_preferences(request, prefs)
+    # Only the flags sent are written, so a single toggle is a one-column update.
+    values = preferences.update(request.user, **{
+        key: bool(raw_notifications[key]) for key in NOTIFICATION_PREF_KEYS if key in raw_notifications
+    })
 
-    return JsonResponse({'ok': True, 'notifications': prefs['notifications']})
+    return JsonResponse({'ok': True, 'notifications': _nest_settings_preferences(values)['notifications']})
 
 
 @login_required(login_url='login')
@@ -448,14 +425,15 @@ def save_settings_appearance(request):
     if date_format not in DATE_FORMAT_OPTIONS:
         return JsonResponse({'ok': False, 'error': 'Invalid date format.'}, status=400)
 
-    prefs = _get_settings_preferences(request)
-    prefs['theme'] = theme
-    prefs['accent_color'] = accent_color
-    prefs['language'] = language
-    prefs['timezone'] = timezone_value
-    prefs['currency'] = currency
-    prefs['date_format'] = date_format
-    _save_settings_preferences(request, prefs)
+    preferences.update(
+        request.user,
+        theme=theme,
+        accent_color=accent_color,
+        language=language,
+        timezone=timezone_value,
+        currency=currency,
+        date_format=date_format,
+    )
 
     return JsonResponse({'ok': True, 'appearance': {
         'theme': theme,
@@ -473,43 +451,61 @@ def verification(request):
     return render(request, 'core/verification.html')
 
 
+COINAPI_BASE_URL = settings.MARKET_COINAPI_BASE_URL.rstrip('/')
+BINANCE_BASE_URL = settings.MARKET_BINANCE_BASE_URL.rstrip('/')
+COINGECKO_BASE_URL = settings.MARKET_COINGECKO_BASE_URL.rstrip('/')
+CRYPTOCOMPARE_BASE_URL = settings.MARKET_CRYPTOCOMPARE_BASE_URL.rstrip('/')
+CRYPTOCOMPARE_HEADERS = {'User-Agent': 'NexusPro/1.0'}
+
+
+def _http_get_json(url: str, headers: dict[str, str] | None = None):
+    req = urllib_request.Request(url, headers=headers or {})
+    with urllib_request.urlopen(req, timeout=12) as resp:
+        payload = resp.read().decode('utf-8')
+    return json.loads(payload)
+
+
+def _budgeted_get_json(
+    provider: str, path: str, url: str, headers: dict[str, str] | None = None, query: dict[str, str] | None = None,
+):
+    """Upstream GET charged to the provider's global budget (core.rate_limit), recorded when enabled."""
+    rate_limit.spend_upstream(provider, path, query)
+    with timing.upstream(provider):
+        payload = _http_get_json(url, headers)
+    upstream_fixtures.record(provider, url, payload)
+    return payload
+
+
 def _coinapi_get(path: str, query: dict[str, str]) -> dict:
     if not settings.COINAPI_KEY:
         raise ValueError('COINAPI_KEY is missing')
     qs = parse.urlencode(query)
-    url = f'https://rest.coinapi.io{path}?{qs}'
-    req = urllib_request.Request(url, headers={'X-CoinAPI-Key': settings.COINAPI_KEY})
-    with urllib_request.urlopen(req, timeout=12) as resp:
-        payload = resp.read().decode('utf-8')
-    return json.loads(payload)
+    url = f'{COINAPI_BASE_URL}{path}?{qs}'
+    return market_cache.fetch(
+        'coinapi', path, query,
+        lambda: _budgeted_get_json('coinapi', path, url, {'X-CoinAPI-Key': settings.COINAPI_KEY}),
+    )
 
 
 def _binance_get(path: str, query: dict[str, str]) -> dict:
     qs = parse.urlencode(query)
-    url = f'https://api.binance.com{path}?{qs}'
-    req = urllib_request.Request(url)
-    with urllib_request.urlopen(req, timeout=12) as resp:
-        payload = resp.read().decode('utf-8')
-    return json.loads(payload)
+    url = f'{BINANCE_BASE_URL}{path}?{qs}'
+    return market_cache.fetch(
+        'binance', path, query, lambda: _budgeted_get_json('binance', path, url, query=query),
+    )
 
 
 def _coingecko_get(path: str, query: dict[str, str]) -> dict:
     qs = parse.urlencode(query)
-    url = f'https://api.coingecko.com{path}?{qs}'
-    req = urllib_request.Request(url)
-    with urllib_request.urlopen(req, timeout=12) as resp:
-        payload = resp.read().decode('utf-8')
-    return json.loads(payload)
+    url = f'{COINGECKO_BASE_URL}{path}?{qs}'
+    return market_cache.fetch('coingecko', path, query, lambda: _budgeted_get_json('coingecko', path, url))
 
 
 def _cryptocompare_news_get(query: dict[str, str]) -> dict:
     """Fetch crypto news from CryptoCompare public API."""
     qs = parse.urlencode(query)
-    url = f'https://min-api.cryptocompare.com/data/v2/news/?{qs}'
-    req = urllib_request.Request(url, headers={'User-Agent': 'NexusPro/1.0'})
-    with urllib_request.urlopen(req, timeout=12) as resp:
-        payload = resp.read().decode('utf-8')
-    return json.loads(payload)
+    url = f'{CRYPTOCOMPARE_BASE_URL}/data/v2/news/?{qs}'
+    return _budgeted_get_json('cryptocompare', '/data/v2/news/', url, CRYPTOCOMPARE_HEADERS)
 
 
 def _news_rows(payload: dict) -> list[dict]:
@@ -520,25 +516,9 @@ def _news_rows(payload: dict) -> list[dict]:
 
 
 def _filter_news_rows(rows: list[dict], category: str) -> list[dict]:
-    category_map = {
-        'BTC': ('bitcoin', 'btc'),
-        'ETH': ('ethereum', 'eth'),
-        'DEFI': ('defi', 'decentralized finance', 'dex', 'yield'),
-        'REGULATION': ('regulation', 'sec', 'compliance', 'law', 'policy'),
-    }
-    keywords = category_map.get(category, ())
-    if not keywords:
+    if category not in news_store.CATEGORY_KEYWORDS:
         return rows
-
-    filtered: list[dict] = []
-    for row in rows:
-        title = str(row.get('title') or '').lower()
-        body = str(row.get('body') or '').lower()
-        categories = str(row.get('categories') or '').lower()
-        text = f'{title} {body} {categories}'
-        if any(keyword in text for keyword in keywords):
-            filtered.append(row)
-    return filtered
+    return [row for row in rows if news_store.matches_category(row, category)]
 
 
 def _local_fallback_news_rows() -> list[dict]:
@@ -583,56 +563,433 @@ def _local_fallback_news_rows() -> list[dict]:
     ]
 
 
-@login_required(login_url='login')
-def market_ohlcv(request):
+# CoinAPI period_id -> Binance kline interval.
+PERIOD_TO_INTERVAL = {
+    '1MIN': '1m',
+    '5MIN': '5m',
+    '15MIN': '15m',
+    '30MIN': '30m',
+    '1HRS': '1h',
+    '4HRS': '4h',
+    '1DAY': '1d',
+    '7DAY': '1w',
+}
+
+
+def _klines_query(symbol: str, interval: str, limit: int) -> dict[str, str]:
+    return {'symbol': symbol, 'interval': interval, 'limit': str(limit)}
+
+
+def _klines_result(symbol: str, klines: list) -> dict:
+    rows = [{
+        'time_period_start': datetime.fromtimestamp(item[0] / 1000, tz=dt_timezone.utc).isoformat(),
+        'time_period_end': datetime.fromtimestamp(item[6] / 1000, tz=dt_timezone.utc).isoformat(),
+        'price_open': float(item[1]),
+        'price_high': float(item[2]),
+        'price_low': float(item[3]),
+        'price_close': float(item[4]),
+        'volume_traded': float(item[5]),
+    } for item in klines]
+    return {'ok': True, 'source': 'binance', 'symbol': symbol, 'rows': rows}
+
+
+def _klines_payload(symbol: str, interval: str, limit: int) -> dict:
+    return _klines_result(symbol, _binance_get('/api/v3/klines', _klines_query(symbol, interval, limit)))
+
+
+def _ohlcv_params(request) -> dict:
     base = (request.GET.get('base') or 'BTC').upper()
     quote = (request.GET.get('quote') or 'USDT').upper()
-    symbol = request.GET.get('symbol', f'BINANCE_SPOT_{base}_{quote}')
-    period = request.GET.get('period_id', '1MIN')
     limit = request.GET.get('limit', '90')
     try:
-        data = _coinapi_get(
-            f'/v1/ohlcv/{symbol}/latest',
-            {'period_id': period, 'limit': limit},
-        )
-        return JsonResponse({'ok': True, 'source': 'coinapi', 'symbol': symbol, 'rows': data})
-    except Exception:
+        binance_limit = min(max(int(limit), 10), 500)
+    except ValueError:
+        binance_limit = 90
+    return {
+        'base': base,
+        'quote': quote,
+        'symbol': request.GET.get('symbol', f'BINANCE_SPOT_{base}_{quote}'),
+        'period': request.GET.get('period_id', '1MIN'),
+        'limit': limit,
+        'binance_limit': binance_limit,
+    }
+
+
+def _ohlcv_store_payload(symbol: str, interval: str, limit: int, sync: bool = True,
+                         raw: bool = False) -> dict | None:
+    """Serve candles from the local store, first syncing newer bars from Binance.
+
+    Timeframes whose window spans at most MARKET_RESAMPLE_MAX_MINUTES are
+    derived from stored 1m bars; longer ones are stored per interval. With
+    ``raw`` the bars are left as kline tuples under ``klines`` for
+    ``core.encodings``.
+    """
+    minutes = resample.minutes_needed(interval, limit)
+    resampled = interval != '1m' and minutes <= settings.MARKET_RESAMPLE_MAX_MINUTES
+    if sync:
         try:
-            binance_limit = min(max(int(limit), 10), 500)
-        except ValueError:
-            binance_limit = 90
-        klines = _binance_get('/api/v3/klines', {
-            'symbol': f'{base}{quote}',
-            'interval': '1m',
-            'limit': str(binance_limit),
-        })
-        rows = [{
-            'time_period_start': datetime.fromtimestamp(item[0] / 1000, tz=dt_timezone.utc).isoformat(),
-            'time_period_end': datetime.fromtimestamp(item[6] / 1000, tz=dt_timezone.utc).isoformat(),
-            'price_open': float(item[1]),
-            'price_high': float(item[2]),
-            'price_low': float(item[3]),
-            'price_close': float(item[4]),
-            'volume_traded': float(item[5]),
-        } for item in klines]
-        return JsonResponse({'ok': True, 'source': 'binance', 'symbol': f'{base}{quote}', 'rows': rows})
+            if resampled:
+                candles.sync(symbol, '1m', minutes, lambda query: _binance_get('/api/v3/klines', query))
+            else:
+                candles.sync(symbol, interval, limit, lambda query: _binance_get('/api/v3/klines', query))
+        except Exception:
+            pass  # serve whatever is already stored
+    rows = resample.window(symbol, interval, limit) if resampled else candles.rows(symbol, interval, limit)
+    if not rows:
+        return None
+    payload = {'ok': True, 'symbol': symbol, 'klines': rows} if raw else _klines_result(symbol, rows)
+    payload['source'] = 'resampled' if resampled else 'store'
+    payload['interval'] = interval
+    return payload
+
+
+def _ohlcv_snapshot_response(params: dict) -> HttpResponse | None:
+    interval = PERIOD_TO_INTERVAL.get(params['period'].upper())
+    snapshot = _read_snapshot(f'ohlcv.{params["base"]}{params["quote"]}.{interval}') if interval else None
+    if snapshot is None:
+        return None
+    payload = json.loads(snapshot.payload)
+    try:
+        payload['rows'] = payload['rows'][-max(int(params['limit']), 1):]
+    except ValueError:
+        pass
+    return _snapshot_response(snapshot, payload)
 
 
 @login_required(login_url='login')
+@rate_limited('ohlcv')
+@encodable('ohlcv')
+def market_ohlcv(request):
+    params = _ohlcv_params(request)
+    snapshot_response = _ohlcv_snapshot_response(params)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    pair = f'{params["base"]}{params["quote"]}'
+    interval = PERIOD_TO_INTERVAL.get(params['period'].upper())
+    if interval:
+        fmt = encodings.requested_format(request)
+        payload = _ohlcv_store_payload(
+            pair, interval, params['binance_limit'], sync=not _ingestor_only(), raw=fmt != 'json',
+        )
+        if payload is not None:
+            return JsonResponse(payload) if fmt == 'json' else encodings.encode(payload, 'ohlcv', fmt)
+    if _ingestor_only():
+        return _not_ingested_response('candles')
+
+    return JsonResponse(router.route(_ohlcv_providers(params, pair, interval or '1m')))
+
+
+def _coinapi_ohlcv_query(params: dict) -> tuple[str, dict[str, str]]:
+    return f'/v1/ohlcv/{params["symbol"]}/latest', {'period_id': params['period'], 'limit': params['limit']}
+
+
+def _coinapi_ohlcv_result(symbol: str, rows: list) -> dict:
+    return {'ok': True, 'source': 'coinapi', 'symbol': symbol, 'rows': rows}
+
+
+def _ohlcv_providers(params: dict, pair: str, interval: str) -> list:
+    """(provider, call) candidates for ``router.route``; CoinAPI only when a key is configured."""
+    providers = []
+    if settings.COINAPI_KEY:
+        providers.append(('coinapi', lambda: _coinapi_ohlcv_result(
+            params['symbol'], _coinapi_get(*_coinapi_ohlcv_query(params)),
+        )))
+    providers.append(('binance', lambda: _klines_payload(pair, interval, params['binance_limit'])))
+    return providers
+
+
+def _price_providers(asset_base: str, asset_quote: str) -> list:
+    providers = []
+    if settings.COINAPI_KEY:
+        providers.append(('coinapi', lambda: {
+            'ok': True, 'source': 'coinapi', 'data': _coinapi_get(f'/v1/exchangerate/{asset_base}/{asset_quote}', {}),
+        }))
+    providers.append(('binance', lambda: _binance_price_result(
+        asset_base, asset_quote, _binance_get('/api/v3/ticker/price', {'symbol': _binance_pair(asset_base, asset_quote)}),
+    )))
+    return providers
+
+
+@login_required(login_url='login')
+@rate_limited('price')
 def market_price(request):
     asset_base = request.GET.get('base', 'BTC')
     asset_quote = request.GET.get('quote', 'USD')
+    return JsonResponse(router.route(_price_providers(asset_base, asset_quote)))
+
+
+def _binance_pair(asset_base: str, asset_quote: str) -> str:
+    return f'{asset_base}{asset_quote if asset_quote != "USD" else "USDT"}'
+
+
+def _binance_price_result(asset_base: str, asset_quote: str, ticker: dict) -> dict:
+    data = {'asset_id_base': asset_base, 'asset_id_quote': asset_quote, 'rate': float(ticker['price'])}
+    return {'ok': True, 'source': 'binance', 'data': data}
+
+
+def _encode_payload(payload: dict) -> bytes:
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+def _depth_query(symbol: str, limit: int) -> dict[str, str]:
+    return {'symbol': symbol, 'limit': str(limit)}
+
+
+def _depth_result(symbol: str, payload: dict) -> dict:
+    return {
+        'ok': True,
+        'source': 'binance',
+        'symbol': symbol,
+        'asks': payload.get('asks') or [],
+        'bids': payload.get('bids') or [],
+    }
+
+
+def _depth_payload(symbol: str, limit: int) -> dict:
+    return _depth_result(symbol, _binance_get('/api/v3/depth', _depth_query(symbol, limit)))
+
+
+def _tickers_page_result(index: ticker_index.TickerIndex, quote: str = 'USDT', sort: str = 'volume',
+                         order: str = 'desc', limit: int = 24, cursor: str | None = None) -> dict:
+    rows, next_cursor, total = index.page(quote, sort, order, limit, cursor)
+    return {
+        'ok': True,
+        'source': 'binance',
+        'rows': [index.row(row) for row in rows],
+        'quote': quote,
+        'sort': sort,
+        'order': order,
+        'total': total,
+        'nextCursor': next_cursor,
+    }
+
+
+def _tickers_result(tickers: list) -> dict:
+    return _tickers_page_result(ticker_index.for_tickers(tickers))
+
+
+def _tickers_payload() -> dict:
+    return _tickers_result(_binance_get('/api/v3/ticker/24hr', {}))
+
+
+def _ticker_index_payload() -> bytes:
+    return ticker_index.for_tickers(_binance_get('/api/v3/ticker/24hr', {})).encode()
+
+
+def _tickers_params(request) -> dict:
+    """quote/sort/order/limit/cursor for the ticker index (validated by ``TickerIndex.page``)."""
     try:
-        data = _coinapi_get(f'/v1/exchangerate/{asset_base}/{asset_quote}', {})
-        return JsonResponse({'ok': True, 'source': 'coinapi', 'data': data})
-    except Exception:
-        pair = f'{asset_base}{asset_quote if asset_quote != "USD" else "USDT"}'
-        ticker = _binance_get('/api/v3/ticker/price', {'symbol': pair})
-        data = {'asset_id_base': asset_base, 'asset_id_quote': asset_quote, 'rate': float(ticker['price'])}
-        return JsonResponse({'ok': True, 'source': 'binance', 'data': data})
+        limit = min(max(int(request.GET.get('limit', '24')), 1), settings.MARKET_TICKERS_MAX_LIMIT)
+    except ValueError:
+        limit = 24
+    return {
+        'quote': (request.GET.get('quote') or 'USDT').upper(),
+        'sort': (request.GET.get('sort') or 'volume').lower(),
+        'order': (request.GET.get('order') or 'desc').lower(),
+        'limit': limit,
+        'cursor': request.GET.get('cursor') or None,
+    }
+
+
+def _trades_query(symbol: str, limit: int) -> dict[str, str]:
+    return {'symbol': symbol, 'limit': str(limit)}
+
+
+def _trades_result(symbol: str, payload: list) -> dict:
+    rows = [{
+        'id': item.get('id'),
+        'price': float(item.get('price', '0') or 0),
+        'qty': float(item.get('qty', '0') or 0),
+        'quoteQty': float(item.get('quoteQty', '0') or 0),
+        'time': int(item.get('time', 0) or 0),
+        'isBuyerMaker': bool(item.get('isBuyerMaker', False)),
+    } for item in payload]
+    return {'ok': True, 'source': 'binance', 'symbol': symbol, 'rows': rows}
+
+
+def _trades_payload(symbol: str, limit: int) -> dict:
+    return _trades_result(symbol, _binance_get('/api/v3/trades', _trades_query(symbol, limit)))
+
+
+COINGECKO_MARKETS_QUERY = {
+    'vs_currency': 'usd',
+    'order': 'market_cap_desc',
+    'per_page': '100',
+    'page': '1',
+    'sparkline': 'false',
+}
+
+
+def _coingecko_assets_result(rows: list) -> dict:
+    assets = [{
+        'symbol': item.get('symbol', '').upper(),
+        'name': item.get('name', ''),
+        'image': item.get('image', ''),
+    } for item in rows if item.get('symbol') and item.get('name')]
+    return {'ok': True, 'source': 'coingecko', 'assets': assets}
+
+
+def _binance_assets_result(tickers: list) -> dict:
+    index = ticker_index.for_tickers(tickers)
+    rows, _, _ = index.page('USDT', 'volume', limit=100)
+    assets = []
+    for row in rows:
+        symbol = index.symbols[row].replace('USDT', '')
+        assets.append({'symbol': symbol, 'name': symbol, 'image': ''})
+    return {'ok': True, 'source': 'binance', 'assets': assets}
+
+
+def _top_assets_payload() -> dict:
+    return router.route([
+        ('coingecko', lambda: _coingecko_assets_result(_coingecko_get('/api/v3/coins/markets', COINGECKO_MARKETS_QUERY))),
+        ('binance', lambda: _binance_assets_result(_binance_get('/api/v3/ticker/24hr', {}))),
+    ])
+
+
+def _snapshot_feeds(
+    symbols: list[str] | None = None,
+    intervals: dict[str, float] | None = None,
+) -> list[snapshot_store.Feed]:
+    """Feeds the elected snapshot writer keeps fresh for every worker on this host."""
+    symbols = settings.MARKET_SNAPSHOT_SYMBOLS if symbols is None else symbols
+    intervals = intervals or settings.MARKET_SNAPSHOT_INTERVALS
+    depth_limit = settings.MARKET_SNAPSHOT_DEPTH_LIMIT
+    trades_limit = settings.MARKET_SNAPSHOT_TRADES_LIMIT
+    feeds = [
+        snapshot_store.Feed('tickers', intervals['tickers'], lambda: _encode_payload(_tickers_payload())),
+        snapshot_store.Feed('tickers.index', intervals['tickers'], _ticker_index_payload),
+        snapshot_store.Feed('top_assets', intervals['top_assets'], lambda: _encode_payload(_top_assets_payload())),
+    ]
+    for symbol in symbols:
+        feeds.append(snapshot_store.Feed(
+            f'depth.{symbol}', intervals['depth'],
+            lambda symbol=symbol: _encode_payload(_depth_payload(symbol, depth_limit)),
+        ))
+        feeds.append(snapshot_store.Feed(
+            f'trades.{symbol}', intervals['trades'],
+            lambda symbol=symbol: _encode_payload(_trades_payload(symbol, trades_limit)),
+        ))
+    return feeds
+
+
+def _ingestor_only() -> bool:
+    """In ingestor mode request handlers never call upstream providers."""
+    return settings.MARKET_DATA_MODE == 'ingestor'
+
+
+def _read_snapshot(key: str) -> snapshot_store.Snapshot | None:
+    """Return the stored snapshot for ``key``, or None to fetch live.
+
+    ``shared`` mode elects a writer among the web workers and ignores snapshots
+    older than MARKET_SNAPSHOT_MAX_AGE. ``ingestor`` mode relies on the
+    run_market_ingestor command and serves whatever it last stored.
+    """
+    mode = settings.MARKET_DATA_MODE
+    if mode not in ('shared', 'ingestor'):
+        return None
+    if mode == 'shared':
+        snapshot_store.ensure_writer(_snapshot_feeds)
+    snapshot = snapshot_store.read(key)
+    if snapshot is None:
+        return None
+    if mode == 'shared' and snapshot.age_seconds > settings.MARKET_SNAPSHOT_MAX_AGE:
+        return None
+    return snapshot
+
+
+def _not_ingested_response(label: str) -> JsonResponse:
+    return JsonResponse({'ok': False, 'error': f'No ingested {label} available yet.'}, status=503)
+
+
+def _snapshot_response(snapshot: snapshot_store.Snapshot, payload: dict | None = None) -> HttpResponse:
+    """Serve a snapshot as stored, or ``payload`` derived from it, with version/age headers."""
+    if payload is None:
+        response = HttpResponse(snapshot.payload, content_type='application/json')
+    else:
+        response = JsonResponse(payload)
+    response['X-Snapshot-Version'] = str(snapshot.version)
+    response['X-Snapshot-Age'] = f'{snapshot.age_seconds:.3f}'
+    return response
+
+
+def _live_json(key: str, payload: dict) -> HttpResponse:
+    """Serve a freshly fetched payload and remember it as ``key``'s last good one."""
+    body = _encode_payload(payload)
+    last_good.remember(key, body)
+    return HttpResponse(body, content_type='application/json')
+
+
+def _stale_response(payload: dict, age: float) -> JsonResponse:
+    payload['stale'] = True
+    response = JsonResponse(payload)
+    response['X-Stale-Age'] = f'{age:.3f}'
+    return response
+
+
+def _last_good_response(key: str, refresh: Callable[[], dict], limit: int,
+                        fields: tuple[str, ...]) -> HttpResponse | None:
+    """Stale-if-error: ``key``'s last good payload trimmed to ``limit`` rows, refreshed in the background."""
+    stale = last_good.serve_stale(key, lambda: (_encode_payload(refresh()), None))
+    if stale is None:
+        return None
+    body, age = stale
+    payload = json.loads(body)
+    for field in fields:
+        payload[field] = payload.get(field, [])[:limit]
+    return _stale_response(payload, age)
+
+
+def _live_ticker_index() -> ticker_index.TickerIndex:
+    index = ticker_index.for_tickers(_binance_get('/api/v3/ticker/24hr', {}))
+    last_good.remember('tickers.index', index, index.encode)
+    return index
+
+
+def _last_good_ticker_index() -> tuple[ticker_index.TickerIndex, float] | None:
+    def refresh():
+        index = ticker_index.for_tickers(_binance_get('/api/v3/ticker/24hr', {}))
+        return index, index.encode
+
+    stale = last_good.serve_stale('tickers.index', refresh)
+    if stale is None:
+        return None
+    body, age = stale
+    return ticker_index.for_last_good(body), age
+
+
+def _limited_snapshot_response(key: str, limit: int, stored_limit: int, fields: tuple[str, ...],
+                               label: str) -> HttpResponse | None:
+    """Serve ``key`` trimmed to ``limit`` rows per field when the snapshot holds enough of them."""
+    snapshot = _read_snapshot(key)
+    if snapshot is not None and (limit <= stored_limit or _ingestor_only()):
+        if limit >= stored_limit:
+            return _snapshot_response(snapshot)
+        payload = json.loads(snapshot.payload)
+        for field in fields:
+            payload[field] = payload[field][:limit]
+        return _snapshot_response(snapshot, payload)
+    if _ingestor_only():
+        return _not_ingested_response(label)
+    return None
+
+
+def _depth_snapshot_response(symbol: str, limit: int) -> HttpResponse | None:
+    return _limited_snapshot_response(
+        f'depth.{symbol}', limit, settings.MARKET_SNAPSHOT_DEPTH_LIMIT, ('asks', 'bids'), 'depth',
+    )
+
+
+def _trades_snapshot_response(symbol: str, limit: int) -> HttpResponse | None:
+    return _limited_snapshot_response(
+        f'trades.{symbol}', limit, settings.MARKET_SNAPSHOT_TRADES_LIMIT, ('rows',), 'trades',
+    )
 
 
 @login_required(login_url='login')
+@rate_limited('depth')
+@conditional('depth')
+@encodable('depth')
 def market_depth(request):
     base = (request.GET.get('base') or 'BTC').upper()
     quote = (request.GET.get('quote') or 'USDT').upper()
@@ -641,50 +998,64 @@ def market_depth(request):
     except ValueError:
         limit = 30
 
-    try:
-        payload = _binance_get('/api/v3/depth', {
-            'symbol': f'{base}{quote}',
-            'limit': str(limit),
-        })
-        asks = payload.get('asks') or []
-        bids = payload.get('bids') or []
-        return JsonResponse({
-            'ok': True,
-            'source': 'binance',
-            'symbol': f'{base}{quote}',
-            'asks': asks,
-            'bids': bids,
-        })
-    except Exception as exc:
-        return JsonResponse({'ok': False, 'error': f'Failed to load depth: {exc}'}, status=502)
+    symbol = f'{base}{quote}'
+    snapshot_response = _depth_snapshot_response(symbol, limit)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    key = f'depth.{symbol}'
+    error = 'upstream unavailable'
+    if not last_good.is_failing(key):
+        try:
+            return _live_json(key, _depth_payload(symbol, limit))
+        except Exception as exc:
+            error = exc
+    stale_response = _last_good_response(key, lambda: _depth_payload(symbol, limit), limit, ('asks', 'bids'))
+    if stale_response is not None:
+        return stale_response
+    return JsonResponse({'ok': False, 'error': f'Failed to load depth: {error}'}, status=502)
 
 
 @login_required(login_url='login')
+@rate_limited('tickers')
+@conditional('tickers')
 def market_tickers(request):
+    if not request.GET.keys() - {'since'}:
+        snapshot = _read_snapshot('tickers')
+        if snapshot is not None:
+            return _snapshot_response(snapshot)
+
+    params = _tickers_params(request)
+    snapshot = _read_snapshot('tickers.index')
+    stale_age = None
+    if snapshot is not None:
+        index = ticker_index.for_snapshot(snapshot.version, snapshot.payload)
+    elif _ingestor_only():
+        return _not_ingested_response('tickers')
+    else:
+        index = None
+        error = 'upstream unavailable'
+        if not last_good.is_failing('tickers.index'):
+            try:
+                index = _live_ticker_index()
+            except Exception as exc:
+                error = exc
+        if index is None:
+            stale = _last_good_ticker_index()
+            if stale is None:
+                return JsonResponse({'ok': False, 'error': f'Failed to load tickers: {error}'}, status=502)
+            index, stale_age = stale
+
     try:
-        tickers = _binance_get('/api/v3/ticker/24hr', {})
-        usdt_pairs = [
-            item for item in tickers
-            if item.get('symbol', '').endswith('USDT')
-        ]
-        usdt_pairs.sort(key=lambda x: float(x.get('quoteVolume', '0') or 0), reverse=True)
-        rows = []
-        for item in usdt_pairs[:24]:
-            rows.append({
-                'symbol': item.get('symbol', ''),
-                'lastPrice': float(item.get('lastPrice', '0') or 0),
-                'priceChangePercent': float(item.get('priceChangePercent', '0') or 0),
-                'highPrice': float(item.get('highPrice', '0') or 0),
-                'lowPrice': float(item.get('lowPrice', '0') or 0),
-                'volume': float(item.get('volume', '0') or 0),
-                'quoteVolume': float(item.get('quoteVolume', '0') or 0),
-            })
-        return JsonResponse({'ok': True, 'source': 'binance', 'rows': rows})
-    except Exception as exc:
-        return JsonResponse({'ok': False, 'error': f'Failed to load tickers: {exc}'}, status=502)
+        payload = _tickers_page_result(index, **params)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+    return JsonResponse(payload) if stale_age is None else _stale_response(payload, stale_age)
 
 
 @login_required(login_url='login')
+@rate_limited('trades')
+@encodable('trades')
 def market_trades(request):
     base = (request.GET.get('base') or 'BTC').upper()
     quote = (request.GET.get('quote') or 'USDT').upper()
@@ -693,117 +1064,334 @@ def market_trades(request):
     except ValueError:
         limit = 20
 
-    try:
-        payload = _binance_get('/api/v3/trades', {
-            'symbol': f'{base}{quote}',
-            'limit': str(limit),
-        })
-        rows = [{
-            'id': item.get('id'),
-            'price': float(item.get('price', '0') or 0),
-            'qty': float(item.get('qty', '0') or 0),
-            'quoteQty': float(item.get('quoteQty', '0') or 0),
-            'time': int(item.get('time', 0) or 0),
-            'isBuyerMaker': bool(item.get('isBuyerMaker', False)),
-        } for item in payload]
-        return JsonResponse({'ok': True, 'source': 'binance', 'symbol': f'{base}{quote}', 'rows': rows})
-    except Exception as exc:
-        return JsonResponse({'ok': False, 'error': f'Failed to load trades: {exc}'}, status=502)
+    symbol = f'{base}{quote}'
+    snapshot_response = _trades_snapshot_response(symbol, limit)
+    if snapshot_response is not None:
+        return snapshot_response
+
+    key = f'trades.{symbol}'
+    error = 'upstream unavailable'
+    if not last_good.is_failing(key):
+        try:
+            return _live_json(key, _trades_payload(symbol, limit))
+        except Exception as exc:
+            error = exc
+    stale_response = _last_good_response(key, lambda: _trades_payload(symbol, limit), limit, ('rows',))
+    if stale_response is not None:
+        return stale_response
+    return JsonResponse({'ok': False, 'error': f'Failed to load trades: {error}'}, status=502)
 
 
 @login_required(login_url='login')
+@rate_limited('top_assets')
 def top_assets(request):
+    snapshot = _read_snapshot('top_assets')
+    if snapshot is not None:
+        return _snapshot_response(snapshot)
+    if _ingestor_only():
+        return _not_ingested_response('top assets')
+
     try:
-        rows = _coingecko_get('/api/v3/coins/markets', {
-            'vs_currency': 'usd',
-            'order': 'market_cap_desc',
-            'per_page': '100',
-            'page': '1',
-            'sparkline': 'false',
-        })
-        assets = [{
-            'symbol': item.get('symbol', '').upper(),
-            'name': item.get('name', ''),
-            'image': item.get('image', ''),
-        } for item in rows if item.get('symbol') and item.get('name')]
-        return JsonResponse({'ok': True, 'source': 'coingecko', 'assets': assets})
-    except Exception:
-        try:
-            tickers = _binance_get('/api/v3/ticker/24hr', {})
-            usdt_pairs = [
-                item for item in tickers
-                if item.get('symbol', '').endswith('USDT')
-            ]
-            usdt_pairs.sort(key=lambda x: float(x.get('quoteVolume', '0') or 0), reverse=True)
-            assets = []
-            for item in usdt_pairs[:100]:
-                symbol = item['symbol'].replace('USDT', '')
-                assets.append({'symbol': symbol, 'name': symbol, 'image': ''})
-            return JsonResponse({'ok': True, 'source': 'binance', 'assets': assets})
-        except Exception as exc:
-            return JsonResponse({'ok': False, 'error': f'Failed to load top assets: {exc}'}, status=502)
+        return JsonResponse(_top_assets_payload())
+    except Exception as exc:
+        return JsonResponse({'ok': False, 'error': f'Failed to load top assets: {exc}'}, status=502)
+
+
+NEWS_CATEGORIES = ('ALL', 'BTC', 'ETH', 'DEFI', 'REGULATION')
+
+
+def _news_query(category: str) -> dict[str, str]:
+    query = {'lang': 'EN'}
+    if category != 'ALL':
+        query['categories'] = category
+    return query
+
+
+def _news_needs_latest(category: str, rows: list[dict]) -> bool:
+    # Some categories can be sparse at times. If empty, use latest feed and filter.
+    return category != 'ALL' and not rows
+
+
+def _news_result(category: str, rows: list[dict], latest_rows: list[dict]) -> dict:
+    fallback_used = False
+    fallback_reason = ''
+
+    if _news_needs_latest(category, rows):
+        filtered = _filter_news_rows(latest_rows, category)
+        if filtered:
+            rows = filtered
+            fallback_used = True
+            fallback_reason = 'category_feed_empty'
+        elif latest_rows:
+            rows = latest_rows
+            fallback_used = True
+            fallback_reason = 'category_fallback_to_latest'
+        else:
+            rows = _filter_news_rows(_local_fallback_news_rows(), category)
+            fallback_used = True
+            fallback_reason = 'local_fallback_used'
+
+    if not rows:
+        rows = _local_fallback_news_rows()
+        fallback_used = True
+        fallback_reason = fallback_reason or 'local_fallback_used'
+
+    return {
+        'ok': True,
+        'source': 'cryptocompare',
+        'category': category,
+        'rows': rows[:36],
+        'fallback_used': fallback_used,
+        'fallback_reason': fallback_reason,
+    }
+
+
+def _news_payload(category: str) -> dict:
+    rows = _news_rows(_cryptocompare_news_get(_news_query(category)))
+    latest_rows = []
+    if _news_needs_latest(category, rows):
+        latest_rows = _news_rows(_cryptocompare_news_get({'lang': 'EN'}))
+    return _news_result(category, rows, latest_rows)
+
+
+def _news_fallback_payload(category: str, exc: Exception) -> dict:
+    rows = _local_fallback_news_rows()
+    if category != 'ALL':
+        filtered = _filter_news_rows(rows, category)
+        if filtered:
+            rows = filtered
+    return {
+        'ok': True,
+        'source': 'local_fallback',
+        'category': category,
+        'rows': rows,
+        'fallback_used': True,
+        'fallback_reason': f'network_error:{exc}',
+    }
+
+
+def _news_params(request) -> dict:
+    """category/q/limit/cursor for the news store (cursor validated by ``news_store.page``)."""
+    category = (request.GET.get('category') or 'ALL').strip().upper()
+    try:
+        limit = min(max(int(request.GET.get('limit', '36')), 1), settings.MARKET_NEWS_MAX_LIMIT)
+    except ValueError:
+        limit = 36
+    return {
+        'category': category if category in NEWS_CATEGORIES else 'ALL',
+        'q': (request.GET.get('q') or '').strip()[:200],
+        'limit': limit,
+        'cursor': request.GET.get('cursor') or None,
+    }
+
+
+def _news_feed_rows(query: dict[str, str]) -> list[dict]:
+    return _news_rows(_cryptocompare_news_get(query))
+
+
+def _refresh_news_store() -> None:
+    """Keep the news store current from a background sync, never in the request.
+
+    Until the first sync has stored something, requests get the live feed fallback.
+    """
+    if _ingestor_only() or not news_store.is_stale():
+        return
+    news_store.refresh_in_background(_news_feed_rows)
+
+
+def _news_store_payload(category: str, q: str = '', limit: int = 36, cursor: str | None = None) -> dict | None:
+    """A page of stored news, or None while nothing has been ingested."""
+    if not news_store.has_articles():
+        return None
+    rows, next_cursor = news_store.page(category, q, limit, cursor)
+    fallback_reason = ''
+    if not rows and category != 'ALL' and not q and not cursor:
+        # Sparse category: show the latest articles instead, as the live feed does.
+        rows, next_cursor = news_store.page('ALL', '', limit)
+        fallback_reason = 'category_fallback_to_latest'
+    return {
+        'ok': True,
+        'source': 'news_store',
+        'category': category,
+        'q': q,
+        'rows': rows,
+        'next_cursor': next_cursor,
+        'fallback_used': bool(fallback_reason),
+        'fallback_reason': fallback_reason,
+    }
+
+
+def _news_fallback_response(params: dict, payload: dict) -> JsonResponse:
+    if params['q']:
+        tokens = set(news_store.query_tokens(params['q']))
+        payload['rows'] = [row for row in payload['rows'] if tokens <= news_store.index_tokens(row)]
+    return JsonResponse(payload)
+
+
+def _news_store_response(params: dict) -> JsonResponse | None:
+    _refresh_news_store()
+    try:
+        payload = _news_store_payload(**params)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+    return JsonResponse(payload) if payload is not None else None
 
 
 @login_required(login_url='login')
+@rate_limited('news')
+@conditional('news')
 def market_news(request):
-    category = (request.GET.get('category') or 'ALL').strip().upper()
-    if category not in {'ALL', 'BTC', 'ETH', 'DEFI', 'REGULATION'}:
-        category = 'ALL'
+    params = _news_params(request)
+    category = params['category']
+
+    # The ingestor snapshots only the first page of each category.
+    if not params['q'] and not params['cursor'] and 'limit' not in request.GET:
+        snapshot = _read_snapshot(f'news.{category}')
+        if snapshot is not None:
+            return _snapshot_response(snapshot)
+
+    response = _news_store_response(params)
+    if response is not None:
+        return response
 
     try:
-        query = {'lang': 'EN'}
-        if category != 'ALL':
-            query['categories'] = category
-
-        payload = _cryptocompare_news_get(query)
-        rows = _news_rows(payload)
-        fallback_used = False
-        fallback_reason = ''
-
-        # Some categories can be sparse at times. If empty, use latest feed and filter.
-        if category != 'ALL' and not rows:
-            latest_rows = _news_rows(_cryptocompare_news_get({'lang': 'EN'}))
-            filtered = _filter_news_rows(latest_rows, category)
-            if filtered:
-                rows = filtered
-                fallback_used = True
-                fallback_reason = 'category_feed_empty'
-            elif latest_rows:
-                rows = latest_rows
-                fallback_used = True
-                fallback_reason = 'category_fallback_to_latest'
-            else:
-                rows = _filter_news_rows(_local_fallback_news_rows(), category)
-                fallback_used = True
-                fallback_reason = 'local_fallback_used'
+        if _ingestor_only():
+            raise ValueError('news not ingested yet')
+        return _news_fallback_response(params, _news_payload(category))
+    except (
+        HTTPError, URLError, TimeoutError, ValueError, json.JSONDecodeError, rate_limit.UpstreamBudgetExceeded,
+    ) as exc:
+        return _news_fallback_response(params, _news_fallback_payload(category, exc))
+
+
+BATCH_QUERY_TYPES = ('price', 'depth', 'trades', 'ohlcv', 'tickers', 'top_assets', 'news')
+# Caller headers a sub-query must not inherit: they apply to the batch response as a
+# whole, and would turn a sub-response into a 304, a range or a non-JSON body.
+BATCH_DROPPED_META = (
+    'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_MATCH', 'HTTP_IF_UNMODIFIED_SINCE',
+    'HTTP_IF_RANGE', 'HTTP_RANGE', 'HTTP_ACCEPT', 'HTTP_ACCEPT_ENCODING',
+)
 
-        if not rows:
-            rows = _local_fallback_news_rows()
-            fallback_used = True
-            fallback_reason = fallback_reason or 'local_fallback_used'
+_batch_pool = ThreadPoolExecutor(settings.MARKET_BATCH_WORKERS, thread_name_prefix='market-batch')
 
-        return JsonResponse({
-            'ok': True,
-            'source': 'cryptocompare',
-            'category': category,
-            'rows': rows[:36],
-            'fallback_used': fallback_used,
-            'fallback_reason': fallback_reason,
-        })
-    except (HTTPError, URLError, TimeoutError, ValueError, json.JSONDecodeError) as exc:
-        rows = _local_fallback_news_rows()
-        if category != 'ALL':
-            filtered = _filter_news_rows(rows, category)
-            if filtered:
-                rows = filtered
-        return JsonResponse({
-            'ok': True,
-            'source': 'local_fallback',
-            'category': category,
-            'rows': rows,
-            'fallback_used': True,
-            'fallback_reason': f'network_error:{exc}',
-        })
+
+def _batch_queries(request) -> list[dict]:
+    """Sub-queries from ``?queries=<JSON list>`` or a JSON body ``{"queries": [...]}``."""
+    if request.method == 'POST':
+        body = json.loads(request.body or b'{}')
+        queries = body.get('queries') if isinstance(body, dict) else body
+    else:
+        queries = json.loads(request.GET.get('queries') or '[]')
+    if not isinstance(queries, list) or not queries:
+        raise ValueError('queries must be a non-empty list.')
+    if len(queries) > settings.MARKET_BATCH_MAX_QUERIES:
+        raise ValueError(f'At most {settings.MARKET_BATCH_MAX_QUERIES} queries per batch.')
+    for index, query in enumerate(queries):
+        if not isinstance(query, dict) or query.get('type') not in BATCH_QUERY_TYPES:
+            raise ValueError(f'Query {index} needs a type in: {", ".join(BATCH_QUERY_TYPES)}.')
+    return queries
+
+
+def _batch_subrequest(request, query: dict) -> HttpRequest:
+    """A GET request for one sub-query that shares the caller's user and session."""
+    sub = HttpRequest()
+    sub.method = 'GET'
+    sub.path = sub.path_info = request.path
+    sub.META = {name: value for name, value in request.META.items() if name not in BATCH_DROPPED_META}
+    sub.META['QUERY_STRING'] = ''
+    sub.GET = QueryDict(mutable=True)
+    for name, value in query.items():
+        # Results are spliced into the JSON batch body, so no other format.
+        if name not in ('id', 'type', 'format') and value is not None:
+            sub.GET[name] = str(value)
+    sub.user = request.user
+    sub.session = getattr(request, 'session', None)
+    if hasattr(request, 'auser'):
+        sub.auser = request.auser
+    return sub
+
+
+def _batch_result(index: int, query: dict, status: int, body: bytes) -> bytes:
+    head = _encode_payload({'id': query.get('id', index), 'type': query['type'], 'status': status})
+    return head[:-1] + b',"data":' + body + b'}'
+
+
+def _batch_response_result(index: int, query: dict, response: HttpResponse) -> bytes:
+    # Sub-responses are already encoded JSON; splice them in instead of re-encoding.
+    if response.get('Content-Type', '').startswith('application/json'):
+        return _batch_result(index, query, response.status_code, response.content)
+    return _batch_error_result(index, query, response.status_code, 'Unexpected response.')
+
+
+def _batch_error_result(index: int, query: dict, status: int, error: str) -> bytes:
+    return _batch_result(index, query, status, _encode_payload({'ok': False, 'error': error}))
+
+
+def _batch_response(results: list[bytes]) -> HttpResponse:
+    return HttpResponse(b'{"ok":true,"results":[' + b','.join(results) + b']}', content_type='application/json')
+
+
+def _run_batch_query(request, index: int, query: dict) -> bytes:
+    try:
+        response = BATCH_VIEWS[query['type']](_batch_subrequest(request, query))
+        return _batch_response_result(index, query, response)
+    except Exception as exc:
+        return _batch_error_result(index, query, 502, f'Failed to load {query["type"]}: {exc}')
+    finally:
+        close_old_connections()
+
+
+@login_required(login_url='login')
+def market_batch(request):
+    """Resolve several market sub-queries concurrently; one status per sub-query."""
+    try:
+        queries = _batch_queries(request)
+    except ValueError as exc:
+        return JsonResponse({'ok': False, 'error': str(exc)}, status=400)
+
+    # Each sub-query runs in the request's context, so its phases count towards it (core.timing).
+    futures = [
+        _batch_pool.submit(contextvars.copy_context().run, _run_batch_query, request, index, query)
+        for index, query in enumerate(queries)
+    ]
+    return _batch_response([future.result() for future in futures])
+
+
+BATCH_VIEWS = {
+    'price': market_price,
+    'depth': market_depth,
+    'trades': market_trades,
+    'ohlcv': market_ohlcv,
+    'tickers': market_tickers,
+    'top_assets': top_assets,
+    'news': market_news,
+}
+
+
+@staff_member_required
+def market_cache_stats(request):
+    """Hit/miss/coalesced counters of the upstream market cache."""
+    return JsonResponse({'ok': True, 'cache': market_cache.stats()})
+
+
+def _metrics_allowed(request) -> bool:
+    """Staff signed in, or ``Authorization: Bearer <METRICS_TOKEN>`` (for scrapers)."""
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(
+        token.strip(), settings.METRICS_TOKEN,
+    )
+
+
+@rate_limited('metrics')
+def metrics(request):
+    """Request, phase and upstream latency histograms in the Prometheus text format (core.timing)."""
+    if not _metrics_allowed(request):
+        response = HttpResponse('Staff session or metrics token required.\n', status=401, content_type='text/plain')
+        response['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return response
+    return HttpResponse(timing.render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 class SignupEmailView(View):
@@ -942,21 +1530,13 @@ class SignupVerifyOtpView(View):
                 'otp_preview': request.session.get('signup_otp_preview'),
             })
 
-        now = timezone.now()
-        otp_record = (
-            OTP.objects.filter(user=user, is_used=False, expires_at__gt=now)
-            .order_by('-created_at')
-            .first()
-        )
-        if not otp_record or not check_password(otp_value, otp_record.otp_hash):
+        if not otp.verify(user, otp_value):
             return render(request, 'core/signup/verify_otp.html', {
                 'email': email,
                 'error': 'Invalid or expired code. Please try again or resend.',
                 'otp_preview': request.session.get('signup_otp_preview'),
             })
 
-        otp_record.is_used = True
-        otp_record.save(update_fields=['is_used'])
         # Clear signup info and mark that we should show the welcome screen once.
         for key in ('signup_email', 'signup_user_id', 'signup_otp_preview'):
             request.session.pop(key, None)
@@ -1128,7 +1708,7 @@ class PaymentCompleteView(View):
             return JsonResponse({'ok': False, 'error': 'Amount exceeds demo limit.'}, status=400)
 
         try:
-            new_balance = _credit_user_wallet(request.user, amount)
+            new_balance = _credit_user_wallet(request.user, amount, reference=method)
         except Exception as exc:
             return JsonResponse({'ok': False, 'error': f'Failed to credit wallet: {exc}'}, status=500)
 
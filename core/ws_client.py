@@ -0,0 +1,134 @@
+"""
+Minimal asyncio WebSocket client (RFC 6455) for upstream market streams.
+
+Only what the market feeds need: text messages, client-side masking,
+fragmented frames, ping/pong and close. No extensions or compression.
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import ssl
+import struct
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+OP_CONT = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+class WebSocketClosed(ConnectionError):
+    pass
+
+
+class WebSocket:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.closed = False
+
+    async def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytearray([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header.append(0x80 | length)
+        elif length < 1 << 16:
+            header.append(0x80 | 126)
+            header += struct.pack('!H', length)
+        else:
+            header.append(0x80 | 127)
+            header += struct.pack('!Q', length)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        self.writer.write(bytes(header) + mask + masked)
+        await self.writer.drain()
+
+    async def _read_frame(self) -> tuple[bool, int, bytes]:
+        first, second = await self.reader.readexactly(2)
+        length = second & 0x7F
+        if length == 126:
+            (length,) = struct.unpack('!H', await self.reader.readexactly(2))
+        elif length == 127:
+            (length,) = struct.unpack('!Q', await self.reader.readexactly(8))
+        mask = await self.reader.readexactly(4) if second & 0x80 else None
+        payload = await self.reader.readexactly(length)
+        if mask:
+            payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        return bool(first & 0x80), first & 0x0F, payload
+
+    async def recv(self) -> str:
+        """Return the next complete text (or binary, decoded) message."""
+        parts: list[bytes] = []
+        while True:
+            fin, opcode, payload = await self._read_frame()
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                self.closed = True
+                raise WebSocketClosed(payload[2:].decode('utf-8', 'replace'))
+            parts.append(payload)
+            if fin:
+                return b''.join(parts).decode('utf-8')
+
+    async def send_text(self, text: str) -> None:
+        await self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    async def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            try:
+                await self._send_frame(OP_CLOSE, struct.pack('!H', 1000))
+            except (ConnectionError, RuntimeError):
+                pass
+        self.writer.close()
+
+
+async def connect(url: str) -> WebSocket:
+    parts = urlsplit(url)
+    secure = parts.scheme == 'wss'
+    port = parts.port or (443 if secure else 80)
+    target = parts.path or '/'
+    if parts.query:
+        target = f'{target}?{parts.query}'
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None),
+            timeout=settings.MARKET_HTTP_CONNECT_TIMEOUT,
+        )
+    except asyncio.TimeoutError as exc:
+        raise TimeoutError(f'connect to {parts.hostname} timed out') from exc
+
+    key = base64.b64encode(os.urandom(16)).decode('ascii')
+    request = (
+        f'GET {target} HTTP/1.1\r\n'
+        f'Host: {parts.hostname}:{port}\r\n'
+        'Upgrade: websocket\r\n'
+        'Connection: Upgrade\r\n'
+        f'Sec-WebSocket-Key: {key}\r\n'
+        'Sec-WebSocket-Version: 13\r\n\r\n'
+    )
+    writer.write(request.encode('latin-1'))
+    await writer.drain()
+
+    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=settings.MARKET_HTTP_REQUEST_TIMEOUT)
+    lines = head.decode('latin-1').split('\r\n')
+    headers = {
+        name.strip().lower(): value.strip()
+        for name, _, value in (line.partition(':') for line in lines[1:] if line)
+    }
+    expected = base64.b64encode(hashlib.sha1((key + _GUID).encode('ascii')).digest()).decode('ascii')
+    if ' 101 ' not in f'{lines[0]} ' or headers.get('sec-websocket-accept') != expected:
+        writer.close()
+        raise ConnectionError(f'WebSocket handshake with {parts.hostname} failed: {lines[0]}')
+    return WebSocket(reader, writer)
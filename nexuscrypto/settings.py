@@ -45,7 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrecompressedStaticMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,7 +61,8 @@ ROOT_URLCONF = 'nexuscrypto.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, with render time reported by core.timing.
+        'BACKEND': 'core.timing.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,6 +83,9 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than SQLite's shared in-memory database, which fails
+        # concurrent writers instead of making them wait (accounts ledger tests).
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
@@ -97,12 +104,212 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static'] if (BASE_DIR / 'static').exists() else []
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic writes content-hashed names plus .gz/.br variants (core.storage).
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.storage.CompressedManifestStaticFilesStorage'},
+}
+# Serve STATIC_ROOT from core.middleware.PrecompressedStaticMiddleware.
+STATIC_SERVE_PRECOMPRESSED = os.getenv('STATIC_SERVE_PRECOMPRESSED', '0' if DEBUG else '1') == '1'
+# max-age for static files requested by their unhashed names.
+STATIC_MAX_AGE = 300
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# The default cache stays per process. Per-user account data (wallet balances,
+# preferences) is cached in aliases shared by every worker process, so that a
+# change committed by one is seen by all: files under CACHE_DIR by default,
+# or Redis when CACHE_REDIS_URL is set.
+def _shared_cache(name: str) -> dict:
+    if os.getenv('CACHE_REDIS_URL'):
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+            'KEY_PREFIX': name,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(Path(os.getenv('CACHE_DIR', str(BASE_DIR / 'var' / 'cache'))) / name),
+    }
+
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'wallet': _shared_cache('wallet'),
+    'preferences': _shared_cache('preferences'),
+}
+# Safety net for cached wallet balances; credits invalidate them on commit.
+WALLET_CACHE_TIMEOUT = 3600
+# Cached settings-page preferences; updates invalidate them on commit.
+PREFERENCES_CACHE_TIMEOUT = 3600
+
 AUTH_USER_MODEL = 'accounts.User'
 
+# Signup one-time codes (accounts.otp): HMAC key, lifetime and verification attempts per code.
+OTP_SECRET_KEY = os.getenv('OTP_SECRET_KEY', SECRET_KEY)
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', '300'))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))
+
 COINAPI_KEY = os.getenv('COINAPI_KEY', '')
 
+# Upstream provider base URLs. Point them at `manage.py replay_upstream`
+# (e.g. http://127.0.0.1:8765/binance) to run without network access.
+MARKET_BINANCE_BASE_URL = os.getenv('MARKET_BINANCE_BASE_URL', 'https://api.binance.com')
+MARKET_COINAPI_BASE_URL = os.getenv('MARKET_COINAPI_BASE_URL', 'https://rest.coinapi.io')
+MARKET_COINGECKO_BASE_URL = os.getenv('MARKET_COINGECKO_BASE_URL', 'https://api.coingecko.com')
+MARKET_CRYPTOCOMPARE_BASE_URL = os.getenv('MARKET_CRYPTOCOMPARE_BASE_URL', 'https://min-api.cryptocompare.com')
+# Record every successful upstream response as a replay fixture (core.upstream_fixtures).
+MARKET_UPSTREAM_RECORD = os.getenv('MARKET_UPSTREAM_RECORD', '0') == '1'
+MARKET_UPSTREAM_FIXTURES_DIR = Path(os.getenv('MARKET_UPSTREAM_FIXTURES_DIR', BASE_DIR / 'var' / 'upstream_fixtures'))
+
+# Upstream market cache (core.market_cache). TTLs are seconds per endpoint class.
+MARKET_CACHE_ENABLED = os.getenv('MARKET_CACHE_ENABLED', '1') != '0'
+MARKET_CACHE_TTLS = {
+    'tickers': 5.0,
+    'depth': 1.0,
+    'trades': 1.0,
+    'price': 2.0,
+    'ohlcv': 15.0,
+    'top_assets': 120.0,
+}
+
+# Where market API views get their data (core.snapshot_store):
+#   live     - call upstream providers from the request handler
+#   shared   - one elected web worker per host refreshes mmap snapshots
+#   ingestor - serve only what `manage.py run_market_ingestor` stored
+MARKET_DATA_MODE = os.getenv('MARKET_DATA_MODE', 'live')
+MARKET_SNAPSHOT_DIR = Path(os.getenv('MARKET_SNAPSHOT_DIR', BASE_DIR / 'var' / 'snapshots'))
+MARKET_SNAPSHOT_SYMBOLS = [
+    symbol.strip().upper()
+    for symbol in os.getenv('MARKET_SNAPSHOT_SYMBOLS', 'BTCUSDT,ETHUSDT,BNBUSDT,SOLUSDT,XRPUSDT').split(',')
+    if symbol.strip()
+]
+MARKET_SNAPSHOT_INTERVALS = {
+    'tickers': 5.0,
+    'depth': 1.0,
+    'trades': 1.0,
+    'top_assets': 120.0,
+}
+MARKET_SNAPSHOT_DEPTH_LIMIT = 30
+MARKET_SNAPSHOT_TRADES_LIMIT = 20
+MARKET_SNAPSHOT_MAX_AGE = 30.0
+
+# run_market_ingestor schedules, in seconds per feed.
+MARKET_INGESTOR_INTERVALS = {
+    'tickers': 5.0,
+    'depth': 1.0,
+    'trades': 1.0,
+    'klines': 15.0,
+    'top_assets': 120.0,
+    'news': 120.0,
+}
+MARKET_INGESTOR_KLINE_INTERVALS = ['1m', '1d']
+MARKET_INGESTOR_KLINE_LIMIT = 500
+
+# Candle windows up to this many minutes are resampled (core.resample) from
+# stored 1m bars instead of being fetched per interval.
+MARKET_RESAMPLE_MAX_MINUTES = int(os.getenv('MARKET_RESAMPLE_MAX_MINUTES', str(7 * 24 * 60)))
+
+# Async market views (core.async_views) with pooled keep-alive upstream
+# connections. Enable when serving through nexuscrypto.asgi.
+MARKET_ASYNC_VIEWS = os.getenv('MARKET_ASYNC_VIEWS', '0') == '1'
+MARKET_HTTP_CONNECT_TIMEOUT = float(os.getenv('MARKET_HTTP_CONNECT_TIMEOUT', '3'))
+MARKET_HTTP_REQUEST_TIMEOUT = float(os.getenv('MARKET_HTTP_REQUEST_TIMEOUT', '10'))
+MARKET_HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv('MARKET_HTTP_MAX_CONNECTIONS_PER_HOST', '16'))
+
+# Incremental order books (core.orderbook) fed by the Binance diff-depth
+# stream; run with `manage.py run_market_ingestor --depth-stream`.
+MARKET_ORDERBOOK_STREAM_URL = os.getenv('MARKET_ORDERBOOK_STREAM_URL', 'wss://stream.binance.com:9443/ws')
+MARKET_ORDERBOOK_SNAPSHOT_LIMIT = 1000
+MARKET_ORDERBOOK_PUBLISH_INTERVAL = 0.1
+
+# Server-Sent Events push channel (core.push) at /api/market/stream/ (ASGI only).
+MARKET_PUSH_TICK = 0.25
+MARKET_PUSH_HEARTBEAT = 15.0
+MARKET_PUSH_MAX_CHANNELS = 8
+
+# Largest page /api/market/tickers/ serves from the ranked ticker index.
+MARKET_TICKERS_MAX_LIMIT = 500
+
+# /api/market/batch/: sub-queries per request and (sync views) worker threads.
+MARKET_BATCH_MAX_QUERIES = 20
+MARKET_BATCH_WORKERS = int(os.getenv('MARKET_BATCH_WORKERS', '8'))
+
+# Last-known-good depth/trades/tickers payloads (core.last_good), served
+# stale-if-error and persisted here so a restart starts warm.
+MARKET_LAST_GOOD_DIR = Path(os.getenv('MARKET_LAST_GOOD_DIR', BASE_DIR / 'var' / 'last_good'))
+MARKET_LAST_GOOD_FLUSH_INTERVAL = 5.0
+MARKET_LAST_GOOD_RETRY = float(os.getenv('MARKET_LAST_GOOD_RETRY', '2'))
 
+# Upstream provider routing (core.router): rolling window per provider, hedge
+# delay before also asking the next provider, and circuit breaker thresholds.
+MARKET_ROUTER_WINDOW = 50
+MARKET_ROUTER_HEDGE_DELAY = float(os.getenv('MARKET_ROUTER_HEDGE_DELAY', '0.3'))
+MARKET_ROUTER_BREAKER_FAILURES = 5
+MARKET_ROUTER_BREAKER_ERROR_RATE = 0.5
+MARKET_ROUTER_BREAKER_MIN_CALLS = 10
+MARKET_ROUTER_BREAKER_COOLDOWN = float(os.getenv('MARKET_ROUTER_BREAKER_COOLDOWN', '30'))
+MARKET_ROUTER_WORKERS = int(os.getenv('MARKET_ROUTER_WORKERS', '16'))
+
+# Local news store (core.news_store): how often it pulls CryptoCompare, how
+# long articles are kept, and the largest page /api/market/news/ serves.
+MARKET_NEWS_REFRESH_INTERVAL = float(os.getenv('MARKET_NEWS_REFRESH_INTERVAL', '120'))
+MARKET_NEWS_RETENTION_DAYS = int(os.getenv('MARKET_NEWS_RETENTION_DAYS', '30'))
+MARKET_NEWS_MAX_LIMIT = 100
+
+# Versions per depth/tickers/news variant kept for since=<version> deltas (core.conditional).
+MARKET_DELTA_HISTORY = 16
+
+# Response compression (core.middleware.CompressionMiddleware). gzip always,
+# brotli when the optional `brotli` package is installed. text/html is not
+# listed on purpose (BREACH: pages carry CSRF tokens), nor text/event-stream:
+# proxies buffer compressed SSE, and a flush per small frame costs more than
+# it saves.
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '860'))
+COMPRESSION_CONTENT_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/vnd.nexus.columns',
+    'image/svg+xml',
+    'text/css',
+    'text/javascript',
+    'text/plain',
+}
+
+# Token-bucket rate limits (core.rate_limit), shared by the workers on a host
+# through a memory-mapped table. Budgets are (tokens per second, burst).
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') != '0'
+RATE_LIMIT_FILE = Path(os.getenv('RATE_LIMIT_FILE', BASE_DIR / 'var' / 'rate_limit.bin'))
+RATE_LIMIT_SLOTS = int(os.getenv('RATE_LIMIT_SLOTS', '65536'))
+# Per user (or client address) and endpoint, in requests.
+RATE_LIMITS = {
+    'ohlcv': (2.0, 20),
+    'price': (5.0, 30),
+    'depth': (5.0, 30),
+    'trades': (5.0, 30),
+    'tickers': (2.0, 20),
+    'top_assets': (1.0, 10),
+    'news': (1.0, 10),
+    'stream': (0.2, 5),
+    'metrics': (1.0, 10),
+}
+# For the whole app per provider, in the provider's request weight
+# (Binance allows 6000 weight per minute per IP). A burst must cover the
+# heaviest single call (core.rate_limit.UPSTREAM_WEIGHTS).
+UPSTREAM_RATE_LIMITS = {
+    'binance': (80.0, 1200),
+    'coinapi': (1.0, 10),
+    'coingecko': (0.4, 5),
+    'cryptocompare': (1.0, 10),
+}
 
+# Request phase timing (core.timing): db, session, template and upstream.
+# Who gets the Server-Timing header: 'staff', 'all' or 'off'. The /metrics/
+# histograms are kept regardless.
+SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'staff')
+# Bearer token Prometheus scrapes /metrics/ with; empty: staff sessions only.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+# Histogram bucket upper bounds in seconds; upstream calls time out at 12.
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+# Database sessions, with their reads and writes timed as the session phase.
+SESSION_ENGINE = 'core.sessions'
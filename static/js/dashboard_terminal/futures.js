@@ -12,6 +12,8 @@ document.addEventListener('DOMContentLoaded', function () {
   var candleLimit = 90;
   var latestCandleRows = [];
   var chartHover = { active: false, x: 0, y: 0 };
+  var marketStream = null;
+  var marketStreamOpen = false;
 
   var walletUsdtEl = document.getElementById('wallet-usdt');
   var availableBalanceEl = document.getElementById('available-balance');
@@ -453,49 +455,57 @@ document.addEventListener('DOMContentLoaded', function () {
       sizeUnitEl.textContent = currentBase;
     }
     fetchMarketNow();
+    connectMarketStream();
+  }
+
+  function renderTickers(payload) {
+    var rows = payload.rows || [];
+
+    var options = rows.slice(0, 30).map(function (item) {
+      return '<option value="' + item.symbol + '">' + item.symbol + '</option>';
+    }).join('');
+    if (pairSelect) {
+      pairSelect.innerHTML = options;
+      pairSelect.value = currentPair;
+    }
+
+    var tickerHtml = rows.slice(0, 18).map(function (item) {
+      var cls = Number(item.priceChangePercent || 0) >= 0 ? 'up' : 'down';
+      var sign = Number(item.priceChangePercent || 0) >= 0 ? '+' : '';
+      return '<span class="ticker-item">' + item.symbol + ' ' + formatUsd(item.lastPrice) + ' <span class="' + cls + '">' + sign + Number(item.priceChangePercent || 0).toFixed(2) + '%</span></span>';
+    }).join('');
+    if (marqueeEl) {
+      marqueeEl.innerHTML = tickerHtml;
+    }
+    if (marqueeCloneEl) {
+      marqueeCloneEl.innerHTML = tickerHtml;
+    }
+
+    var data = rows.find(function (item) { return item.symbol === currentPair; });
+    if (data) {
+      price24hChange = parseFloat(data.P || 0);
+      markPrice = Number(data.lastPrice || markPrice);
+      high24h = parseFloat(data.h || 0);
+      low24h = parseFloat(data.l || 0);
+      volume24h = parseFloat(data.v || 0).toFixed(3);
+      renderStats();
+      if (change24hEl) {
+        change24hEl.textContent = (data.P || '0') + '%';
+      }
+    }
   }
 
   async function fetchTickers() {
+    if (marketStreamOpen) {
+      return;
+    }
     try {
       var response = await fetch('/api/market/tickers/');
       var payload = await response.json();
       if (!response.ok || !payload.ok) {
         throw new Error(payload.error || 'tickers unavailable');
       }
-      var rows = payload.rows || [];
-
-      var options = rows.slice(0, 30).map(function (item) {
-        return '<option value="' + item.symbol + '">' + item.symbol + '</option>';
-      }).join('');
-      if (pairSelect) {
-        pairSelect.innerHTML = options;
-        pairSelect.value = currentPair;
-      }
-
-      var tickerHtml = rows.slice(0, 18).map(function (item) {
-        var cls = Number(item.priceChangePercent || 0) >= 0 ? 'up' : 'down';
-        var sign = Number(item.priceChangePercent || 0) >= 0 ? '+' : '';
-        return '<span class="ticker-item">' + item.symbol + ' ' + formatUsd(item.lastPrice) + ' <span class="' + cls + '">' + sign + Number(item.priceChangePercent || 0).toFixed(2) + '%</span></span>';
-      }).join('');
-      if (marqueeEl) {
-        marqueeEl.innerHTML = tickerHtml;
-      }
-      if (marqueeCloneEl) {
-        marqueeCloneEl.innerHTML = tickerHtml;
-      }
-
-      var data = rows.find(function (item) { return item.symbol === currentPair; });
-      if (data) {
-        price24hChange = parseFloat(data.P || 0);
-        markPrice = Number(data.lastPrice || markPrice);
-        high24h = parseFloat(data.h || 0);
-        low24h = parseFloat(data.l || 0);
-        volume24h = parseFloat(data.v || 0).toFixed(3);
-        renderStats();
-        if (change24hEl) {
-          change24hEl.textContent = (data.P || '0') + '%';
-        }
-      }
+      renderTickers(payload);
     } catch (error) {
       console.error(error);
       setFeedback('Ticker feed unavailable.', 'error');
@@ -503,6 +513,9 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   async function fetchDepth() {
+    if (marketStreamOpen) {
+      return;
+    }
     try {
       var response = await fetch('/api/market/depth/?base=' + encodeURIComponent(currentBase) + '&quote=USDT&limit=30');
       var payload = await response.json();
@@ -516,34 +529,122 @@ document.addEventListener('DOMContentLoaded', function () {
     }
   }
 
+  function applyCandles(payload) {
+    var rows = payload.rows || [];
+    if (!rows.length) {
+      return;
+    }
+    var last = rows[rows.length - 1];
+    markPrice = Number(last.price_close || markPrice);
+    renderStats();
+    renderCandles(rows);
+    renderPositions();
+    renderEstimates();
+  }
+
+  function candleRowsFromColumns(columns) {
+    var times = window.MarketCodec.numbers(columns.time);
+    var rows = [];
+    for (var i = 0; i < times.length; i += 1) {
+      rows.push({
+        time_period_start: new Date(times[i]).toISOString(),
+        price_open: columns.open[i],
+        price_high: columns.high[i],
+        price_low: columns.low[i],
+        price_close: columns.close[i],
+        volume_traded: columns.volume[i]
+      });
+    }
+    return rows;
+  }
+
   async function fetchCandles() {
+    var url = '/api/market/ohlcv/?base=' + encodeURIComponent(currentBase) + '&quote=USDT&period_id=1MIN&limit=' + String(candleLimit);
     try {
-      var response = await fetch('/api/market/ohlcv/?base=' + encodeURIComponent(currentBase) + '&quote=USDT&period_id=1MIN&limit=' + String(candleLimit));
+      if (window.MarketCodec) {
+        // Packed float64 columns: a fraction of the JSON size for long charts.
+        var decoded = await window.MarketCodec.fetchColumns(url + '&format=binary');
+        applyCandles({ rows: decoded.columns ? candleRowsFromColumns(decoded.columns) : decoded.rows });
+        return;
+      }
+      var response = await fetch(url);
       var payload = await response.json();
       if (!response.ok || !payload.ok) {
         throw new Error(payload.error || 'ohlcv unavailable');
       }
-      var rows = payload.rows || [];
-      if (!rows.length) {
-        return;
-      }
-      var last = rows[rows.length - 1];
-      markPrice = Number(last.price_close || markPrice);
-      renderStats();
-      renderCandles(rows);
-      renderPositions();
-      renderEstimates();
+      applyCandles(payload);
     } catch (error) {
       console.error(error);
       setFeedback('Chart feed unavailable.', 'error');
     }
   }
 
-  function fetchMarketNow() {
+  // Push channel: while the stream is open the server sends tickers and depth
+  // as they change and the polling timers below become no-ops.
+  function connectMarketStream() {
+    if (!window.EventSource) {
+      return;
+    }
+    if (marketStream) {
+      marketStream.close();
+      marketStreamOpen = false;
+    }
+    var depthChannel = 'depth@' + currentPair;
+    marketStream = new EventSource('/api/market/stream/?channels=tickers,' + encodeURIComponent(depthChannel));
+    marketStream.onopen = function () {
+      marketStreamOpen = true;
+    };
+    marketStream.onerror = function () {
+      marketStreamOpen = false;
+    };
+    marketStream.addEventListener('tickers', function (event) {
+      var payload = JSON.parse(event.data || '{}');
+      if (payload.ok) {
+        renderTickers(payload);
+      }
+    });
+    marketStream.addEventListener(depthChannel, function (event) {
+      var payload = JSON.parse(event.data || '{}');
+      if (payload.ok) {
+        renderOrderBook(payload);
+      }
+    });
+  }
+
+  // Initial load and pair switches fetch tickers, depth and candles in one
+  // request through the batch endpoint.
+  async function fetchMarketNow() {
     renderStats();
-    fetchTickers();
-    fetchDepth();
-    fetchCandles();
+    var queries = [
+      { id: 'tickers', type: 'tickers' },
+      { id: 'depth', type: 'depth', base: currentBase, quote: 'USDT', limit: 30 },
+      { id: 'candles', type: 'ohlcv', base: currentBase, quote: 'USDT', period_id: '1MIN', limit: candleLimit }
+    ];
+    var renderers = {
+      tickers: [renderTickers, 'Ticker feed unavailable.'],
+      depth: [renderOrderBook, 'Order book unavailable.'],
+      candles: [applyCandles, 'Chart feed unavailable.']
+    };
+    try {
+      var response = await fetch('/api/market/batch/?queries=' + encodeURIComponent(JSON.stringify(queries)));
+      var payload = await response.json();
+      if (!response.ok || !payload.ok) {
+        throw new Error(payload.error || 'batch unavailable');
+      }
+      payload.results.forEach(function (result) {
+        var renderer = renderers[result.id];
+        if (result.status === 200 && result.data && result.data.ok) {
+          renderer[0](result.data);
+        } else {
+          setFeedback(renderer[1], 'error');
+        }
+      });
+    } catch (error) {
+      console.error(error);
+      fetchTickers();
+      fetchDepth();
+      fetchCandles();
+    }
   }
 
   function startCountdown() {
@@ -649,6 +750,7 @@ document.addEventListener('DOMContentLoaded', function () {
   renderEstimates();
   startCountdown();
   fetchMarketNow();
+  connectMarketStream();
 
   setInterval(fetchTickers, 25000);
   setInterval(fetchDepth, 3500);
@@ -0,0 +1,88 @@
+// Decoder for the market API's compact encodings (core/encodings.py):
+// format=binary buffers and format=columnar JSON both become
+// { ...metadata, columns: { name: TypedArray } }.
+(function (global) {
+  'use strict';
+
+  var MAGIC = 'NXB1';
+  var LAYOUT_VERSION = 1;
+  var BINARY_CONTENT_TYPE = 'application/vnd.nexus.columns';
+  var LITTLE_ENDIAN = new Uint8Array(new Uint16Array([1]).buffer)[0] === 1;
+  var textDecoder = new TextDecoder('utf-8');
+
+  function readColumn(buffer, view, type, offset, length) {
+    if (LITTLE_ENDIAN) {
+      return type === 'q' ? new BigInt64Array(buffer, offset, length) : new Float64Array(buffer, offset, length);
+    }
+    var out = type === 'q' ? new BigInt64Array(length) : new Float64Array(length);
+    for (var i = 0; i < length; i += 1) {
+      out[i] = type === 'q' ? view.getBigInt64(offset + i * 8, true) : view.getFloat64(offset + i * 8, true);
+    }
+    return out;
+  }
+
+  function decodeBinary(buffer) {
+    var view = new DataView(buffer);
+    var magic = textDecoder.decode(new Uint8Array(buffer, 0, 4));
+    if (magic !== MAGIC || view.getUint16(4, true) !== LAYOUT_VERSION) {
+      throw new Error('Unsupported market column buffer');
+    }
+    var count = view.getUint16(6, true);
+    var metaLength = view.getUint32(8, true);
+    var offset = 12;
+    var result = JSON.parse(textDecoder.decode(new Uint8Array(buffer, offset, metaLength)));
+    offset += metaLength;
+
+    var specs = [];
+    for (var c = 0; c < count; c += 1) {
+      var type = String.fromCharCode(view.getUint8(offset));
+      var nameLength = view.getUint8(offset + 1);
+      var length = view.getUint32(offset + 2, true);
+      offset += 6;
+      specs.push({ type: type, length: length, name: textDecoder.decode(new Uint8Array(buffer, offset, nameLength)) });
+      offset += nameLength;
+    }
+    offset += (8 - (offset % 8)) % 8;
+
+    result.columns = {};
+    specs.forEach(function (spec) {
+      result.columns[spec.name] = readColumn(buffer, view, spec.type, offset, spec.length);
+      offset += spec.length * 8;
+    });
+    return result;
+  }
+
+  function fromColumnar(payload) {
+    var columns = {};
+    Object.keys(payload.columns || {}).forEach(function (name) {
+      columns[name] = Float64Array.from(payload.columns[name]);
+    });
+    payload.columns = columns;
+    return payload;
+  }
+
+  // Int64 columns (timestamps, ids) arrive as BigInt64Array; charts want numbers.
+  function numbers(column) {
+    return column instanceof BigInt64Array ? Float64Array.from(column, Number) : column;
+  }
+
+  async function fetchColumns(url) {
+    var response = await fetch(url);
+    var contentType = response.headers.get('Content-Type') || '';
+    if (response.ok && contentType.indexOf(BINARY_CONTENT_TYPE) === 0) {
+      return decodeBinary(await response.arrayBuffer());
+    }
+    var payload = await response.json();
+    if (!response.ok || !payload.ok) {
+      throw new Error(payload.error || 'Market request failed');
+    }
+    return payload.columns ? fromColumnar(payload) : payload;
+  }
+
+  global.MarketCodec = {
+    decodeBinary: decodeBinary,
+    fromColumnar: fromColumnar,
+    numbers: numbers,
+    fetchColumns: fetchColumns
+  };
+})(window);
@@ -362,6 +362,39 @@ document.addEventListener('DOMContentLoaded', function () {
     });
   }
 
+  // One request for every holding's series; falls back to per-asset calls.
+  async function fetchAssetSeriesBatch(symbols) {
+    var seriesBySymbol = {};
+    try {
+      var queries = symbols.map(function (symbol) {
+        return { id: symbol, type: 'ohlcv', base: symbol, quote: 'USDT', period_id: '1DAY', limit: 30 };
+      });
+      var response = await fetch('/api/market/batch/?queries=' + encodeURIComponent(JSON.stringify(queries)));
+      var payload = await response.json();
+      if (!response.ok || !payload.ok) {
+        throw new Error(payload.error || 'Batch series fetch failed');
+      }
+      payload.results.forEach(function (result) {
+        var data = result.data || {};
+        if (result.status !== 200 || !data.ok || !Array.isArray(data.rows) || !data.rows.length) {
+          throw new Error('Series fetch failed for ' + result.id);
+        }
+        seriesBySymbol[result.id] = data.rows.map(function (row) {
+          return Number(row.price_close);
+        });
+      });
+      return seriesBySymbol;
+    } catch (error) {
+      var seriesResults = await Promise.all(symbols.map(async function (symbol) {
+        return { symbol: symbol, series: await fetchAssetSeries(symbol) };
+      }));
+      seriesResults.forEach(function (item) {
+        seriesBySymbol[item.symbol] = item.series;
+      });
+      return seriesBySymbol;
+    }
+  }
+
   function buildPortfolioPnlSeries(seriesBySymbol, holdings, cashUsd) {
     var lengths = Object.keys(seriesBySymbol).map(function (symbol) {
       return (seriesBySymbol[symbol] || []).length;
@@ -616,14 +649,9 @@ document.addEventListener('DOMContentLoaded', function () {
         renderChartFromSeries([0, Number(lastPortfolioState.todaysPnl || 0)]);
         return;
       }
-      var seriesResults = await Promise.all(holdings.map(async function (holding) {
-        var series = await fetchAssetSeries(holding.symbol);
-        return { symbol: holding.symbol, series: series };
+      var seriesBySymbol = await fetchAssetSeriesBatch(holdings.map(function (holding) {
+        return holding.symbol;
       }));
-      var seriesBySymbol = {};
-      seriesResults.forEach(function (item) {
-        seriesBySymbol[item.symbol] = item.series;
-      });
       var portfolioPnlSeries = buildPortfolioPnlSeries(seriesBySymbol, holdings, Number(lastPortfolioState.cashUsd || 0));
       renderChartFromSeries(portfolioPnlSeries);
     } catch (error) {